@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+from nav_state import navigation_state
+from room_directory import page_type_from_url
+
+# 작업방 레코드에서 이름/번호로 볼 키 후보 (대소문자 무시, 앞에 있을수록 우선)
+ROOM_NAME_KEYS = [k.strip().lower() for k in os.getenv(
+    "NELOW_API_ROOM_NAME_KEYS", "name,roomname,room_name,projectname,project_name,title,nm"
+).split(",") if k.strip()]
+ROOM_NUMBER_KEYS = [k.strip().lower() for k in os.getenv(
+    "NELOW_API_ROOM_NUMBER_KEYS", "num,no,number,roomno,room_no,code"
+).split(",") if k.strip()]
+# 누수음 레코드 판별용 키 일부 (강도 + 주파수 키가 모두 있어야 누수음 표로 봄)
+LEAK_KEY_HINTS = (("strength",), ("freq", "hz"))
+MAX_PAYLOAD_ENTRIES = 50
+
+#-----------------------------------------------------------------------------------------------------------
+# JSON 안에서 가장 긴 레코드(dict) 목록 찾기 ({"data": {"list": [...]}} 같은 감싼 형태 포함)
+def find_records(payload, depth=0):
+    best = []
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, dict) for item in payload):
+            best = payload
+        items = payload if not best else []
+    elif isinstance(payload, dict):
+        items = payload.values()
+    else:
+        return best
+    if depth < 4:
+        for item in items:
+            found = find_records(item, depth + 1)
+            if len(found) > len(best):
+                best = found
+    return best
+
+def _find_key(record, candidates):
+    keys = {key.lower(): key for key in record}
+    return next((keys[c] for c in candidates if c in keys), None)
+
+# 레코드 목록 종류: "leaks"(누수음 표) | "rooms"(작업방 목록) | None
+def classify_records(records):
+    if not records:
+        return None
+    keys = " ".join(key.lower() for key in records[0])
+    if all(any(hint in keys for hint in hints) for hints in LEAK_KEY_HINTS):
+        return "leaks"
+    if _find_key(records[0], ROOM_NAME_KEYS):
+        return "rooms"
+    return None
+
+# 작업방 레코드 → snapshot_rooms와 같은 형태 (index, name, number, clickable)
+def rooms_from_records(records):
+    name_key = _find_key(records[0], ROOM_NAME_KEYS)
+    number_key = _find_key(records[0], ROOM_NUMBER_KEYS)
+    rooms = []
+    for index, record in enumerate(records):
+        number = record.get(number_key) if number_key else None
+        rooms.append({
+            "index": index,
+            "name": str(record.get(name_key) or "").strip() or None,
+            "number": str(number).strip() if number is not None else None,
+            "clickable": True,  # 버튼 존재 여부는 알 수 없으므로 클릭 실패 시 스크랩으로 대체
+        })
+    return rooms
+
+
+# 화면을 그리는 XHR/fetch JSON 응답을 가로채 (지역, 엔드포인트)별로 보관
+# 작업방 목록은 (지역, 페이지 종류)별, 누수음 표는 가장 최근 것 하나 (작업방 진입 시 비움)
+class ApiCapture:
+    def __init__(self, page):
+        self.page = page
+        self.payloads = {}
+        self.rooms = {}
+        self.leaks = None
+        self.hits = 0
+        self.fallbacks = 0
+        self._events = {}
+        page.on("response", self._on_response)
+
+    def _event(self, key):
+        if key not in self._events:
+            self._events[key] = asyncio.Event()
+        return self._events[key]
+
+    async def _on_response(self, response):
+        try:
+            if response.request.resource_type not in ("xhr", "fetch"):
+                return
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            payload = await response.json()
+        except Exception:
+            return  # 본문 없음/페이지 닫힘 등 → 무시
+
+        region = navigation_state(self.page).region
+        endpoint = urlparse(response.url).path
+        received = time.time()
+        self.payloads[(region, endpoint)] = {"url": response.url, "data": payload, "received": received}
+        while len(self.payloads) > MAX_PAYLOAD_ENTRIES:
+            self.payloads.pop(next(iter(self.payloads)))
+
+        records = find_records(payload)
+        kind = classify_records(records)
+        if kind == "rooms":
+            page_type = page_type_from_url(self.page.url)
+            self.rooms[(region, page_type)] = {"rooms": rooms_from_records(records), "endpoint": endpoint,
+                                               "received": received}
+            self._event(("rooms", region, page_type)).set()
+        elif kind == "leaks":
+            self.leaks = {"records": records, "endpoint": endpoint, "received": received}
+            self._event(("leaks",)).set()
+
+    # 현재 지역/페이지의 작업방 목록 (응답을 아직 못 받았으면 timeout 초까지 대기, 없으면 None)
+    async def get_rooms(self, page_type, timeout=0):
+        key = (navigation_state(self.page).region, page_type)
+        if key not in self.rooms and timeout:
+            try:
+                await asyncio.wait_for(self._event(("rooms",) + key).wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        entry = self.rooms.get(key)
+        return entry["rooms"] if entry else None
+
+    async def get_leaks(self, timeout=0):
+        if self.leaks is None and timeout:
+            try:
+                await asyncio.wait_for(self._event(("leaks",)).wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.leaks["records"] if self.leaks else None
+
+    # 작업방 진입/페이지 이동 전에 호출 → 이후 도착하는 표 응답만 사용
+    def invalidate_leaks(self):
+        self.leaks = None
+        self._event(("leaks",)).clear()
+
+    def record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.fallbacks += 1
+
+    def stats(self):
+        return f"API 응답 사용 {self.hits} / 스크랩 대체 {self.fallbacks} (보관 엔드포인트 {len(self.payloads)}개)"
+
+
+_captures = {}
+
+# 페이지의 응답 캡처 (없으면 생성해서 이벤트 연결 - 첫 goto 전에 호출해야 초기 응답까지 잡힘)
+def api_capture(page):
+    capture = _captures.get(page)
+    if capture is None:
+        capture = _captures[page] = ApiCapture(page)
+        page.on("close", lambda _: _captures.pop(page, None))
+    return capture
@@ -0,0 +1,151 @@
+import threading
+import numpy as np
+import pyaudio
+
+RATE = 16000
+CHUNK = 1024
+RING_SECONDS = 30  # 링버퍼에 유지할 최근 오디오 길이
+
+
+# 고정 크기 int16 링버퍼 (절대 샘플 위치 기준으로 읽기/쓰기)
+class AudioRingBuffer:
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.total = 0  # 지금까지 기록된 전체 샘플 수 (= 다음 쓰기 위치)
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.int16)
+        skipped = max(len(samples) - self.capacity, 0)
+        if skipped:
+            samples = samples[skipped:]
+
+        with self.cond:
+            start = (self.total + skipped) % self.capacity
+            end = start + len(samples)
+            if end <= self.capacity:
+                self.buffer[start:end] = samples
+            else:
+                split = self.capacity - start
+                self.buffer[start:] = samples[:split]
+                self.buffer[:end - self.capacity] = samples[split:]
+            self.total += skipped + len(samples)
+            self.cond.notify_all()
+
+    # [start, end) 구간을 복사해서 반환 (이미 덮어쓰인 부분은 잘라냄)
+    def read(self, start, end=None):
+        with self.cond:
+            if end is None:
+                end = self.total
+            end = min(end, self.total)
+            start = max(start, self.total - self.capacity, 0)
+            if start >= end:
+                return np.zeros(0, dtype=np.int16)
+            s = start % self.capacity
+            e = s + (end - start)
+            if e <= self.capacity:
+                return self.buffer[s:e].copy()
+            return np.concatenate((self.buffer[s:], self.buffer[:e - self.capacity]))
+
+    # 최근 n개 샘플
+    def latest(self, n):
+        with self.cond:
+            end = self.total
+        return self.read(end - n, end)
+
+    # 쓰기 위치가 pos 이상이 될 때까지 대기
+    def wait_until(self, pos, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.total >= pos, timeout=timeout)
+
+
+# 마이크 스트림을 한 번만 열고 백그라운드 스레드로 링버퍼를 계속 채움
+class AudioCapture:
+    def __init__(self, rate=RATE, chunk=CHUNK, ring_seconds=RING_SECONDS):
+        self.rate = rate
+        self.chunk = chunk
+        self.ring = AudioRingBuffer(rate * ring_seconds)
+        self._pa = None
+        self._stream = None
+        self._thread = None
+        self._running = threading.Event()
+
+    def start(self):
+        if self._running.is_set():
+            return self
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16,
+                                     channels=1,
+                                     rate=self.rate,
+                                     input=True,
+                                     frames_per_buffer=self.chunk)
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self._thread.start()
+        print("🎙️ 오디오 캡처 스트림 시작")
+        return self
+
+    def _run(self):
+        while self._running.is_set():
+            try:
+                data = self._stream.read(self.chunk, exception_on_overflow=False)
+            except Exception as e:
+                print(f"❌ 오디오 캡처 중 예외 발생: {e}")
+                break
+            self.ring.write(np.frombuffer(data, dtype=np.int16))
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join(timeout=1)
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa:
+            self._pa.terminate()
+        self._thread = self._stream = self._pa = None
+
+    @property
+    def position(self):
+        return self.ring.total
+
+    def seconds_to_samples(self, seconds):
+        return int(seconds * self.rate)
+
+    # 현재 시점까지의 최근 seconds초 오디오
+    def latest(self, seconds):
+        return self.ring.latest(self.seconds_to_samples(seconds))
+
+    # start 위치부터 청크 단위로 새 오디오를 계속 넘겨줌 (녹음 공백 없음)
+    def iter_chunks(self, start=None, timeout=1.0):
+        pos = self.position if start is None else start
+        while self._running.is_set():
+            target = pos + self.chunk
+            if not self.ring.wait_until(target, timeout=timeout):
+                continue
+            data = self.ring.read(pos, target)
+            pos = target
+            yield data
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# 겹치는 슬라이딩 윈도우를 만들어주는 제너레이터 (window초 길이, hop초 간격)
+def sliding_windows(capture, window=2.0, hop=0.5, timeout=1.0):
+    window_n = capture.seconds_to_samples(window)
+    hop_n = capture.seconds_to_samples(hop)
+    next_end = capture.position + hop_n
+    while True:
+        if not capture.ring.wait_until(next_end, timeout=timeout):
+            continue
+        # 처리 지연으로 hop 이상 밀렸으면 가장 최신 윈도우로 건너뜀
+        end = next_end
+        if capture.position - end >= hop_n:
+            end = capture.position
+        yield end, capture.ring.read(end - window_n, end)
+        next_end = end + hop_n
@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+
+# 오프라인 재생 벤치마크: 녹음/문장 코퍼스 → (STT) → 해석(로컬/mock LLM) → fixture 사이트에서 실행
+# 마이크, OpenAI API, 실제 NELOW 사이트 없이 단계별 지연 분포와 처리량을 측정하고 기준 결과와 비교
+# 사용: python bench.py --sizes 10 200 2000 --save-baseline bench_baseline.json
+#       python bench.py --sizes 10 200 2000 --baseline bench_baseline.json --no-local
+# 코퍼스(JSONL): {"text": 명령, "wav": 16kHz 녹음 경로(선택), "expect": [{"type": "SelectRegion", "region": ...}, ...]}
+#   wav가 있으면 trigger.py와 같은 경로(transcribe_audio)로 인식한 문장을 실행, --no-stt면 text를 그대로 사용
+#   기본 코퍼스의 wav는 espeak-ng(ko) 합성 음성 → 현장 녹음으로 바꾸면 실제 인식 정확도에 가까워짐
+#   기본 코퍼스 앞 7개는 로컬 규칙으로 해석되고, 뒤 6개(바꿔 말하기/지역명 오인식/작업방 이름)는 로컬 규칙이 확신하지 못해
+#   mock LLM으로 감 → 스트리밍 추측 실행과 LLM 캐시 경로도 기본 실행에서 측정됨
+
+DEFAULT_MANIFEST = os.path.join("bench_corpus", "manifest.jsonl")
+REGRESSION_TOLERANCE = 0.2  # 기준보다 이 비율 이상 느려지면 회귀로 표시
+REGRESSION_MIN_MS = 5.0  # 단, 차이가 이보다 작으면 무시 (측정 잡음)
+COMPARE_PERCENTILES = ("p50", "p95")
+
+
+def load_manifest(path):
+    base = os.path.dirname(path)
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("wav"):
+                    entry["wav"] = os.path.join(base, entry["wav"])
+                entries.append(entry)
+    return entries
+
+def step_dict(step):
+    return {"type": type(step).__name__, **asdict(step)}
+
+# 기대 단계의 키만 비교 (기대에 없는 필드는 무시)
+def plan_matches(expected, steps):
+    actual = [step_dict(step) for step in steps]
+    return len(expected) == len(actual) and all(
+        all(a.get(key) == value for key, value in e.items()) for e, a in zip(expected, actual)
+    )
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+#-----------------------------------------------------------------------------------------------------------
+async def run_size(size, entries, args, region_value_map, trace_path):
+    import nelow
+    import tracing
+    from fixture_site import create_server as create_fixture
+    from region_pool import RegionPagePool
+
+    fixture = _serve(create_fixture(region_value_map, port=0, rooms=size, rows=size, latency_ms=args.api_latency_ms))
+    base_url = f"http://127.0.0.1:{fixture.server_address[1]}/"
+    auth_state = os.path.join(tempfile.mkdtemp(prefix="nelow_bench_"), "auth_state.json")
+
+    executed = {}
+    transcribe = None
+    if not args.no_stt and any(entry.get("wav") for entry in entries):
+        import stt
+        from kws import load_wav
+        from trigger import transcribe_audio
+        transcribe = transcribe_audio
+        stt.set_region_names(region_value_map)
+        await asyncio.to_thread(stt.get_tier("command").warm_up)  # 모델 로드/첫 추론 초기화는 측정에서 제외
+
+    playwright, browser, context, page = await nelow.create_logged_in_session(
+        base_url, headless=True, auth_state_path=auth_state
+    )
+    region_pool = await RegionPagePool.from_env(context, base_url, region_value_map)
+    results = []
+    started = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            for entry in entries:
+                executed.clear()
+                with tracing.trace("bench.command", size=size, text=entry["text"]) as root:
+                    command_started = time.perf_counter()
+                    text = entry["text"]
+                    if transcribe and entry.get("wav"):
+                        text = await asyncio.to_thread(transcribe, load_wav(entry["wav"]))
+                    page, ok = await nelow.process_command(
+                        page, base_url, text, args.api_key, region_value_map, region_pool,
+                        on_plan=lambda steps: executed.__setitem__("steps", steps),
+                    )
+                    elapsed_ms = (time.perf_counter() - command_started) * 1000
+                steps = executed.get("steps", [])
+                results.append({
+                    "text": entry["text"], "transcript": text, "trace": root.trace_id, "ms": elapsed_ms, "ok": ok,
+                    "correct": plan_matches(entry.get("expect", []), steps),
+                    "plan": [step_dict(step) for step in steps],
+                })
+    finally:
+        wall = time.perf_counter() - started
+        await browser.close()
+        await playwright.stop()
+        fixture.shutdown()
+
+    traces = {r["trace"] for r in results}
+    spans = [s for s in tracing.load_spans(trace_path) if s.get("trace") in traces]
+    failed_steps = sum(1 for s in spans if s["name"].startswith("step.") and s.get("attrs", {}).get("ok") is False)
+    return {
+        "commands": len(results),
+        "seconds": wall,
+        "throughput": len(results) / wall if wall else 0.0,
+        "accuracy": sum(r["correct"] for r in results) / len(results) if results else 0.0,
+        "failed_steps": failed_steps,
+        "failed_commands": sum(not r["ok"] for r in results),
+        "stages": tracing.stage_stats(spans),
+        "mismatches": [r for r in results if not r["correct"]][:10],
+    }
+
+def print_size_report(size, report):
+    from tracing import PERCENTILES
+    print(f"\n📏 크기 {size} (작업방/행): 명령 {report['commands']}개, {report['seconds']:.1f}s "
+          f"({report['throughput']:.2f} 명령/s), 해석 정확도 {report['accuracy'] * 100:.0f}%, "
+          f"실패 명령 {report['failed_commands']}개, 실패 단계 {report['failed_steps']}개")
+    stages = report["stages"]
+    print(f"{'구간':<28}{'횟수':>7}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+    for name in sorted(stages, key=lambda n: -stages[n]["p50"]):
+        s = stages[name]
+        print(f"{name:<28}{s['count']:>7}" + "".join(f"{s['p' + str(p)]:>10.1f}" for p in PERCENTILES))
+    for miss in report["mismatches"]:
+        print(f"  ❌ '{miss['text']}' (인식: '{miss['transcript']}') → {miss['plan']}")
+
+# 기준 결과와 구간별 p50/p95 비교 → 회귀 목록
+def compare_with_baseline(result, baseline, tolerance=REGRESSION_TOLERANCE):
+    regressions = []
+    for size, report in result["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if not base:
+            print(f"⚠️ 기준 결과에 크기 {size}가 없어 비교 생략")
+            continue
+        print(f"\n🆚 크기 {size}: 처리량 {base['throughput']:.2f} → {report['throughput']:.2f} 명령/s, "
+              f"정확도 {base['accuracy'] * 100:.0f}% → {report['accuracy'] * 100:.0f}%")
+        if report["accuracy"] < base["accuracy"]:
+            regressions.append((size, "accuracy", base["accuracy"], report["accuracy"]))
+        for name, stats in sorted(report["stages"].items()):
+            base_stats = base["stages"].get(name)
+            if not base_stats:
+                continue
+            cells = []
+            for key in COMPARE_PERCENTILES:
+                old, new = base_stats[key], stats[key]
+                change = (new - old) / old if old else 0.0
+                regressed = change > tolerance and new - old > REGRESSION_MIN_MS
+                cells.append(f"{key} {old:.1f}→{new:.1f}ms ({change * 100:+.0f}%){' 🔺' if regressed else ''}")
+                if regressed:
+                    regressions.append((size, f"{name} {key}", old, new))
+            print(f"  {name:<26} " + ", ".join(cells))
+    return regressions
+
+#-----------------------------------------------------------------------------------------------------------
+async def run_benchmark(args):
+    # 추적/로컬 해석 설정은 nelow/tracing import 전에 환경변수로 정해야 함
+    trace_path = args.trace or os.path.join(tempfile.mkdtemp(prefix="nelow_bench_"), "traces.jsonl")
+    os.environ["NELOW_TRACE"] = trace_path
+    os.environ["NELOW_LOCAL_INTENT"] = "0" if args.no_local else "1"
+    os.environ.setdefault("ID", "bench")
+    os.environ.setdefault("PASSWORD", "bench")
+
+    from mock_llm_server import create_server as create_mock_llm, load_recordings
+    mock_llm = _serve(create_mock_llm(load_recordings(args.recordings), port=0,
+                                      first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms))
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{mock_llm.server_address[1]}/v1"
+    args.api_key = "mock"
+
+    import nelow
+    from llm_cache import LLMCache
+    # 이전 실행의 LLM 캐시 적중으로 LLM 구간이 빠지지 않도록 빈 캐시 사용 (--llm-cache면 실행 중 적중 허용)
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="nelow_bench_"), "llm_cache.sqlite")
+    nelow._llm_cache = LLMCache(path=cache_path) if args.llm_cache else LLMCache(path=cache_path, ttl=-1)
+
+    with open(args.regions, "r", encoding="utf-8") as f:
+        region_value_map = json.load(f)
+    entries = load_manifest(args.manifest)
+    print(f"🏁 벤치마크: 코퍼스 {len(entries)}개 × {args.repeat}회, 크기 {args.sizes}, "
+          f"로컬 해석 {'끔' if args.no_local else '켬'}, STT {'끔' if args.no_stt else '켬'}, "
+          f"mock LLM 첫 토큰 {args.llm_first_token_ms}ms")
+
+    result = {
+        "config": {"manifest": args.manifest, "repeat": args.repeat, "local_intent": not args.no_local,
+                   "stt": not args.no_stt,
+                   "llm_first_token_ms": args.llm_first_token_ms, "llm_token_ms": args.llm_token_ms,
+                   "api_latency_ms": args.api_latency_ms, "created": time.time()},
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            report = await run_size(size, entries, args, region_value_map, trace_path)
+            result["sizes"][str(size)] = report
+            print_size_report(size, report)
+    finally:
+        mock_llm.shutdown()
+    print(f"\n🧾 구간 기록: {trace_path}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 기준 결과 저장: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n🔺 회귀 {len(regressions)}건")
+            for size, what, old, new in regressions:
+                print(f"  크기 {size} {what}: {old:.3f} → {new:.3f}")
+            return 1
+        print("\n✅ 기준 대비 회귀 없음")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NELOW 오프라인 재생 벤치마크")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--regions", default="region_value_map.json")
+    parser.add_argument("--recordings", default="mock_llm_recordings.jsonl", help="mock LLM 녹화 응답")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 200, 2000], help="작업방/누수음 행 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-local", action="store_true", help="로컬 규칙 해석 끄기 (NELOW_LOCAL_INTENT=0, 항상 LLM)")
+    parser.add_argument("--no-stt", action="store_true", help="녹음(wav)을 인식하지 않고 text를 그대로 실행")
+    parser.add_argument("--llm-cache", action="store_true", help="반복 실행에서 LLM 캐시 적중 허용")
+    parser.add_argument("--llm-first-token-ms", type=int, default=300)
+    parser.add_argument("--llm-token-ms", type=int, default=20)
+    parser.add_argument("--api-latency-ms", type=int, default=0, help="fixture 사이트 API 응답 지연")
+    parser.add_argument("--trace", help="구간 기록 파일 (기본: 임시 파일)")
+    parser.add_argument("--out", help="결과 JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준으로 저장")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(run_benchmark(parse_args())))
@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from playwright.async_api import async_playwright
+from nelow import AUTH_STATE_PATH, LEAK_ROW_SELECTOR, ensure_auth_state, load_region_value_map, click_room
+from api_capture import api_capture
+from page_helpers import ROOM_SELECTORS, collect_rooms, new_tracked_page, select_region
+from leak_table import LeakTable, extract_leak_table
+from readiness import get_view_signature, wait_for_room_view
+from room_directory import PAGE_TYPES
+
+# 모든 지역의 작업방 목록/누수음 표를 헤드리스로 내보내기 (주간 보고용)
+# 사용: python bulk_export.py --out export.jsonl --concurrency 4
+#       오프라인 테스트: python fixture_site.py &
+#                        python bulk_export.py --base-url http://127.0.0.1:8766/ --auth-state .nelow_cache/fixture_auth.json
+
+DEFAULT_BASE_URL = "https://kr.neverlosewater.com/"
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+CSV_FIELDS = ["region", "region_value", "page", "room_index", "room", "room_number", "row", "strength",
+              "max_frequency", "data"]
+
+
+# 전체 워커가 공유하는 요청 간격 제한 (초당 rate회 이하로 페이지 이동/클릭)
+class Throttle:
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate and rate > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# 완료된 지역을 기록해 두고, 다시 실행하면 이어서 진행
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.done = set(state.get("done", []))
+            self.failed = state.get("failed", {})
+
+    def mark(self, region, error=None):
+        if error is None:
+            self.done.add(region)
+            self.failed.pop(region, None)
+        else:
+            self.failed[region] = error
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+# 지역 하나가 끝날 때마다 결과를 바로 파일에 추가 (JSONL: 작업방 1줄, CSV: 누수음 행 1줄)
+class ResultWriter:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.csv = path.endswith(".csv")
+        new_file = not (resume and os.path.exists(path))
+        self._file = open(path, "w" if new_file else "a", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS) if self.csv else None
+        if self.csv and new_file:
+            self._writer.writeheader()
+        self._lock = asyncio.Lock()
+
+    async def write(self, records):
+        async with self._lock:
+            for record in records:
+                if self.csv:
+                    self._write_csv(record)
+                else:
+                    self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def _write_csv(self, record):
+        base = {key: record.get(key) for key in ("region", "region_value", "page", "room_index")}
+        base.update(room=record.get("room"), room_number=record.get("number"))
+        leaks = record.get("leaks")
+        if not leaks:
+            self._writer.writerow(base)
+            return
+        table = LeakTable.from_records(leaks)
+        strength, frequency = table.numeric("strength"), table.numeric("frequency")
+        for row, leak in enumerate(leaks):
+            self._writer.writerow({
+                **base, "row": row + 1,
+                "strength": None if strength is None else strength[row],
+                "max_frequency": None if frequency is None else frequency[row],
+                "data": json.dumps(leak, ensure_ascii=False),
+            })
+
+    def close(self):
+        self._file.close()
+
+
+# 작업방에 들어가 누수음 표 수집 (API 응답 우선, 화면 행 수와 다르면 표 스냅샷)
+async def collect_leaks(page, page_type, room, throttle):
+    item_selector, _ = ROOM_SELECTORS[page_type]
+    capture = api_capture(page)
+    signature = await get_view_signature(page, item_selector)
+    capture.invalidate_leaks()
+    await throttle.wait()
+    await click_room(page, item_selector, room)
+    await wait_for_room_view(page, item_selector, signature)
+    row_count = await page.locator(LEAK_ROW_SELECTOR).count()
+    records = await capture.get_leaks(timeout=1)
+    capture.record(records is not None and len(records) == row_count)
+    if records is not None and len(records) == row_count:
+        return records
+    if not row_count:
+        return []
+    table = await extract_leak_table(page)
+    if table is None:
+        return []
+    return [{header: str(table.text[header][row]) for header in table.headers if header} for row in range(len(table))]
+
+# 지역 하나 내보내기 → 작업방 레코드 목록
+async def export_region(page, base_url, region, region_value, page_types, include_leaks, throttle):
+    records = []
+    for page_type in page_types:
+        await throttle.wait()
+        await page.goto(base_url.rstrip("/") + "/" + page_type)
+        await select_region(page, region_value)
+        rooms = await collect_rooms(page, page_type)
+        for room in rooms:
+            record = {"region": region, "region_value": region_value, "page": page_type,
+                      "room_index": room["index"], "room": room["name"], "number": room.get("number")}
+            if include_leaks and room.get("clickable", True):
+                record["leaks"] = await collect_leaks(page, page_type, room, throttle)
+            records.append(record)
+    return records
+
+# 컨텍스트 하나가 큐에서 지역을 꺼내 처리 (실패 시 새 페이지로 재시도)
+async def worker(worker_id, context, queue, args, writer, checkpoint, throttle, stats):
+    page = await new_tracked_page(context)
+    while True:
+        item = await queue.get()
+        if item is None:
+            queue.task_done()
+            break
+        region, region_value = item
+        started = time.perf_counter()
+        for attempt in range(1, args.retries + 2):
+            try:
+                records = await export_region(page, args.base_url, region, region_value, args.pages,
+                                              not args.rooms_only, throttle)
+                await writer.write(records)
+                checkpoint.mark(region)
+                elapsed = time.perf_counter() - started
+                leak_rows = sum(len(r.get("leaks") or []) for r in records)
+                stats.append({"region": region, "rooms": len(records), "rows": leak_rows, "seconds": elapsed})
+                print(f"✅ [{worker_id}] {region}: 작업방 {len(records)}개, 누수음 {leak_rows}행 "
+                      f"{elapsed:.1f}s ({(len(records) + leak_rows) / max(elapsed, 1e-6):.1f} 건/s)")
+                break
+            except Exception as e:
+                print(f"⚠️ [{worker_id}] {region} 실패 ({attempt}회): {e}")
+                await page.close()
+                page = await new_tracked_page(context)
+                if attempt > args.retries:
+                    checkpoint.mark(region, str(e))
+        queue.task_done()
+    await page.close()
+
+
+async def run_export(args):
+    if args.region_map:
+        with open(args.region_map, "r", encoding="utf-8") as f:
+            region_value_map = json.load(f)
+    else:
+        region_value_map = load_region_value_map()
+    regions = args.regions or list(region_value_map)
+    unknown = [r for r in regions if r not in region_value_map]
+    for name in unknown:
+        print(f"⚠️ 알 수 없는 지역명 제외: {name}")
+
+    checkpoint = Checkpoint(args.checkpoint or args.out + CHECKPOINT_SUFFIX)
+    resume = not args.restart
+    if not resume:
+        checkpoint.done.clear()
+        checkpoint.failed.clear()
+    todo = [r for r in regions if r in region_value_map and r not in checkpoint.done]
+    print(f"📦 내보내기 대상 {len(todo)}개 지역 (완료 {len(checkpoint.done)}개 건너뜀), 동시 {args.concurrency}개")
+    if not todo:
+        return
+
+    writer = ResultWriter(args.out, resume=resume)
+    throttle = Throttle(args.rate)
+    queue = asyncio.Queue()
+    for region in todo:
+        queue.put_nowait((region, region_value_map[region]))
+    concurrency = max(1, min(args.concurrency, len(todo)))
+    for _ in range(concurrency):
+        queue.put_nowait(None)
+
+    stats = []
+    started = time.perf_counter()
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=not args.headed)
+    try:
+        auth_state = await ensure_auth_state(browser, args.base_url, args.auth_state)
+        contexts = [await browser.new_context(storage_state=auth_state) for _ in range(concurrency)]
+        await asyncio.gather(*(
+            worker(i + 1, context, queue, args, writer, checkpoint, throttle, stats)
+            for i, context in enumerate(contexts)
+        ))
+    finally:
+        writer.close()
+        await browser.close()
+        await playwright.stop()
+
+    elapsed = time.perf_counter() - started
+    rooms = sum(s["rooms"] for s in stats)
+    rows = sum(s["rows"] for s in stats)
+    print(f"📊 완료 {len(stats)}/{len(todo)}개 지역, 작업방 {rooms}개, 누수음 {rows}행, {elapsed:.1f}s "
+          f"(지역 {len(stats) / max(elapsed, 1e-6) * 60:.1f}개/분)")
+    if checkpoint.failed:
+        print(f"❌ 실패 지역 {len(checkpoint.failed)}개 (다시 실행하면 이어서 진행): {', '.join(checkpoint.failed)}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="전체 지역 작업방/누수음 헤드리스 내보내기")
+    parser.add_argument("--out", default="nelow_export.jsonl", help=".jsonl 또는 .csv")
+    parser.add_argument("--regions", nargs="*", help="지역명 (기본: region_value_map.json 전체)")
+    parser.add_argument("--pages", nargs="*", default=list(PAGE_TYPES), choices=PAGE_TYPES)
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 쓰는 브라우저 컨텍스트 수")
+    parser.add_argument("--rate", type=float, default=5.0, help="전체 초당 최대 이동/클릭 수 (0이면 제한 없음)")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--rooms-only", action="store_true", help="누수음 표 없이 작업방 목록만")
+    parser.add_argument("--checkpoint", help=f"기본: <out>{CHECKPOINT_SUFFIX}")
+    parser.add_argument("--restart", action="store_true", help="체크포인트 무시하고 처음부터")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--auth-state", default=AUTH_STATE_PATH)
+    parser.add_argument("--region-map", help="지역 매핑 파일 (기본: region_value_map.json)")
+    parser.add_argument("--headed", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_export(parse_args()))
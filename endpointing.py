@@ -0,0 +1,88 @@
+import os
+import numpy as np
+
+RATE = 16000
+FRAME = 320  # 20ms 단위로 에너지 계산
+
+MIN_SPEECH_DBFS = -50.0  # 아무리 조용한 환경이어도 이 이하는 음성으로 보지 않음
+SPEECH_MARGIN_DB = float(os.getenv("NELOW_SPEECH_MARGIN_DB", "10"))  # 잡음 바닥 대비 음성 판단 여유
+HANGOVER_SECONDS = float(os.getenv("NELOW_HANGOVER_SECONDS", "3"))  # 발화 후 이 시간만큼 무음이면 종료
+NO_SPEECH_TIMEOUT = float(os.getenv("NELOW_NO_SPEECH_TIMEOUT", "5"))  # 발화가 시작되지 않으면 종료
+TRIM_PAD_SECONDS = 0.2  # 앞뒤 무음 제거 시 남겨둘 여유
+NOISE_ADAPT = 0.05  # 잡음 바닥 지수이동평균 계수
+
+
+# int16 bytes/배열 → 프레임별 RMS (dBFS)
+def frame_dbfs(samples, frame=FRAME):
+    if isinstance(samples, (bytes, bytearray)):
+        samples = np.frombuffer(samples, dtype=np.int16)
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    x = samples[:n * frame].astype(np.float32).reshape(n, frame) / 32768.0
+    return 10 * np.log10(np.mean(x * x, axis=1) + 1e-12)
+
+# 주변 소음(녹음 직전 오디오)에서 잡음 바닥 추정 (발화가 섞여 있어도 하위 20% 기준)
+def estimate_noise_floor(ambient, default=-60.0):
+    levels = frame_dbfs(ambient)
+    if len(levels) == 0:
+        return default
+    return float(np.percentile(levels, 20))
+
+
+# 적응형 잡음 바닥 + hangover 기반 발화 끝점 검출기
+class Endpointer:
+    def __init__(self, noise_floor_db=-60.0, rate=RATE, hangover=HANGOVER_SECONDS,
+                 margin_db=SPEECH_MARGIN_DB, no_speech_timeout=NO_SPEECH_TIMEOUT):
+        self.rate = rate
+        self.noise_floor = noise_floor_db
+        self.margin = margin_db
+        self.hangover = hangover
+        self.no_speech_timeout = no_speech_timeout
+        self.elapsed = 0.0
+        self.silence = 0.0
+        self.speech_started = False
+        self._tail = np.zeros(0, dtype=np.int16)  # 프레임을 채우지 못한 청크 끝부분 (다음 청크 앞에 붙임)
+
+    @property
+    def threshold(self):
+        return max(self.noise_floor + self.margin, MIN_SPEECH_DBFS)
+
+    # 청크를 넣고 녹음을 끝내야 하면 True
+    # 청크 크기(1024)가 프레임(320)의 배수가 아니므로 남는 샘플은 버리지 않고 다음 청크와 합쳐 판단
+    def feed(self, chunk):
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = np.frombuffer(chunk, dtype=np.int16)
+        samples = np.concatenate((self._tail, chunk)) if len(self._tail) else chunk
+        used = len(samples) // FRAME * FRAME
+        self._tail = samples[used:]
+        levels = frame_dbfs(samples[:used])
+        seconds = used / self.rate
+        self.elapsed += seconds
+        if len(levels) == 0:
+            return False
+
+        is_speech = levels >= self.threshold
+        if is_speech.any():
+            self.speech_started = True
+            self.silence = 0.0
+        else:
+            self.silence += seconds
+            # 음성이 아닌 구간으로 잡음 바닥을 천천히 갱신 (환경 소음 변화에 적응)
+            self.noise_floor += NOISE_ADAPT * (float(np.median(levels)) - self.noise_floor)
+
+        if self.speech_started:
+            return self.silence >= self.hangover
+        return self.elapsed >= self.no_speech_timeout
+
+
+# 앞뒤 무음 구간 제거 (threshold_db 이상인 첫/마지막 프레임 기준 + 여유)
+def trim_silence(samples, threshold_db, rate=RATE, pad=TRIM_PAD_SECONDS, frame=FRAME):
+    levels = frame_dbfs(samples, frame)
+    voiced = np.flatnonzero(levels >= threshold_db)
+    if len(voiced) == 0:
+        return samples[:0]
+    pad_n = int(pad * rate)
+    start = max(voiced[0] * frame - pad_n, 0)
+    end = min((voiced[-1] + 1) * frame + pad_n, len(samples))
+    return samples[start:end]
@@ -0,0 +1,275 @@
+import argparse
+import html
+import io
+import json
+import random
+import time
+import wave
+import zlib
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+# 오프라인 테스트용 NELOW 대역 사이트
+# #sidebar, select.item-select, ul.ns-list, ul.monitoring-list, #vgt-table 구조와 JSON API를 흉내냄
+# 사용: python fixture_site.py --rooms 20 --rows 500 → http://127.0.0.1:8766/ (아무 계정으로 로그인)
+
+SESSION_COOKIE = "nelow_session"
+PAGES = {"leak-master": "누수음 듣기", "water-leak-logger": "누수음 로거", "leak-monitoring": "누수음 모니터링"}
+AUDIO_RATE = 8000
+AUDIO_SECONDS = 1.0
+
+LOGIN_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>NELOW 로그인</title></head>
+<body>
+<form method="post" action="/login">
+  <input type="text" name="id">
+  <input type="password" name="password">
+  <button type="submit">로그인</button>
+</form>
+</body></html>
+"""
+
+PAGE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>NELOW fixture</title>
+<style>
+  #vgt-table th, #vgt-table td { padding: 2px 6px; }
+  #vgt-table tbody tr { cursor: pointer; }
+</style></head>
+<body>
+<div id="sidebar">
+  <select class="item-select">__OPTIONS__</select>
+  __LINKS__
+</div>
+<div id="content"></div>
+<div id="waveform"><audio controls preload="auto"></audio></div>
+<script>
+const PAGE = location.pathname.replace(/^\\/+|\\/+$/g, "");
+const ROOM_PAGES = ["leak-master", "water-leak-logger", "leak-monitoring"];
+const select = document.querySelector("select.item-select");
+const audio = document.querySelector("#waveform > audio");
+let rows = [], sortColumn = null, sortOrder = "none";
+
+const saved = localStorage.getItem("region");
+if (saved && select.querySelector(`option[value="${saved}"]`)) select.value = saved;
+select.addEventListener("change", () => { localStorage.setItem("region", select.value); loadRooms(); });
+
+async function api(path, params) {
+  const res = await fetch(path + "?" + new URLSearchParams(params));
+  return (await res.json()).data.list;
+}
+
+async function loadRooms() {
+  const content = document.getElementById("content");
+  if (!ROOM_PAGES.includes(PAGE)) { content.innerHTML = ""; return; }
+  const rooms = await api("/api/rooms", {region: select.value, page: PAGE});
+  const monitoring = PAGE === "leak-monitoring";
+  const items = rooms.map(r => monitoring
+    ? `<li class="col"><h3>${r.projectName}</h3><span class="num">${r.no}</span><img src="/static/chevron.svg" data-room="${r.no}"></li>`
+    : `<li><p>${r.projectName}</p><span class="num">${r.no}</span><img src="/static/chevron.svg" data-room="${r.no}"></li>`);
+  content.innerHTML = `<ul class="${monitoring ? "monitoring-list" : "ns-list"}">${items.join("")}</ul><div id="table"></div>`;
+  content.querySelectorAll('img[src*="chevron"]').forEach(img =>
+    img.addEventListener("click", () => loadLeaks(img.dataset.room)));
+}
+
+async function loadLeaks(room) {
+  rows = await api("/api/leaks", {region: select.value, page: PAGE, room});
+  sortColumn = null; sortOrder = "none";
+  renderTable();
+}
+
+// vue-good-table처럼 헤더 버튼 클릭마다 none → asc → desc → none 순환
+function toggleSort(column) {
+  if (sortColumn !== column) { sortColumn = column; sortOrder = "none"; }
+  sortOrder = {none: "asc", asc: "desc", desc: "none"}[sortOrder];
+  renderTable();
+}
+
+function sortedRows() {
+  if (!sortColumn || sortOrder === "none") return rows;
+  const sign = sortOrder === "asc" ? 1 : -1;
+  return rows.slice().sort((a, b) => sign * (a[sortColumn] - b[sortColumn]));
+}
+
+function headerCell(label, column) {
+  const state = sortColumn === column ? sortOrder : "none";
+  const cls = state === "none" ? "sortable" : `sortable sorting sorting-${state}`;
+  const aria = state === "asc" ? "ascending" : "descending";
+  return `<th class="${cls}" aria-sort="${aria}"><span>${label}</span><button data-column="${column}"></button></th>`;
+}
+
+function renderTable() {
+  const body = sortedRows().map((r, i) =>
+    `<tr data-id="${r.id}"><th>${i + 1}</th><td>${r.date}</td><td>${r.strength.toFixed(3)}</td><td>${r.maxFrequency}</td></tr>`);
+  document.getElementById("table").innerHTML =
+    `<table id="vgt-table"><thead><tr><th>#</th><th>Date</th>${headerCell("Strength", "strength")}` +
+    `${headerCell("Max Frequency", "maxFrequency")}</tr></thead><tbody>${body.join("")}</tbody></table>`;
+  document.querySelectorAll("#vgt-table thead button").forEach(button =>
+    button.addEventListener("click", () => toggleSort(button.dataset.column)));
+  document.querySelectorAll("#vgt-table tbody tr").forEach(tr =>
+    tr.addEventListener("click", () => { audio.src = `/audio/${tr.dataset.id}.wav`; audio.load(); }));
+}
+
+loadRooms();
+</script>
+</body></html>
+"""
+
+CHEVRON_SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="12" height="12"><path d="M3 1l6 5-6 5" stroke="#333" fill="none"/></svg>'
+
+
+def _rng(*parts):
+    return random.Random(zlib.crc32("|".join(map(str, parts)).encode("utf-8")))
+
+
+# 지역/페이지/작업방별로 항상 같은 데이터를 만들어 주는 생성기
+class FixtureData:
+    def __init__(self, region_value_map, rooms=8, rows=50):
+        self.region_names = {value: name for name, value in region_value_map.items()}
+        self.rooms_per_page = rooms
+        self.rows_per_room = rows
+
+    def rooms(self, region_value, page):
+        name = self.region_names.get(region_value, region_value)
+        label = PAGES.get(page, page)
+        return [{"projectName": f"{name} {label} {i + 1}구역", "no": f"{region_value}-{i + 1:03d}"}
+                for i in range(self.rooms_per_page)]
+
+    def leaks(self, region_value, page, room):
+        rng = _rng(region_value, page, room)
+        return [{
+            "id": f"{region_value}.{page}.{room}.{i + 1}",
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "strength": round(rng.random(), 3),
+            "maxFrequency": rng.randint(100, 2000),
+        } for i in range(self.rows_per_room)]
+
+    # 누수음 id → 짧은 WAV (Max Frequency 정현파 + 잡음, 강도에 비례한 크기)
+    def audio(self, leak_id):
+        try:
+            region_value, page, room, row = leak_id.split(".")
+            leak = self.leaks(region_value, page, room)[int(row) - 1]
+        except (ValueError, IndexError):
+            return None
+        frequency = leak["maxFrequency"]
+        amplitude = 0.05 + 0.9 * leak["strength"]
+        t = np.arange(int(AUDIO_RATE * AUDIO_SECONDS)) / AUDIO_RATE
+        noise = np.random.default_rng(zlib.crc32(leak_id.encode("utf-8"))).normal(0, 0.05, t.size)
+        samples = np.clip(amplitude * np.sin(2 * np.pi * frequency * t) + noise, -1, 1)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(AUDIO_RATE)
+            wf.writeframes((samples * 32767).astype(np.int16).tobytes())
+        return buffer.getvalue()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    data = None
+    latency_ms = 0
+    options_html = ""
+    links_html = ""
+    requests_served = 0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, content_type, headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _logged_in(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return SESSION_COOKIE in cookie
+
+    def do_POST(self):
+        type(self).requests_served += 1
+        if urlparse(self.path).path != "/login":
+            self.send_error(404)
+            return
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(302, b"", "text/plain", {
+            "Location": "/",
+            "Set-Cookie": f"{SESSION_COOKIE}=fixture; Path=/; HttpOnly",
+        })
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/"
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if path == "/static/chevron.svg":
+            self._send(200, CHEVRON_SVG, "image/svg+xml")
+            return
+        if not self._logged_in():
+            if path.startswith("/api/") or path.startswith("/audio/"):
+                self._json({"code": 401, "message": "login required"}, status=401)
+            else:
+                self._send(200, LOGIN_HTML, "text/html; charset=utf-8")
+            return
+
+        if path.startswith("/api/") or path.startswith("/audio/"):
+            time.sleep(self.latency_ms / 1000)
+        if path == "/api/rooms":
+            rooms = self.data.rooms(query.get("region", ""), query.get("page", ""))
+            self._json({"code": 200, "data": {"total": len(rooms), "list": rooms}})
+        elif path == "/api/leaks":
+            leaks = self.data.leaks(query.get("region", ""), query.get("page", ""), query.get("room", ""))
+            self._json({"code": 200, "data": {"total": len(leaks), "list": leaks}})
+        elif path.startswith("/audio/") and path.endswith(".wav"):
+            audio = self.data.audio(path[len("/audio/"):-len(".wav")])
+            if audio is None:
+                self.send_error(404)
+            else:
+                self._send(200, audio, "audio/wav")
+        elif path == "/" or path.lstrip("/") in PAGES:
+            page = PAGE_HTML.replace("__OPTIONS__", self.options_html).replace("__LINKS__", self.links_html)
+            self._send(200, page, "text/html; charset=utf-8")
+        else:
+            self.send_error(404)
+
+
+def create_server(region_value_map, host="127.0.0.1", port=8766, rooms=8, rows=50, latency_ms=0):
+    options = "".join(
+        f'<option value="{html.escape(value)}">{html.escape(name)}</option>' for name, value in region_value_map.items()
+    )
+    links = "".join(f'<a href="/{page}">{label}</a>' for page, label in PAGES.items())
+    handler = type("Handler", (FixtureHandler,), {
+        "data": FixtureData(region_value_map, rooms, rows), "latency_ms": latency_ms,
+        "options_html": options, "links_html": links,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NELOW 화면/API 대역 서버 (오프라인 테스트용)")
+    parser.add_argument("--regions", default="region_value_map.json")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rooms", type=int, default=8, help="지역/페이지별 작업방 수")
+    parser.add_argument("--rows", type=int, default=50, help="작업방별 누수음 행 수")
+    parser.add_argument("--latency-ms", type=int, default=0, help="API 응답 지연")
+    args = parser.parse_args()
+
+    with open(args.regions, "r", encoding="utf-8") as f:
+        region_value_map = json.load(f)
+    server = create_server(region_value_map, port=args.port, rooms=args.rooms, rows=args.rows,
+                           latency_ms=args.latency_ms)
+    print(f"🧪 NELOW fixture 서버 실행: http://127.0.0.1:{args.port}/ "
+          f"(지역 {len(region_value_map)}개, 작업방 {args.rooms}개, 행 {args.rows}개)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
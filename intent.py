@@ -0,0 +1,288 @@
+import re
+from dataclasses import dataclass, asdict
+from room_directory import jamo_ngrams
+
+# 로컬 해석 결과를 그대로 쓰기 위한 최소 신뢰도 (0~1, 발화 중 해석된 글자 비율)
+LOCAL_CONFIDENCE = 0.75
+REGION_CANDIDATES = 5  # LLM에 넘겨줄 지역 후보 수
+REGION_SNAP_SCORE = 0.5  # LLM이 목록에 없는 지역명을 주면 이 점수 이상인 후보로 보정
+
+# 페이지 이름 (nelow.dom_elements와 동일한 href)
+PAGE_ALIASES = [
+    ("누수음듣기", "/leak-master"),
+    ("누수음로거", "/water-leak-logger"),
+    ("누수음모니터링", "/leak-monitoring"),
+    ("듣기", "/leak-master"),
+    ("로거", "/water-leak-logger"),
+    ("모니터링", "/leak-monitoring"),
+]
+
+SORT_COLUMNS = [("강도값", "strength"), ("강도", "strength"), ("주파수값", "frequency"), ("주파수", "frequency")]
+ASC_WORDS = ["오름차순", "낮은순", "작은순", "적은순"]
+DESC_WORDS = ["내림차순", "높은순", "큰순", "많은순"]
+PLAY_WORDS = ["재생", "들려줘", "틀어줘"]
+
+# 표 데이터 질의 ("가장 강한 누수음 재생", "주파수 상위 5개", "강도 0.5 이상")
+TOP_WORDS = ["가장", "제일"]
+LARGE_WORDS = ["강한", "센", "큰", "높은", "많은"]
+SMALL_WORDS = ["약한", "작은", "낮은", "적은"]
+LEAK_LIKE_WORDS = ["누수음같은", "누수같은", "누수음처럼", "누수처럼", "누수의심"]  # 녹음 분석 기반 누수음 유사도
+THRESHOLD_OPS = {"이상": "ge", "이하": "le", "초과": "gt", "미만": "lt", "보다큰": "gt", "보다작은": "lt"}
+
+# 해석에 영향 없는 서술어/조사 (신뢰도 계산 시 해석된 것으로 취급)
+FILLER_WORDS = [
+    "들어가줘", "들어가", "진입해줘", "진입", "이동해줘", "이동", "열어줘", "보여줘", "가줘", "해줘",
+    "선택", "페이지", "화면", "지역", "정렬", "누수음", "항목", "으로", "로", "에서", "에", "의", "을", "를",
+    "좀", "줘", "해", "번째", "번", "째",
+]
+
+#-----------------------------------------------------------------------------------------------------------
+# 한국어 서수 → 숫자 (1~99)
+_NATIVE_UNITS = {1: "한", 2: "두", 3: "세", 4: "네", 5: "다섯", 6: "여섯", 7: "일곱", 8: "여덟", 9: "아홉"}
+_NATIVE_TENS = {1: "열", 2: "스물", 3: "서른", 4: "마흔", 5: "쉰", 6: "예순", 7: "일흔", 8: "여든", 9: "아흔"}
+_SINO_DIGITS = {1: "일", 2: "이", 3: "삼", 4: "사", 5: "오", 6: "육", 7: "칠", 8: "팔", 9: "구"}
+
+def _build_ordinal_words():
+    native, sino = {}, {}
+    for n in range(1, 100):
+        tens, units = divmod(n, 10)
+        native[_NATIVE_TENS.get(tens, "") + _NATIVE_UNITS.get(units, "")] = n
+        sino[((_SINO_DIGITS[tens] if tens > 1 else "") + "십" if tens else "") + _SINO_DIGITS.get(units, "")] = n
+    native.update({"첫": 1, "스무": 20, "둘": 2, "셋": 3, "넷": 4})
+    return native, sino
+
+NATIVE_ORDINALS, SINO_NUMBERS = _build_ordinal_words()
+
+def _alternation(words):
+    return "|".join(sorted(map(re.escape, words), key=len, reverse=True))
+
+# 고유어 수사는 "번째"일 때만 서수 ("두번"은 횟수), 한자어/숫자는 "3번", "삼번"도 허용
+# "이번"은 "이번 작업방"처럼 지시어로 쓰이므로 제외
+_ORDINAL_RE = re.compile(
+    r"(?P<native>" + _alternation(NATIVE_ORDINALS) + r")(?:번째|째)"
+    r"|(?P<digit>\d{1,2})(?:번째|번)"
+    r"|(?P<sino>" + _alternation(SINO_NUMBERS) + r")(?:번째|번)"
+)
+
+# 정규화된 문자열에서 서수 표현 찾기 → (숫자, (시작, 끝))
+def find_ordinal(text):
+    for match in _ORDINAL_RE.finditer(text):
+        if match.group("native"):
+            return NATIVE_ORDINALS[match.group("native")], match.span()
+        if match.group("digit"):
+            return int(match.group("digit")), match.span()
+        if match.group(0) != "이번":
+            return SINO_NUMBERS[match.group("sino")], match.span()
+    return None, None
+
+# "상위 5개", "하위 세개"
+_TOP_K_RE = re.compile(r"(?P<side>상위|하위)(?:(?P<digit>\d{1,3})|(?P<native>" + _alternation(NATIVE_ORDINALS) + r"))개")
+# "0.5 이상", "300 미만"
+_THRESHOLD_RE = re.compile(r"(?P<value>\d+(?:\.\d+)?)(?P<op>" + _alternation(THRESHOLD_OPS) + r")")
+
+# 공백/문장부호 제거 (숫자 사이의 소수점은 유지)
+def normalize(text):
+    return re.sub(r"[\s,!?'\"()\-·~]+|(?<!\d)\.|\.(?!\d)", "", text or "")
+
+#-----------------------------------------------------------------------------------------------------------
+@dataclass
+class LocalIntent:
+    action: str = None  # "navigate" | "enter_room" | "play" | "sort" | "query"
+    region: str = None
+    href: str = None
+    room_index: int = None
+    room_keyword: str = None
+    sort_column: str = None  # "strength" | "frequency" | "leak_score"(질의/재생만)
+    sort_order: str = None  # "asc" | "desc"
+    play_row: int = None  # 작업방 진입 후 재생할 누수음 순번 (LLM 해석 결과에서만 사용)
+    top_k: int = None  # 질의: 상위/하위 k개
+    threshold: float = None  # 질의: 기준값
+    threshold_op: str = None  # 질의: "ge" | "le" | "gt" | "lt"
+    confidence: float = 0.0
+
+    @property
+    def confident(self):
+        return self.action is not None and self.confidence >= LOCAL_CONFIDENCE
+
+    # 기존 LLM 파싱 결과와 같은 (selector, region, href, index) 형태로 변환
+    def as_llm_fields(self):
+        selector = f'a[href="{self.href}"]' if self.href else None
+        return selector, self.region, self.href, self.room_index
+
+    def to_dict(self):
+        return asdict(self)
+
+    # LLM JSON 출력 → LocalIntent (스키마 검증은 API가, 지역명 검증은 여기서)
+    @classmethod
+    def from_llm(cls, data, region_value_map):
+        action = data.get("action")
+        page = data.get("page")
+        return cls(
+            action=action if action in ("navigate", "enter_room", "play", "sort") else None,
+            region=snap_region(data.get("region"), region_value_map),
+            href=f"/{page}" if page else None,
+            room_index=data.get("room_index"),
+            room_keyword=data.get("room_name"),
+            sort_column=data.get("sort_column"),
+            sort_order=data.get("sort_order"),
+            play_row=data.get("play_row"),
+            confidence=1.0,
+        )
+
+
+def _find_first(text, words):
+    for word in words:
+        idx = text.find(word)
+        if idx >= 0:
+            return word, (idx, idx + len(word))
+    return None, None
+
+def _region_names(region_value_map):
+    # 긴 이름 우선 ("대전광역시"가 "대전"보다 먼저)
+    names = [(normalize(name), name) for name in region_value_map]
+    return sorted(names, key=lambda item: len(item[0]), reverse=True)
+
+# 발화를 규칙 기반으로 해석 (LLM 호출 없이 처리 가능한 정형 명령용)
+def parse_local_intent(user_input, region_value_map):
+    text = normalize(user_input)
+    intent = LocalIntent()
+    if not text:
+        return intent
+
+    covered = [False] * len(text)
+
+    def cover(span):
+        for i in range(*span):
+            covered[i] = True
+
+    for norm_name, name in _region_names(region_value_map):
+        idx = text.find(norm_name) if norm_name else -1
+        if idx >= 0:
+            intent.region = name
+            cover((idx, idx + len(norm_name)))
+            break
+
+    for alias, href in PAGE_ALIASES:
+        idx = text.find(alias)
+        if idx >= 0:
+            intent.href = href
+            cover((idx, idx + len(alias)))
+            break
+
+    index, span = find_ordinal(text)
+    if span:
+        intent.room_index = index
+        cover(span)
+
+    column_word, column_span = _find_first(text, [w for w, _ in SORT_COLUMNS])
+    play_word, play_span = _find_first(text, PLAY_WORDS)
+    room_span = (text.find("작업방"), text.find("작업방") + 3) if "작업방" in text else None
+    top_word, top_span = _find_first(text, TOP_WORDS)
+    leak_word, leak_span = _find_first(text, LEAK_LIKE_WORDS)
+    top_k_match = _TOP_K_RE.search(text)
+    threshold_match = _THRESHOLD_RE.search(text)
+
+    def rank_by_column(descending):
+        # 열 이름이 없으면 강도 기준 ("가장 강한 누수음"), "누수음 같은"이면 녹음 분석 유사도 기준
+        if leak_word:
+            intent.sort_column = "leak_score"
+            cover(leak_span)
+        else:
+            intent.sort_column = dict(SORT_COLUMNS)[column_word] if column_word else "strength"
+            cover(column_span or (0, 0))
+        intent.sort_order = "desc" if descending else "asc"
+
+    if column_word and "정렬" in text:
+        intent.action = "sort"
+        intent.sort_column = dict(SORT_COLUMNS)[column_word]
+        cover(column_span)
+        asc_word, asc_span = _find_first(text, ASC_WORDS)
+        desc_word, desc_span = _find_first(text, DESC_WORDS)
+        intent.sort_order = "asc" if asc_word else "desc"  # 기본값은 기존 동작과 같이 내림차순
+        cover(asc_span or desc_span or (0, 0))
+    elif threshold_match:
+        intent.action = "query"
+        intent.threshold = float(threshold_match.group("value"))
+        intent.threshold_op = THRESHOLD_OPS[threshold_match.group("op")]
+        rank_by_column(intent.threshold_op in ("ge", "gt"))
+        cover(threshold_match.span())
+    elif top_k_match:
+        intent.action = "query"
+        digit, native = top_k_match.group("digit"), top_k_match.group("native")
+        intent.top_k = int(digit) if digit else NATIVE_ORDINALS[native]
+        rank_by_column(top_k_match.group("side") == "상위")
+        cover(top_k_match.span())
+    elif (top_word or leak_word) and intent.room_index is None:
+        # "가장 강한 누수음 재생", "누수음 같은 거 틀어줘" → 재생, 재생어가 없으면 1개 질의
+        large_word, large_span = _find_first(text, LARGE_WORDS)
+        small_word, small_span = _find_first(text, SMALL_WORDS)
+        rank_by_column(not small_word or bool(large_word and large_span[0] < small_span[0]))
+        cover(top_span or (0, 0))
+        cover(large_span or small_span or (0, 0))
+        if play_word:
+            intent.action = "play"
+            cover(play_span)
+        else:
+            intent.action = "query"
+            intent.top_k = 1
+    elif play_word:
+        cover(play_span)
+        if intent.room_index is not None:
+            intent.action = "play"
+    elif room_span:
+        cover(room_span)
+        intent.action = "enter_room"
+        if intent.room_index is None:
+            # 작업방 이름/번호: 서술어를 뺀 나머지
+            keyword = user_input.replace("작업방", "")
+            for word in ["들어가줘", "진입해줘", "진입", "들어가"]:
+                keyword = keyword.replace(word, "")
+            intent.room_keyword = keyword.strip() or None
+            if intent.room_keyword:
+                intent.region = None  # 작업방 이름 안에 들어있는 지역명은 지역 선택이 아님
+                cover((0, len(text)))
+            else:
+                intent.action = None
+    elif intent.room_index is not None:
+        intent.action = "enter_room"
+    elif intent.href:
+        intent.action = "navigate"
+
+    for word in FILLER_WORDS:
+        for match in re.finditer(re.escape(word), text):
+            cover(match.span())
+
+    intent.confidence = sum(covered) / len(text)
+    return intent
+
+#-----------------------------------------------------------------------------------------------------------
+def _overlap(query_grams, grams):
+    return sum(min(count, query_grams[gram]) for gram, count in grams.items() if gram in query_grams)
+
+# 지역명 n-gram 중 발화에 들어있는 비율 (긴 발화 안에서 지역명 찾기용)
+def _coverage(query_grams, name):
+    grams = jamo_ngrams(normalize(name))
+    return _overlap(query_grams, grams) / sum(grams.values())
+
+# Dice 계수 (지역명끼리 비교용)
+def _dice(query_grams, name):
+    grams = jamo_ngrams(normalize(name))
+    return 2 * _overlap(query_grams, grams) / (sum(grams.values()) + sum(query_grams.values()))
+
+# 발화와 자모 n-gram이 많이 겹치는 지역명 상위 k개 (LLM 프롬프트용 후보)
+def region_candidates(user_input, region_value_map, k=REGION_CANDIDATES):
+    query = jamo_ngrams(normalize(user_input))
+    scored = sorted(((_coverage(query, name), name) for name in region_value_map), reverse=True)
+    return [name for score, name in scored[:k] if score > 0]
+
+# LLM이 준 지역명을 region_value_map의 이름으로 보정 (찾지 못하면 None)
+def snap_region(region, region_value_map):
+    if not region or region in region_value_map:
+        return region
+    query = jamo_ngrams(normalize(region))
+    score, name = max(((_dice(query, name), name) for name in region_value_map), default=(0, None))
+    if score >= REGION_SNAP_SCORE:
+        print(f"🗺️ 지역명 보정: '{region}' → '{name}' (점수 {score:.2f})")
+        return name
+    print(f"❌ 알 수 없는 지역명: {region} (region_value_map에 없음)")
+    return None
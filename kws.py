@@ -0,0 +1,279 @@
+import argparse
+import glob
+import os
+import time
+import wave
+import numpy as np
+
+RATE = 16000
+TEMPLATE_DIR = "trigger_templates"  # 등록된 "하이" 샘플(WAV) 폴더
+
+# 1단계: 에너지 게이트
+ENERGY_GATE_DBFS = float(os.getenv("NELOW_ENERGY_GATE_DBFS", "-45"))  # 이보다 조용하면 음성 없음으로 간주
+# 2단계: MFCC + DTW 키워드 스포터
+KWS_THRESHOLD = float(os.getenv("NELOW_KWS_THRESHOLD", "12.0"))  # DTW 거리 (작을수록 유사)
+
+FRAME_LEN = 400  # 25ms
+FRAME_HOP = 160  # 10ms
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+
+# WAV 파일 → int16 모노 배열
+def load_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getframerate() != RATE:
+            raise ValueError(f"16kHz/16bit WAV만 지원합니다: {path}")
+        data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            data = data.reshape(-1, wf.getnchannels())[:, 0]
+    return data
+
+def save_wav(path, samples):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+
+# 전체 구간 RMS (dBFS)
+def rms_dbfs(samples):
+    if len(samples) == 0:
+        return -120.0
+    x = samples.astype(np.float32) / 32768.0
+    return float(10 * np.log10(np.mean(x * x) + 1e-12))
+
+# 짧은 프레임 단위 에너지 중 최대값이 게이트를 넘는지 확인 (순간적인 "하이"도 통과)
+def energy_gate(samples, threshold_dbfs=ENERGY_GATE_DBFS):
+    frames = frame_signal(samples.astype(np.float32) / 32768.0)
+    if len(frames) == 0:
+        return False
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+    return bool(energy.max() >= threshold_dbfs)
+
+#-----------------------------------------------------------------------------------------------------------
+# MFCC 특징 추출 (NumPy만 사용)
+def frame_signal(x, frame_len=FRAME_LEN, hop=FRAME_HOP):
+    if len(x) < frame_len:
+        return np.zeros((0, frame_len), dtype=x.dtype)
+    n = 1 + (len(x) - frame_len) // hop
+    idx = np.arange(frame_len)[None, :] + hop * np.arange(n)[:, None]
+    return x[idx]
+
+def _mel_filterbank(rate=RATE, n_fft=N_FFT, n_mels=N_MELS):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595.0) - 1)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / rate).astype(int)
+    fb = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            fb[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            fb[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fb
+
+def _dct_matrix(n_in=N_MELS, n_out=N_MFCC):
+    n = np.arange(n_in)
+    k = np.arange(n_out)[:, None]
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)).astype(np.float32)
+
+MEL_FB = _mel_filterbank()
+DCT = _dct_matrix()
+WINDOW = np.hamming(FRAME_LEN).astype(np.float32)
+
+def mfcc(samples):
+    x = samples.astype(np.float32) / 32768.0
+    x = np.append(x[:1], x[1:] - 0.97 * x[:-1])  # pre-emphasis
+    frames = frame_signal(x) * WINDOW
+    if len(frames) == 0:
+        return np.zeros((0, N_MFCC), dtype=np.float32)
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2 / N_FFT
+    log_mel = np.log(power @ MEL_FB.T + 1e-10)
+    feats = log_mel @ DCT.T
+    return feats - feats.mean(axis=0)  # 켑스트럼 평균 정규화 (마이크/채널 차이 보정)
+
+# 부분열 DTW: 템플릿이 윈도우 안 어디에서 시작/끝나도 되는 정렬 거리 (템플릿 프레임 수로 정규화)
+def subsequence_dtw(template, query):
+    if len(template) == 0 or len(query) == 0:
+        return np.inf
+    cost = np.sqrt(((template[:, None, :] - query[None, :, :]) ** 2).sum(axis=2))
+    prev = cost[0].copy()  # 시작 위치 자유
+    for i in range(1, len(template)):
+        c = cost[i]
+        diag = np.concatenate(([np.inf], prev[:-1]))
+        a = c + np.minimum(prev, diag)
+        # D[j] = min(a[j], D[j-1] + c[j]) 를 누적 최소값으로 벡터화
+        s = np.cumsum(c)
+        prev = s + np.minimum.accumulate(a - s)
+    return float(prev.min() / len(template))
+
+#-----------------------------------------------------------------------------------------------------------
+# 등록된 템플릿과 비교하는 경량 키워드 스포터
+class KeywordSpotter:
+    def __init__(self, template_dir=TEMPLATE_DIR, threshold=KWS_THRESHOLD):
+        self.threshold = threshold
+        self.templates = []
+        for path in sorted(glob.glob(os.path.join(template_dir, "*.wav"))):
+            try:
+                self.templates.append(mfcc(load_wav(path)))
+            except Exception as e:
+                print(f"⚠️ 템플릿 로드 실패: {path} ({e})")
+
+    @property
+    def enabled(self):
+        return bool(self.templates)
+
+    def score(self, samples):
+        feats = mfcc(samples)
+        return min(subsequence_dtw(t, feats) for t in self.templates)
+
+    def detect(self, samples):
+        score = self.score(samples)
+        return score <= self.threshold, score
+
+
+# 단계별 통과 횟수와 CPU 사용률 집계
+class TriggerStats:
+    def __init__(self):
+        self.windows = 0
+        self.gate_passed = 0
+        self.kws_candidates = 0
+        self.confirmed = 0
+        self.rejected = 0  # KWS 후보였지만 Whisper가 기각 (KWS 오수락)
+        self.throttled = 0  # KWS 없이 Whisper 확인 간격 제한으로 건너뛴 윈도우
+        self.started_wall = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+    @property
+    def cpu_percent(self):
+        wall = time.perf_counter() - self.started_wall
+        return 100.0 * (time.process_time() - self.started_cpu) / wall if wall > 0 else 0.0
+
+    def report(self):
+        kws_fa = self.rejected / self.kws_candidates if self.kws_candidates else 0.0
+        return (f"윈도우 {self.windows} | 게이트 통과 {self.gate_passed} | KWS 후보 {self.kws_candidates} | "
+                f"Whisper 확정 {self.confirmed} / 기각 {self.rejected} (KWS 오수락률 {kws_fa:.1%}) | "
+                + (f"간격 제한 {self.throttled} | " if self.throttled else "")
+                + f"CPU {self.cpu_percent:.1f}%")
+
+
+# 에너지 게이트 → KWS → Whisper 확인 순서의 단계형 트리거 검출기
+# 템플릿이 없으면(KWS 없음) Whisper 확인을 윈도우 길이마다 최대 한 번으로 제한
+# → 확인한 윈도우끼리 빈틈없이 이어지면서 겹치는 윈도우를 매번 디코딩하지 않음 (기존 3초 단위 인식과 같은 부하)
+class TriggerDetector:
+    def __init__(self, confirm, spotter=None, gate_dbfs=ENERGY_GATE_DBFS, clock=time.monotonic):
+        self.confirm = confirm  # 후보 윈도우를 받아 True/False를 돌려주는 Whisper 확인 함수
+        self.spotter = spotter or KeywordSpotter()
+        self.gate_dbfs = gate_dbfs
+        self.stats = TriggerStats()
+        self._clock = clock
+        self._last_confirm = None
+        if not self.spotter.enabled:
+            print(f"⚠️ '{TEMPLATE_DIR}'에 등록된 템플릿이 없어 KWS 단계를 건너뜁니다. (python kws.py enroll)")
+            print("⚠️ Whisper 확인은 윈도우 길이마다 한 번으로 제한됩니다. 템플릿을 등록하면 반응이 빨라집니다.")
+
+    def process(self, window):
+        self.stats.windows += 1
+        if not energy_gate(window, self.gate_dbfs):
+            return False
+        self.stats.gate_passed += 1
+
+        if self.spotter.enabled:
+            hit, score = self.spotter.detect(window)
+            if not hit:
+                return False
+            print(f"🔎 KWS 후보 감지 (DTW 거리 {score:.2f})")
+        else:
+            now = self._clock()
+            if self._last_confirm is not None and now - self._last_confirm < len(window) / RATE:
+                self.stats.throttled += 1
+                return False
+            self._last_confirm = now
+        self.stats.kws_candidates += 1
+
+        if self.confirm(window):
+            self.stats.confirmed += 1
+            return True
+        self.stats.rejected += 1
+        return False
+
+#-----------------------------------------------------------------------------------------------------------
+# 트리거 샘플 등록: 마이크로 "하이"를 n번 녹음해서 템플릿 폴더에 저장
+def enroll(count, seconds=1.5, template_dir=TEMPLATE_DIR):
+    from audio_capture import AudioCapture
+
+    os.makedirs(template_dir, exist_ok=True)
+    with AudioCapture() as capture:
+        for i in range(count):
+            input(f"⏺️ [{i + 1}/{count}] 엔터를 누르고 '하이'라고 말하세요...")
+            start = capture.position
+            capture.ring.wait_until(start + capture.seconds_to_samples(seconds))
+            samples = capture.ring.read(start, start + capture.seconds_to_samples(seconds))
+            path = os.path.join(template_dir, f"hi_{int(time.time() * 1000)}.wav")
+            save_wav(path, samples)
+            print(f"✅ 저장: {path}")
+
+# 라벨링된 샘플로 단계별 오수락/오거부율 측정 (data_dir/positive, data_dir/negative)
+def evaluate(data_dir, thresholds=None, use_whisper=False):
+    positives = [load_wav(p) for p in sorted(glob.glob(os.path.join(data_dir, "positive", "*.wav")))]
+    negatives = [load_wav(p) for p in sorted(glob.glob(os.path.join(data_dir, "negative", "*.wav")))]
+    if not positives or not negatives:
+        print("❌ positive/negative 샘플이 모두 필요합니다.")
+        return
+
+    spotter = KeywordSpotter()
+    if not spotter.enabled:
+        print("❌ 등록된 템플릿이 없습니다.")
+        return
+
+    started = time.process_time()
+    pos_gate = np.array([energy_gate(x) for x in positives])
+    neg_gate = np.array([energy_gate(x) for x in negatives])
+    pos_scores = np.array([spotter.score(x) for x in positives])
+    neg_scores = np.array([spotter.score(x) for x in negatives])
+    per_window_ms = 1000 * (time.process_time() - started) / (len(positives) + len(negatives))
+
+    print(f"📂 positive {len(positives)}개 / negative {len(negatives)}개, 게이트+KWS CPU {per_window_ms:.1f}ms/윈도우")
+    print(f"🔋 에너지 게이트: 오거부 {np.mean(~pos_gate):.1%}, 통과율(negative) {np.mean(neg_gate):.1%}")
+
+    if thresholds is None:
+        thresholds = np.linspace(np.percentile(pos_scores, 5), np.percentile(neg_scores, 95), 10)
+    print("📊 KWS 임계값별 (게이트 포함)")
+    for th in thresholds:
+        frr = np.mean(~(pos_gate & (pos_scores <= th)))
+        far = np.mean(neg_gate & (neg_scores <= th))
+        print(f"   threshold {th:6.2f} → 오수락률 {far:6.1%}, 오거부율 {frr:6.1%}")
+
+    if use_whisper:
+        from trigger import confirm_trigger
+
+        pos_hit = pos_gate & (pos_scores <= spotter.threshold)
+        neg_hit = neg_gate & (neg_scores <= spotter.threshold)
+        pos_final = [confirm_trigger(x) for x, h in zip(positives, pos_hit) if h]
+        neg_final = [confirm_trigger(x) for x, h in zip(negatives, neg_hit) if h]
+        frr = 1 - sum(pos_final) / len(positives)
+        far = sum(neg_final) / len(negatives)
+        print(f"🧠 전체 캐스케이드 (threshold {spotter.threshold}): 오수락률 {far:.1%}, 오거부율 {frr:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="'하이' 트리거 키워드 스포터")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_enroll = sub.add_parser("enroll", help="트리거 샘플 녹음/등록")
+    p_enroll.add_argument("count", type=int, nargs="?", default=5)
+    p_eval = sub.add_parser("eval", help="오수락/오거부율 측정")
+    p_eval.add_argument("data_dir")
+    p_eval.add_argument("--whisper", action="store_true", help="Whisper 확인 단계까지 포함")
+    args = parser.parse_args()
+
+    if args.cmd == "enroll":
+        enroll(args.count)
+    else:
+        evaluate(args.data_dir, use_whisper=args.whisper)
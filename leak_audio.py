@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import wave
+from urllib.parse import urljoin
+import numpy as np
+
+# 작업방 누수음 전체를 내려받아 NumPy로 일괄 분석 (FFT 최대 주파수, 대역 에너지, RMS, 스펙트럼 평탄도)
+# 특징값은 오디오 내용 해시로 디스크 캐시 → 같은 녹음은 다시 분석하지 않음
+# 사용: python leak_audio.py --region 서산 --page leak-master --room 3
+
+CACHE_PATH = os.path.join(".nelow_cache", "leak_audio.sqlite")
+FEATURE_VERSION = 1  # 특징 계산 방식이 바뀌면 올려서 캐시 무효화
+DOWNLOAD_CONCURRENCY = int(os.getenv("NELOW_AUDIO_DOWNLOADS", "8"))
+SOURCE_TIMEOUT_MS = 2000  # (대체 경로) 행 클릭 후 오디오 src가 바뀌기를 기다리는 최대 시간
+COLLECT_TOTAL_TIMEOUT_MS = int(os.getenv("NELOW_AUDIO_COLLECT_TIMEOUT_MS", "15000"))  # 행 클릭 수집 전체 제한 시간
+# 누수음 레코드에서 오디오 주소로 볼 키 후보 (소문자, 밑줄 무시) - 값이 오디오 확장자로 끝나면 키 이름과 관계없이 사용
+AUDIO_URL_KEYS = [k.strip().lower() for k in os.getenv(
+    "NELOW_API_AUDIO_KEYS", "audio,audiourl,wav,wavurl,wavpath,file,fileurl,filepath,src,url"
+).split(",") if k.strip()]
+AUDIO_URL_RE = re.compile(r"\.(wav|mp3|ogg|m4a|aac|flac|webm)(\?|#|$)", re.IGNORECASE)
+
+FRAME_SECONDS = 0.128  # FFT 프레임 길이 (2의 거듭제곱 샘플 수로 맞춤)
+MIN_FREQUENCY = 50  # 이보다 낮은 주파수(직류/험)는 최대 주파수·평탄도 계산에서 제외
+BANDS = [(50, 250), (250, 500), (500, 1000), (1000, 2000), (2000, 4000)]
+LEAK_BAND = tuple(float(v) for v in os.getenv("NELOW_LEAK_BAND", "100,2500").split(","))  # 누수음 주 대역 (Hz)
+FREQUENCY_TOLERANCE = 0.05  # 사이트 Max Frequency와 비교할 때 허용 상대 오차 (+ FFT 2칸)
+
+# 행 요소 안의 오디오 주소 (링크/data 속성/source 요소, 화면 행 순서, 없으면 null)
+ROW_AUDIO_SOURCES_JS = """
+(rowSelector) => Array.from(document.querySelectorAll(rowSelector)).map(row => {
+    const el = row.querySelector("[data-src], [data-url], [data-audio], source[src], audio[src], a[href]");
+    if (!el) return null;
+    return el.getAttribute("data-src") || el.getAttribute("data-url") || el.getAttribute("data-audio")
+        || el.getAttribute("src") || el.getAttribute("href");
+})
+"""
+
+# (대체 경로, 보조 탭 전용) 표의 행을 차례로 눌러 오디오 src만 모음 - 행당 timeoutMs, 전체 totalMs 제한
+COLLECT_AUDIO_SOURCES_JS = """
+async ([rowSelector, audioSelector, timeoutMs, totalMs]) => {
+    const audio = document.querySelector(audioSelector);
+    if (!audio) return null;
+    const current = () => audio.currentSrc || audio.src || "";
+    const deadline = performance.now() + totalMs;
+    const sources = [];
+    let previous = current();
+    for (const row of document.querySelectorAll(rowSelector)) {
+        if (performance.now() > deadline) {
+            sources.push(null);
+            continue;
+        }
+        row.click();
+        const started = performance.now();
+        while (current() === previous && performance.now() - started < timeoutMs && performance.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, 10));
+        }
+        audio.pause();
+        const src = current();
+        sources.push(src && src !== previous ? src : null);
+        previous = src;
+    }
+    return sources;
+}
+"""
+
+
+# 내용 해시(sha256) → 특징값, URL → 해시 디스크 캐시
+# URL 색인은 다운로드 생략용, 서명 토큰 등으로 URL이 바뀌어도 내용이 같으면 분석은 생략됨
+class FeatureCache:
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS features (
+                sha TEXT PRIMARY KEY,
+                version INTEGER,
+                data TEXT,
+                created REAL
+            )
+        """)
+        self._db.execute("CREATE TABLE IF NOT EXISTS sources (url TEXT PRIMARY KEY, sha TEXT, fetched REAL)")
+        self._db.commit()
+
+    # URL → 해시 (현재 FEATURE_VERSION 특징값이 있을 때만, 없으면 다시 받아 분석해야 하므로 None)
+    def sha_for_url(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT s.sha FROM sources s JOIN features f ON f.sha = s.sha AND f.version = ? WHERE s.url = ?",
+                (FEATURE_VERSION, url),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, sha):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM features WHERE sha = ? AND version = ?", (sha, FEATURE_VERSION)
+            ).fetchone()
+        if row:
+            self.hits += 1
+            return json.loads(row[0])
+        self.misses += 1
+        return None
+
+    def put_many(self, features_by_sha, sources):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO features (sha, version, data, created) VALUES (?, ?, ?, ?)",
+                [(sha, FEATURE_VERSION, json.dumps(f), now) for sha, f in features_by_sha.items()],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sources (url, sha, fetched) VALUES (?, ?, ?)",
+                [(url, sha, now) for url, sha in sources.items()],
+            )
+            self._db.commit()
+
+    def stats(self):
+        return f"특징 캐시 적중 {self.hits} / 새로 분석 {self.misses}"
+
+
+_cache = None
+
+def get_feature_cache():
+    global _cache
+    if _cache is None:
+        _cache = FeatureCache()
+    return _cache
+
+#-----------------------------------------------------------------------------------------------------------
+# 오디오 바이트 → (float32 모노 샘플, 샘플레이트)
+# WAV(PCM)는 직접 해석, 그 외 형식은 whisper의 ffmpeg 디코더 사용 (16kHz로 변환됨)
+def decode_audio(data):
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+            raw = wf.readframes(wf.getnframes())
+        if width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif width in (2, 4):
+            dtype = np.int16 if width == 2 else np.int32
+            samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+        else:
+            raise wave.Error(f"unsupported sample width {width}")
+        return samples.reshape(-1, channels).mean(axis=1), rate
+    except (wave.Error, EOFError):
+        import whisper
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        try:
+            return whisper.load_audio(f.name), whisper.audio.SAMPLE_RATE
+        finally:
+            os.unlink(f.name)
+
+# 샘플레이트별로 모든 녹음의 프레임을 한 행렬로 모아 rfft 한 번에 계산 → 녹음별 평균 스펙트럼
+def compute_features(clips):
+    features = [None] * len(clips)
+    by_rate = {}
+    for i, (samples, rate) in enumerate(clips):
+        by_rate.setdefault(rate, []).append(i)
+
+    for rate, indices in by_rate.items():
+        n_fft = 1 << int(np.ceil(np.log2(rate * FRAME_SECONDS)))
+        hop = n_fft // 2
+        window = np.hanning(n_fft).astype(np.float32)
+        frames, starts, total_frames = [], [], 0
+        for i in indices:
+            samples = clips[i][0]
+            if len(samples) < n_fft:
+                samples = np.pad(samples, (0, n_fft - len(samples)))
+            starts.append(total_frames)
+            frames.append(np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop])
+            total_frames += len(frames[-1])
+        frames = np.concatenate(frames)
+        starts = np.array(starts)
+        counts = np.diff(np.append(starts, len(frames)))
+
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        spectrum = np.add.reduceat(power, starts, axis=0) / counts[:, None]
+        frame_rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        rms_mean = np.add.reduceat(frame_rms, starts) / counts
+        rms_std = np.sqrt(np.maximum(np.add.reduceat(frame_rms ** 2, starts) / counts - rms_mean ** 2, 0))
+
+        freqs = np.fft.rfftfreq(n_fft, 1 / rate)
+        usable = freqs >= MIN_FREQUENCY
+        band_power = spectrum[:, usable] + 1e-12
+        total = band_power.sum(axis=1)
+        peak = freqs[usable][np.argmax(band_power, axis=1)]
+        flatness = np.exp(np.mean(np.log(band_power), axis=1)) / np.mean(band_power, axis=1)
+        bands = np.stack([spectrum[:, (freqs >= lo) & (freqs < hi)].sum(axis=1) for lo, hi in BANDS], axis=1)
+        leak_band = spectrum[:, (freqs >= LEAK_BAND[0]) & (freqs < LEAK_BAND[1])].sum(axis=1)
+
+        for j, i in enumerate(indices):
+            samples = clips[i][0]
+            features[i] = {
+                "rms": float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0,
+                "peak_hz": float(peak[j]),
+                "flatness": float(flatness[j]),
+                "bands": [float(v) for v in bands[j] / total[j]],
+                "leak_band": float(leak_band[j] / total[j]),
+                "stationarity": float(1 / (1 + rms_std[j] / max(rms_mean[j], 1e-12))),  # 1에 가까울수록 연속음
+                "resolution_hz": float(rate / n_fft),
+                "seconds": len(samples) / rate,
+            }
+    return features
+
+# 누수음 유사도 (0~1): 크기(묶음 내 최대 대비) × 음색성(1 - 평탄도) × 누수 대역 비율 × 연속성
+def leak_scores(features):
+    valid = [f for f in features if f]
+    if not valid:
+        return np.full(len(features), np.nan)
+    max_rms = max(f["rms"] for f in valid) or 1.0
+    return np.array([
+        f["rms"] / max_rms * (1 - f["flatness"]) * f["leak_band"] * f["stationarity"] if f else np.nan
+        for f in features
+    ])
+
+#-----------------------------------------------------------------------------------------------------------
+# 표에서 오디오 주소 열 찾기: 키 이름 후보이면서 주소 형태이거나, 값 대부분이 오디오 확장자로 끝나는 열
+def find_audio_column(table):
+    for header in table.headers:
+        values = [v for v in table.text[header] if v]
+        if not values:
+            continue
+        looks_like_audio = sum(1 for v in values if AUDIO_URL_RE.search(v)) * 2 >= len(values)
+        named = header.lower().replace("_", "") in AUDIO_URL_KEYS and all(
+            v.startswith(("http://", "https://", "/")) for v in values)
+        if looks_like_audio or named:
+            return header
+    return None
+
+# (강도, 주파수) 값으로 다른 순서의 행 목록을 표 행 순서에 맞춤 (같은 값이 여러 행이면 구분할 수 없어 None)
+def align_by_values(table, other, sources):
+    def keys(t):
+        strength, frequency = t.numeric("strength"), t.numeric("frequency")
+        if strength is None or frequency is None:
+            return None
+        return [(round(s, 3), round(f, 3)) for s, f in zip(strength, frequency)]
+
+    table_keys, other_keys = keys(table), keys(other)
+    if table_keys is None or other_keys is None:
+        return None
+    by_key = {}
+    for key, src in zip(other_keys, sources):
+        by_key.setdefault(key, []).append(src)
+    return [by_key[key][0] if len(by_key.get(key, ())) == 1 else None for key in table_keys]
+
+def _absolute(page, sources):
+    return [urljoin(page.url, src) if src else None for src in sources]
+
+# (대체 경로) 보조 탭에서 같은 지역/화면/작업방을 열고 행을 눌러 주소 수집
+# 운영자 탭의 재생기/재생 위치는 건드리지 않고, 클릭으로 생기는 오디오 요청은 막아 두 번 받지 않음
+async def collect_sources_by_clicking(page, table, row_selector, audio_selector):
+    from nelow import (
+        MONITORING_ROOM_ITEMS, enter_leak_room, enter_monitoring_room, ensure_region_selected,
+    )
+    from nav_state import navigation_state
+    from page_helpers import new_tracked_page
+    from leak_table import extract_leak_table
+
+    nav = navigation_state(page)
+    if nav.room is None or nav.region is None:
+        return None
+    item_selector, room_index, _ = nav.room
+    secondary = await new_tracked_page(page.context)
+    try:
+        await secondary.route("**/*", lambda route: route.abort() if route.request.resource_type == "media"
+                              else route.continue_())
+        await secondary.goto(page.url)
+        await page.bring_to_front()
+        if not await ensure_region_selected(secondary, urljoin(page.url, "/"), nav.region):
+            return None
+        if item_selector == MONITORING_ROOM_ITEMS:
+            entered = await enter_monitoring_room(secondary, room_index=room_index + 1)
+        else:
+            entered = await enter_leak_room(secondary, room_index=room_index)
+        if not entered:
+            return None
+        await secondary.wait_for_selector(row_selector, timeout=10000)
+        sources = await secondary.evaluate(
+            COLLECT_AUDIO_SOURCES_JS, [row_selector, audio_selector, SOURCE_TIMEOUT_MS, COLLECT_TOTAL_TIMEOUT_MS])
+        other = await extract_leak_table(secondary)
+        if sources is None or other is None or len(other) != len(sources):
+            return None
+        return align_by_values(table, other, sources)
+    finally:
+        await secondary.close()
+
+# 현재 누수음 표의 행별 오디오 URL (표 행 순서, 못 찾은 행은 None)
+# 우선순위: 표(API 레코드)의 주소 열 → 가로챈 누수음 레코드를 값으로 맞춤 → 행 요소 속성 → 보조 탭에서 행 클릭
+async def collect_audio_sources(page, table, row_selector, audio_selector):
+    from api_capture import api_capture
+    from leak_table import LeakTable
+
+    started = time.perf_counter()
+    sources, origin = None, None
+    header = find_audio_column(table)
+    if header is not None:
+        sources, origin = list(table.text[header]), "표"
+    if sources is None:
+        records = await api_capture(page).get_leaks()
+        if records:
+            other = LeakTable.from_records(records)
+            header = find_audio_column(other)
+            if header is not None:
+                sources, origin = align_by_values(table, other, list(other.text[header])), "API 응답"
+    if not sources or not any(sources):
+        row_sources = await page.evaluate(ROW_AUDIO_SOURCES_JS, row_selector)
+        if len(row_sources) == len(table) and any(src and AUDIO_URL_RE.search(src) for src in row_sources):
+            sources, origin = row_sources, "행 속성"
+    if not sources or not any(sources):
+        sources, origin = await collect_sources_by_clicking(page, table, row_selector, audio_selector), "보조 탭 클릭"
+    if sources is None:
+        print("❌ 오디오 주소를 찾을 수 없습니다.")
+        return []
+    sources = _absolute(page, sources)
+    print(f"🔗 오디오 주소 수집 ({origin}): {sum(1 for s in sources if s)}/{len(sources)}개 "
+          f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return sources
+
+# 로그인된 브라우저 컨텍스트의 쿠키로 동시 다운로드 → {url: 바이트} (현재 버전 특징값이 캐시에 있는 URL은 생략)
+async def download_sources(context, urls, cache, concurrency=DOWNLOAD_CONCURRENCY):
+    semaphore = asyncio.Semaphore(concurrency)
+    downloaded = {}
+
+    async def fetch(url):
+        async with semaphore:
+            try:
+                response = await context.request.get(url)
+                if response.ok:
+                    downloaded[url] = await response.body()
+                else:
+                    print(f"⚠️ 오디오 다운로드 실패 ({response.status}): {url}")
+            except Exception as e:
+                print(f"⚠️ 오디오 다운로드 실패: {url} ({e})")
+
+    started = time.perf_counter()
+    todo = [url for url in dict.fromkeys(urls) if cache.sha_for_url(url) is None]
+    await asyncio.gather(*(fetch(url) for url in todo))
+    size = sum(len(d) for d in downloaded.values())
+    print(f"⬇️ 오디오 다운로드 {len(downloaded)}/{len(todo)}개 {size / 1e6:.1f}MB "
+          f"({(time.perf_counter() - started) * 1000:.0f}ms, 동시 {concurrency})")
+    return downloaded
+
+# URL 목록 → URL과 같은 순서의 특징값 목록 (캐시 우선, 새로 받은 것만 일괄 분석)
+async def analyze_sources(context, urls, cache=None):
+    cache = cache or get_feature_cache()
+    downloaded = await download_sources(context, [u for u in urls if u], cache)
+
+    started = time.perf_counter()
+    shas = {url: cache.sha_for_url(url) for url in urls if url and url not in downloaded}
+    pending = {}
+    for url, data in downloaded.items():
+        sha = shas[url] = hashlib.sha256(data).hexdigest()
+        pending.setdefault(sha, data)
+    features = {sha: cache.get(sha) for sha in set(shas.values()) if sha}
+    todo = [sha for sha, f in features.items() if f is None and sha in pending]
+
+    if todo:
+        def analyze():
+            return compute_features([decode_audio(pending[sha]) for sha in todo])
+        for sha, f in zip(todo, await asyncio.to_thread(analyze)):
+            features[sha] = f
+    cache.put_many({sha: features[sha] for sha in todo}, {url: shas[url] for url in downloaded})
+    print(f"🔬 누수음 {len(todo)}개 분석 ({(time.perf_counter() - started) * 1000:.0f}ms, {cache.stats()})")
+    return [features.get(shas.get(url)) if url else None for url in urls]
+
+# 현재 누수음 표에 누수음 유사도 열("leak_score") 추가
+async def add_leak_scores(page, table, row_selector, audio_selector):
+    sources = await collect_audio_sources(page, table, row_selector, audio_selector)
+    if len(sources) != len(table):
+        print(f"⚠️ 오디오 주소 수({len(sources)})가 표 행 수({len(table)})와 달라 분석할 수 없습니다.")
+        return None
+    features = await analyze_sources(page.context, sources)
+    cross_check(table, features)
+    return table.with_column("leak_score", [f"{s:.4f}" if not np.isnan(s) else "" for s in leak_scores(features)])
+
+# 사이트 Strength/Max Frequency 열과 분석값 비교 (강도-RMS 순위 상관, 최대 주파수 일치율)
+def cross_check(table, features, show=5):
+    rows = np.array([i for i, f in enumerate(features) if f])
+    if not len(rows):
+        return None
+    result = {"rows": len(rows)}
+    strength = table.numeric("strength")
+    if strength is not None:
+        ok = ~np.isnan(strength[rows])
+        if ok.sum() > 2:
+            site = strength[rows][ok].argsort().argsort()
+            ours = np.array([features[i]["rms"] for i in rows[ok]]).argsort().argsort()
+            result["strength_rank_corr"] = float(np.corrcoef(site, ours)[0, 1])
+            print(f"📈 Strength ↔ RMS 순위 상관계수: {result['strength_rank_corr']:.3f} ({ok.sum()}개)")
+
+    frequency = table.numeric("frequency")
+    if frequency is not None:
+        ok = ~np.isnan(frequency[rows])
+        site = frequency[rows][ok]
+        peak = np.array([features[i]["peak_hz"] for i in rows[ok]])
+        tolerance = np.maximum(site * FREQUENCY_TOLERANCE, [2 * features[i]["resolution_hz"] for i in rows[ok]])
+        mismatch = np.abs(peak - site) > tolerance
+        if len(site):
+            result["frequency_agreement"] = float(1 - mismatch.mean())
+            print(f"📈 Max Frequency ↔ FFT 최대 주파수 일치율: {result['frequency_agreement'] * 100:.1f}% ({len(site)}개)")
+        for row, s, p in list(zip(rows[ok][mismatch], site[mismatch], peak[mismatch]))[:show]:
+            print(f"  ⚠️ {row + 1}번째 행: 사이트 {s:g}Hz / 분석 {p:.0f}Hz")
+    return result
+
+#-----------------------------------------------------------------------------------------------------------
+async def main():
+    from nelow import (
+        LEAK_ROW_SELECTOR, AUDIO_SELECTOR, create_logged_in_session, ensure_region_selected,
+        enter_leak_room, enter_monitoring_room, leak_table_from_api, load_region_value_map,
+    )
+    from leak_table import extract_leak_table
+
+    parser = argparse.ArgumentParser(description="작업방 누수음 일괄 분석")
+    parser.add_argument("--region", required=True)
+    parser.add_argument("--page", default="leak-master", choices=["leak-master", "water-leak-logger", "leak-monitoring"])
+    parser.add_argument("--room", type=int, required=True, help="작업방 순번 (음성 명령의 'n번째 작업방'과 같은 값)")
+    parser.add_argument("--top", type=int, default=5, help="누수음 유사도 상위 몇 개를 보여줄지")
+    parser.add_argument("--base-url", default="https://kr.neverlosewater.com/")
+    args = parser.parse_args()
+
+    region_value_map = load_region_value_map()
+    playwright, browser, context, page = await create_logged_in_session(args.base_url, headless=True)
+    try:
+        await page.goto(args.base_url.rstrip("/") + "/" + args.page)
+        await ensure_region_selected(page, args.base_url, region_value_map[args.region])
+        enter_room = enter_monitoring_room if args.page == "leak-monitoring" else enter_leak_room
+        entered = await enter_room(page, room_index=args.room)
+        if not entered:
+            return
+        await page.wait_for_selector(LEAK_ROW_SELECTOR, timeout=10000)
+        table = await leak_table_from_api(page) or await extract_leak_table(page)
+        if table is None:
+            return
+        table = await add_leak_scores(page, table, LEAK_ROW_SELECTOR, AUDIO_SELECTOR)
+        if table is None:
+            return
+        print(f"🎯 누수음 유사도 상위 {args.top}개")
+        for row in table.rank("leak_score", "desc", k=args.top):
+            print(f"  {row + 1:>4}. {table.row_summary(row)}")
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
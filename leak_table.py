@@ -0,0 +1,171 @@
+import re
+import time
+import numpy as np
+import tracing
+
+TABLE_SELECTOR = "#vgt-table"
+
+# 열 이름 → 헤더 텍스트 후보 (정렬 헤더 감지와 동일)
+COLUMN_LABELS = {
+    "strength": ["Strength"],
+    "frequency": ["Max Frequency", "Max(Hz)"],
+}
+# API 응답 레코드 키 후보 (소문자, 밑줄 무시)
+API_COLUMN_KEYS = {
+    "strength": ["strength"],
+    "frequency": ["maxfrequency", "maxfreq", "maxhz", "frequency"],
+}
+COLUMN_NAMES = {"strength": "강도", "frequency": "주파수", "leak_score": "누수음 유사도"}
+
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# 표 전체(헤더 + 열별 셀 텍스트)를 page.evaluate 한 번으로 가져오는 스크립트
+# tbody 행의 자식(줄번호 th 포함)을 헤더 th 순서와 맞춰 열 단위로 모음
+TABLE_SNAPSHOT_JS = """
+(selector) => {
+    const table = document.querySelector(selector);
+    if (!table) return null;
+    const headerRow = table.querySelector("thead tr");
+    const headers = headerRow ? Array.from(headerRow.children).map(th => th.innerText.trim()) : [];
+    const columns = headers.map(() => []);
+    const rows = table.querySelectorAll("tbody > tr");
+    for (const tr of rows) {
+        const cells = tr.children;
+        for (let i = 0; i < headers.length; i++) {
+            columns[i].push(cells[i] ? cells[i].innerText.trim() : "");
+        }
+    }
+    return {headers, columns, count: rows.length};
+}
+"""
+
+# 화면 표의 헤더 + 첫/마지막 행 셀 텍스트 (API 레코드 순서 확인용)
+EDGE_ROWS_JS = """
+(selector) => {
+    const table = document.querySelector(selector);
+    if (!table) return null;
+    const headerRow = table.querySelector("thead tr");
+    const headers = headerRow ? Array.from(headerRow.children).map(th => th.innerText.trim()) : [];
+    const rows = table.querySelectorAll("tbody > tr");
+    const cells = (tr) => headers.map((_, i) => tr && tr.children[i] ? tr.children[i].innerText.trim() : "");
+    return {headers, first: cells(rows[0]), last: cells(rows[rows.length - 1]), count: rows.length};
+}
+"""
+# 순서 확인에 쓰는 열 (값이 행마다 달라 순서가 틀리면 드러남)
+VERIFY_COLUMNS = ("strength", "frequency")
+
+# 셀 텍스트 → 숫자 (첫 번째 숫자, 없으면 NaN)
+def to_numeric(texts):
+    values = np.full(len(texts), np.nan)
+    for i, text in enumerate(texts):
+        match = NUMBER_RE.search(text.replace(",", ""))
+        if match:
+            values[i] = float(match.group())
+    return values
+
+
+# 누수음 표 열 저장소: 헤더별 텍스트/숫자 배열, 행 번호는 화면(DOM) 순서 0부터
+class LeakTable:
+    def __init__(self, headers, columns):
+        self.headers = headers
+        self.text = {header: np.asarray(column, dtype=object) for header, column in zip(headers, columns)}
+        self._numeric = {}
+        self.size = len(columns[0]) if columns else 0
+
+    # API 응답 레코드 목록 → 열 저장소 (레코드 순서 = 화면 기본 정렬 순서)
+    @classmethod
+    def from_records(cls, records):
+        headers = list(records[0]) if records else []
+        columns = [["" if r.get(h) is None else str(r.get(h)) for r in records] for h in headers]
+        return cls(headers, columns)
+
+    def __len__(self):
+        return self.size
+
+    # "strength"/"frequency" 또는 헤더 텍스트 → 실제 헤더 (화면 헤더 텍스트, 없으면 API 키)
+    def resolve(self, column):
+        labels = COLUMN_LABELS.get(column, [column])
+        header = next((h for h in self.headers if any(label in h for label in labels)), None)
+        if header is None:
+            keys = {h.lower().replace("_", ""): h for h in self.headers}
+            header = next((keys[k] for k in API_COLUMN_KEYS.get(column, []) if k in keys), None)
+        return header
+
+    # 화면에서 열 정렬을 적용한 것과 같은 행 순서의 새 표 (안정 정렬, 값 없는 행은 뒤로)
+    def sorted_by(self, column, order):
+        values = self.numeric(column)
+        if values is None:
+            return self
+        keys = np.where(np.isnan(values), np.inf, -values if order == "desc" else values)
+        perm = np.argsort(keys, kind="stable")
+        return LeakTable(self.headers, [self.text[h][perm] for h in self.headers])
+
+    # 계산한 열(누수음 유사도 등)을 덧붙인 새 표
+    def with_column(self, header, values):
+        return LeakTable(self.headers + [header], [self.text[h] for h in self.headers] + [list(values)])
+
+    def numeric(self, column):
+        header = self.resolve(column)
+        if header is None:
+            return None
+        if header not in self._numeric:
+            self._numeric[header] = to_numeric(self.text[header])
+        return self._numeric[header]
+
+    # 값 기준 상위/하위 k개 행 번호 (NaN 제외, argpartition으로 k개만 골라 정렬)
+    def rank(self, column, order="desc", k=1):
+        values = self.numeric(column)
+        if values is None:
+            return np.array([], dtype=int)
+        valid = np.flatnonzero(~np.isnan(values))
+        keys = -values[valid] if order == "desc" else values[valid]
+        k = min(k, len(valid))
+        if k <= 0:
+            return np.array([], dtype=int)
+        top = np.argpartition(keys, k - 1)[:k]
+        top = top[np.argsort(keys[top], kind="stable")]
+        return valid[top]
+
+    # 기준값 조건에 맞는 행 번호 (값 큰 순 / 작은 순)
+    def where(self, column, op, threshold, order="desc"):
+        values = self.numeric(column)
+        if values is None:
+            return np.array([], dtype=int)
+        compare = {"ge": np.greater_equal, "gt": np.greater, "le": np.less_equal, "lt": np.less}[op]
+        with np.errstate(invalid="ignore"):
+            rows = np.flatnonzero(compare(values, threshold))
+        keys = -values[rows] if order == "desc" else values[rows]
+        return rows[np.argsort(keys, kind="stable")]
+
+    def row_summary(self, row):
+        return " | ".join(f"{header}: {self.text[header][row]}" for header in self.headers if header)
+
+
+# 현재 화면의 누수음 표를 열 저장소로 (IPC 1회)
+@tracing.traced("pw.table_snapshot")
+async def extract_leak_table(page, selector=TABLE_SELECTOR):
+    started = time.perf_counter()
+    snapshot = await page.evaluate(TABLE_SNAPSHOT_JS, selector)
+    if not snapshot:
+        print("❌ 누수음 표를 찾을 수 없습니다.")
+        return None
+    table = LeakTable(snapshot["headers"], snapshot["columns"])
+    print(f"📸 누수음 표 스냅샷: {len(table)}행 × {len(table.headers)}열 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return table
+
+# API 레코드로 만든 표가 화면 행 순서와 같은지: 행 수 + 첫/마지막 행의 강도/주파수 값 비교 (IPC 1회)
+# 비교할 열이 화면에 하나도 없으면 확인할 수 없으므로 False
+async def rows_match_screen(page, table, selector=TABLE_SELECTOR):
+    edges = await page.evaluate(EDGE_ROWS_JS, selector)
+    if not edges or edges["count"] != len(table) or not len(table):
+        return False
+    screen = LeakTable(edges["headers"], [[first, last] for first, last in zip(edges["first"], edges["last"])])
+    checked = 0
+    for column in VERIFY_COLUMNS:
+        expected, actual = screen.numeric(column), table.numeric(column)
+        if expected is None or actual is None:
+            continue
+        if not np.allclose(expected, actual[[0, -1]], equal_nan=True):
+            return False
+        checked += 1
+    return checked > 0
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from openai import AsyncOpenAI
+from intent import normalize
+
+CACHE_DIR = ".nelow_cache"
+CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.sqlite")
+CACHE_MAX_ENTRIES = int(os.getenv("NELOW_LLM_CACHE_MAX", "1000"))
+CACHE_TTL_SECONDS = int(os.getenv("NELOW_LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 기본 7일
+
+_clients = {}
+
+# OpenAI 비동기 클라이언트는 API 키별로 한 번만 생성해서 재사용 (커넥션 풀 유지)
+def get_client(api_key):
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients[api_key] = AsyncOpenAI(api_key=api_key)
+    return client
+
+# 프롬프트 템플릿/웹 요소 목록이 바뀌면 캐시가 자동으로 무효화되도록 지문 생성
+def fingerprint(*parts):
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# 정규화된 명령어 → 파싱된 LLM 결과(JSON으로 저장 가능한 값) 디스크 캐시
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                transcript TEXT,
+                fields TEXT,
+                created REAL,
+                last_used REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON llm_cache(last_used)")
+        self._db.commit()
+
+    def _key(self, transcript, prompt_fingerprint):
+        return hashlib.sha256(f"{normalize(transcript)}\0{prompt_fingerprint}".encode("utf-8")).hexdigest()
+
+    def get(self, transcript, prompt_fingerprint):
+        key = self._key(transcript, prompt_fingerprint)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT fields, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, transcript, prompt_fingerprint, fields):
+        key = self._key(transcript, prompt_fingerprint)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, transcript, fields, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, transcript, json.dumps(fields, ensure_ascii=False), now, now),
+            )
+            # TTL 만료 항목 삭제 후, 개수 초과분은 오래 안 쓰인 순(LRU)으로 삭제
+            self._db.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+            self._db.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+
+    def size(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"LLM 캐시 적중 {self.hits} / 미스 {self.misses} (적중률 {rate:.0%}, 저장 {self.size()}개)"
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+
+# 스트리밍 응답 녹화 파일 (설정 시 mock_llm_server.py로 재생 가능한 형식으로 추가 기록)
+RECORD_PATH = os.getenv("NELOW_LLM_RECORD")
+
+# JSON 출력에서 값이 완성된 "키": 값 쌍 (문자열은 닫는 따옴표, 숫자는 뒤의 , 또는 } 까지 와야 확정)
+JSON_FIELD_RE = re.compile(r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|null|-?\d+(?=\s*[,}]))')
+# JSON 키 → 추측 실행에 쓰는 필드 이름
+JSON_FIELDS = {"region": "region", "page": "href", "action": "action", "room_index": "index"}
+
+# 한 줄 단위 필드 패턴 (구 텍스트 출력 형식, extract_selector_and_region과 동일한 규칙)
+FIELD_PATTERNS = [
+    ("selector", re.compile(r'click\("(.+?)"\)'), str),
+    ("region", re.compile(r'REGION:\s*(\S+)'), str),
+    ("href", re.compile(r'HREF:\s*(\S+)'), str),
+    ("index", re.compile(r'ROOM_INDEX:\s*(\d+)'), int),
+]
+
+
+# 토큰이 들어오는 대로 필드를 파싱
+# JSON 출력은 값이 닫히는 즉시, 구 텍스트 형식(REGION:/ACTION:/HREF:/ROOM_INDEX:)은 줄이 끝나면 확정
+class StreamingFieldParser:
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+        self.fields = {}
+
+    def _parse_json(self):
+        found = []
+        for match in JSON_FIELD_RE.finditer(self.text):
+            name = JSON_FIELDS.get(match.group(1))
+            if not name or name in self.fields:
+                continue
+            value = json.loads(match.group(2))
+            if name == "href" and value:
+                value = f"/{value}"
+            self.fields[name] = value
+            if value is not None:
+                found.append((name, value))
+        return found
+
+    def _parse_line(self, line):
+        found = []
+        for name, pattern, cast in FIELD_PATTERNS:
+            if name in self.fields:
+                continue  # 처음 확정된 값 유지 (전체 파싱의 re.search와 동일)
+            match = pattern.search(line)
+            if match:
+                self.fields[name] = cast(match.group(1))
+                found.append((name, self.fields[name]))
+        return found
+
+    # 새 토큰을 넣고, 이번에 확정된 (필드, 값) 목록을 반환
+    def feed(self, delta):
+        self.text += delta
+        if self.text.lstrip().startswith("{"):
+            return self._parse_json()
+        self.buffer += delta
+        found = []
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            found.extend(self._parse_line(line))
+        return found
+
+    # 스트림 종료 시 마지막 줄 처리
+    def close(self):
+        if self.text.lstrip().startswith("{"):
+            return self._parse_json()
+        line, self.buffer = self.buffer, ""
+        return self._parse_line(line)
+
+    def result(self):
+        return tuple(self.fields.get(name) for name in ("selector", "region", "href", "index"))
+
+
+# 스트리밍 LLM 호출: 텍스트 조각을 순서대로 넘겨줌 (usage dict가 주어지면 토큰 사용량을 채움)
+async def stream_completion(client, model, messages, usage=None, **kwargs):
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs,
+    )
+    async for chunk in stream:
+        if usage is not None and getattr(chunk, "usage", None):
+            usage["usage"] = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# 받은 조각을 재생용 녹화 파일에 기록
+def record_stream(user_input, chunks, path=RECORD_PATH):
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"match": user_input, "chunks": chunks}, ensure_ascii=False) + "\n")
@@ -0,0 +1,131 @@
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 오프라인 테스트용 chat completions 대역 서버
+# 녹화된 응답 조각(JSONL: {"match": 사용자 명령, "chunks": [...]})을 지정한 지연으로 재생
+# 사용: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 로 설정 후 trigger.py / nelow.py 실행
+
+DEFAULT_RECORDINGS = "mock_llm_recordings.jsonl"
+# 녹화가 없는 명령에 대한 응답 (nelow.INTENT_SCHEMA 형식)
+NO_MATCH = {"action": "none", "region": None, "page": None, "room_index": None, "room_name": None,
+            "sort_column": None, "sort_order": None, "play_row": None}
+
+
+def load_recordings(path):
+    recordings = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                recordings.append(json.loads(line))
+    return recordings
+
+# 프롬프트에 들어있는 사용자 명령과 가장 길게 일치하는 녹화 선택
+def find_recording(recordings, prompt):
+    matches = [r for r in recordings if r["match"] and r["match"] in prompt]
+    if not matches:
+        return {"chunks": [json.dumps(NO_MATCH, ensure_ascii=False)]}
+    return max(matches, key=lambda r: len(r["match"]))
+
+def _prompt_text(body):
+    return "\n".join(
+        m["content"] if isinstance(m.get("content"), str) else json.dumps(m.get("content"), ensure_ascii=False)
+        for m in body.get("messages", [])
+    )
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    recordings = []
+    first_token_ms = 300
+    token_ms = 20
+    requests_served = 0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _usage(self, prompt, text):
+        # 실제 토크나이저 대신 대략적인 추정치 (한글 기준 글자 수 / 2)
+        prompt_tokens = max(1, len(prompt) // 2)
+        completion_tokens = max(1, len(text) // 2)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = _prompt_text(body)
+        recording = find_recording(self.recordings, prompt)
+        chunks = recording["chunks"]
+        first_token_ms = recording.get("first_token_ms", self.first_token_ms)
+        token_ms = recording.get("token_ms", self.token_ms)
+        type(self).requests_served += 1
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+        created = int(time.time())
+        text = "".join(chunks)
+        time.sleep(first_token_ms / 1000)
+
+        if not body.get("stream"):
+            time.sleep(token_ms * len(chunks) / 1000)
+            payload = {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": self._usage(prompt, text),
+            }
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(token_ms / 1000)
+            send({**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+        send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            send({**base, "choices": [], "usage": self._usage(prompt, text)})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def create_server(recordings, host="127.0.0.1", port=8765, first_token_ms=300, token_ms=20):
+    handler = type("Handler", (MockLLMHandler,), {
+        "recordings": recordings, "first_token_ms": first_token_ms, "token_ms": token_ms,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="녹화된 LLM 스트리밍 응답 재생 서버")
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=int, default=300)
+    parser.add_argument("--token-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    server = create_server(load_recordings(args.recordings), port=args.port,
+                           first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    print(f"🧪 mock LLM 서버 실행: http://127.0.0.1:{args.port}/v1 (녹화 {len(server.RequestHandlerClass.recordings)}개)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
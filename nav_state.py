@@ -0,0 +1,136 @@
+from urllib.parse import urlparse
+
+REGION_SELECT = "select.item-select"
+
+# 사용자가 브라우저에서 직접 지역을 바꾸거나 정렬 헤더를 누른 것도 상태에 반영 (문서마다 1회 설치)
+TRACK_USER_ACTIONS_JS = """
+() => {
+    if (window.__nelowTracking) return;
+    window.__nelowTracking = true;
+    document.addEventListener("change", (e) => {
+        if (e.target.matches && e.target.matches("select.item-select")) {
+            window.__nelowNavEvent("region", e.target.value);
+        }
+    }, true);
+    document.addEventListener("click", (e) => {
+        if (e.target.closest && e.target.closest("#vgt-table th")) {
+            window.__nelowNavEvent("sort", null);
+        }
+    }, true);
+}
+"""
+
+# 페이지 객체별 상태 (탭마다 하나)
+_states = {}
+
+
+# 브라우저 현재 상태의 클라이언트 측 모델: URL 경로, 선택된 지역, 진입한 작업방, 열별 정렬 상태
+# Playwright 이벤트(framenavigated, response)와 페이지 내 사용자 조작 이벤트로 동기화하고,
+# 요청된 상태와 이미 같으면 goto/지역 선택/정렬 클릭을 생략하는 데 사용
+class NavigationState:
+    def __init__(self, page):
+        self.page = page
+        self.path = urlparse(page.url).path or None
+        self.region = None
+        self.room = None
+        self.sorts = {}
+        self.user_sorted = False  # 사용자가 직접 정렬을 바꿔 화면 행 순서를 알 수 없음
+        self.installed = False
+        self._expected_header_clicks = 0
+        page.on("framenavigated", self._on_navigated)
+        page.on("response", self._on_response)
+        page.on("close", lambda _: _states.pop(page, None))
+
+    # 사용자 조작 감지 스크립트 설치 + 현재 지역 값 읽기
+    async def install(self):
+        if self.installed:
+            return self
+        self.installed = True
+        await self.page.expose_function("__nelowNavEvent", self._on_user_action)
+        await self.page.add_init_script(f"window.addEventListener('DOMContentLoaded', {TRACK_USER_ACTIONS_JS})")
+        try:
+            await self.page.evaluate(TRACK_USER_ACTIONS_JS)
+            self.region = await self.page.evaluate(
+                "(selector) => document.querySelector(selector)?.value || null", REGION_SELECT
+            )
+        except Exception:
+            pass  # 로딩 중이면 다음 문서부터 init script로 설치됨
+        return self
+
+    # SPA 내부 이동(pushState 포함)과 전체 로딩 모두 발생, 경로가 바뀌면 작업방/정렬 상태는 무효
+    def _on_navigated(self, frame):
+        if frame != self.page.main_frame:
+            return
+        path = urlparse(frame.url).path or None
+        if path != self.path:
+            self.room = None
+            self._reset_table()
+        self.path = path
+
+    # 메인 문서 응답 = 전체 새로고침 → 표 정렬과 작업방 진입이 초기화됨, 오류 응답이면 경로를 알 수 없음으로 처리
+    def _on_response(self, response):
+        request = response.request
+        if request.resource_type != "document" or request.frame != self.page.main_frame:
+            return
+        self.room = None
+        self._reset_table()
+        if response.status >= 400:
+            self.path = None
+
+    def _on_user_action(self, kind, value):
+        if kind == "region":
+            self.set_region(value)
+        elif kind == "sort":
+            if self._expected_header_clicks:
+                self._expected_header_clicks -= 1  # 우리가 누른 클릭
+            else:
+                self.sorts.clear()  # 사용자가 직접 정렬을 바꿈 → 다음 정렬 때 DOM에서 다시 읽음
+                self.user_sorted = True
+
+    def set_region(self, region_value):
+        if region_value != self.region:
+            self.room = None
+            self._reset_table()
+        self.region = region_value
+
+    def _reset_table(self):
+        self.sorts.clear()
+        self.user_sorted = False
+
+    def enter_room(self, room_key):
+        self.room = room_key
+        self._reset_table()
+
+    def expect_header_clicks(self, count):
+        if self.installed:
+            self._expected_header_clicks += count
+
+    def set_sort(self, column, order):
+        # 표는 한 번에 한 열로만 정렬되므로 다른 열 상태는 버림
+        self.sorts = {column: order}
+
+    # 화면 표의 행 순서: None(기본 순서) | (열, 방향) | "unknown"
+    def table_order(self):
+        if self.user_sorted:
+            return "unknown"
+        for column, order in self.sorts.items():
+            if order in ("asc", "desc"):
+                return column, order
+            if order != "none":
+                return "unknown"
+        return None
+
+    def at(self, path, region_value=None):
+        return self.path == path and (region_value is None or self.region == region_value)
+
+
+# 페이지의 상태 객체 (없으면 생성해서 이벤트 연결)
+def navigation_state(page):
+    state = _states.get(page)
+    if state is None:
+        state = _states[page] = NavigationState(page)
+    return state
+
+# 상태 객체 생성 + 사용자 조작 감지까지 설치
+async def track_navigation(page):
+    return await navigation_state(page).install()
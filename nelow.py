@@ -1,9 +1,27 @@
-from openai import OpenAI
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from dotenv import load_dotenv
+from intent import LocalIntent, region_candidates
+from plan import (
+    SelectRegion, OpenPage, EnterRoom, SortColumn, PlayRow, PlayRanked, QueryRows,
+    steps_from_intent, parse_local_plan, optimize_plan,
+)
+from leak_table import COLUMN_LABELS, COLUMN_NAMES, LeakTable, extract_leak_table, rows_match_screen
+from api_capture import api_capture
+from leak_audio import add_leak_scores
+from llm_cache import LLMCache, get_client, fingerprint
+from llm_stream import StreamingFieldParser, stream_completion, record_stream
+from room_directory import room_directory_for, page_type_from_url
+from nav_state import navigation_state, track_navigation
+import tracing
+from readiness import (
+    get_header_class, wait_for_sort_change, get_view_signature, wait_for_room_view,
+    get_audio_src, wait_for_audio,
+)
+import asyncio
 import re
 import os
 import json
+import time
 
 # 🔐 환경변수에서 API 키 불러오기
 load_dotenv()
@@ -24,62 +42,87 @@ def load_region_value_map():
     with open("region_value_map.json", "r", encoding="utf-8") as f:
         return json.load(f)
 
-# 프롬프트 생성
-def build_prompt(user_input, dom_elements):
-    dom_list = "\n".join([
-        f"{i+1}. '{el['name']}' → <a href=\"{el['href']}\"> (selector: {el['selector']})"
-        for i, el in enumerate(dom_elements)
-    ])
-    index_hint = """
-[참고사항]
-- "첫번째" → ROOM_INDEX: 1
-- "두번째" → ROOM_INDEX: 2
-- "세번째" → ROOM_INDEX: 3
-- "네번째" → ROOM_INDEX: 4
-- "다섯번째" → ROOM_INDEX: 5
-- "여섯번째" → ROOM_INDEX: 6
-- "일곱번째" → ROOM_INDEX: 7
-- "여덟번째" → ROOM_INDEX: 8
-- "아홉번째" → ROOM_INDEX: 9
-- "열번째" → ROOM_INDEX: 10
-- "열한번째" → ROOM_INDEX: 11
-- "열두번째" → ROOM_INDEX: 12
-- "열세번째" → ROOM_INDEX: 13
-- "열네번째" → ROOM_INDEX: 14
-- "열다섯번째" → ROOM_INDEX: 15
-- "열여섯번째" → ROOM_INDEX: 16
-- "열일곱번째" → ROOM_INDEX: 17
-- "열여덟번째" → ROOM_INDEX: 18
-- "열아홉번째" → ROOM_INDEX: 19
-- "스무번째" → ROOM_INDEX: 20
-
-(한국어 순서 표현(예: '열다섯번째')은 해당 숫자로 변환하여 ROOM_INDEX로 추출하세요.)
+# LLM 지시문 (고정 접두부 - 매 호출 동일하므로 API 프롬프트 캐시 대상, 사용자 메시지는 뒤에 붙음)
+PAGE_LIST = "\n".join(f"- {el['href'].lstrip('/')}: {el['name']}" for el in dom_elements)
+SYSTEM_PROMPT = f"""
+당신은 누수 관제 웹 화면(NELOW)을 음성 명령으로 조작하기 위해 명령을 JSON으로 분석합니다.
+
+[페이지]
+{PAGE_LIST}
+
+[action]
+- navigate: 지역/페이지 이동
+- enter_room: 작업방 진입 (순번은 room_index, 이름은 room_name)
+- play: 누수음 재생 (몇 번째 항목인지 play_row, "가장 강한 것"처럼 값으로 고르면 play_row는 null로 두고 sort_column/sort_order만)
+- sort: 정렬 (sort_column: strength=강도값, frequency=주파수값 / sort_order: asc=오름차순, desc=내림차순)
+- none: 해당 없음
+한 명령에 여러 동작이 있으면(예: 지역+페이지+작업방+정렬+재생) 모든 항목을 채우고 action은 마지막 동작으로 하세요.
+
+[규칙]
+- 한국어 서수(첫번째, 열다섯번째, 스무번째 등)는 숫자로 변환하세요 (작업방 순번은 room_index, 재생할 누수음 순번은 play_row).
+- region은 사용자 메시지의 [지역 후보] 중에서만 고르고, 해당 없으면 null.
+- 언급되지 않은 항목은 null.
 """.strip()
 
-    return f'''
-[사용자 명령]
-"{user_input}"
-
-[웹 요소 목록]
-{dom_list}
-
-{index_hint}
-
-당신은 사용자 명령을 분석하여 적절한 selector와 지역 이름 또는 작업방 순번을 추론해야 합니다.
-출력 형식:
-REGION: 지역명\nACTION: click("selector")\nHREF: /"href"\nROOM_INDEX: n (선택적)
-'''.strip()
+# 출력 스키마 (structured outputs - 모든 필드 필수, 값이 없으면 null)
+# 키는 이 순서대로 생성되므로 action을 맨 앞에 두어 스트리밍 중 추측 실행 여부를 먼저 판단
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ["navigate", "enter_room", "play", "sort", "none"]},
+        "region": {"type": ["string", "null"]},
+        "page": {"type": ["string", "null"], "enum": [el["href"].lstrip("/") for el in dom_elements] + [None]},
+        "room_index": {"type": ["integer", "null"]},
+        "room_name": {"type": ["string", "null"]},
+        "sort_column": {"type": ["string", "null"], "enum": ["strength", "frequency", None]},
+        "sort_order": {"type": ["string", "null"], "enum": ["asc", "desc", None]},
+        "play_row": {"type": ["integer", "null"]},
+    },
+    "required": ["action", "region", "page", "room_index", "room_name", "sort_column", "sort_order", "play_row"],
+    "additionalProperties": False,
+}
+RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "nelow_intent", "strict": True, "schema": INTENT_SCHEMA}}
+
+# 메시지 생성: 고정 지시문 + 명령어와 로컬에서 고른 지역 후보
+def build_messages(user_input, region_value_map):
+    candidates = region_candidates(user_input, region_value_map)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"[지역 후보] {', '.join(candidates) or '없음'}\n[명령] {user_input}"},
+    ]
 
 # LLM 호출
-def query_llm(prompt, api_key):
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}]
-    )
+LLM_MODEL = "gpt-4o"
+LLM_STREAMING = os.getenv("NELOW_LLM_STREAM", "1") == "1"  # 스트리밍 + 추측 실행 사용 여부
+LOCAL_INTENT = os.getenv("NELOW_LOCAL_INTENT", "1") == "1"  # 0이면 로컬 규칙 해석을 건너뛰고 항상 LLM 호출 (비교 측정용)
+
+# 호출별 토큰 사용량과 지연 시간 출력
+def report_llm_usage(usage, started, first_token_at=None):
+    total_ms = (time.perf_counter() - started) * 1000
+    first_ms = f", 첫 토큰 {(first_token_at - started) * 1000:.0f}ms" if first_token_at else ""
+    if usage is None:
+        print(f"⏱️ LLM 응답 {total_ms:.0f}ms{first_ms} (토큰 정보 없음)")
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    tracing.annotate(prompt_tokens=usage.prompt_tokens, cached_tokens=cached,
+                     completion_tokens=usage.completion_tokens,
+                     first_token_ms=round((first_token_at - started) * 1000, 1) if first_token_at else None)
+    print(f"⏱️ LLM 응답 {total_ms:.0f}ms{first_ms} | 토큰: 입력 {usage.prompt_tokens} "
+          f"(캐시 {cached}) / 출력 {usage.completion_tokens}")
+
+async def query_llm(messages, api_key):
+    started = time.perf_counter()
+    with tracing.span("llm", model=LLM_MODEL, streaming=False):
+        response = await get_client(api_key).chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            response_format=RESPONSE_FORMAT,
+        )
+        report_llm_usage(response.usage, started)
     return response.choices[0].message.content.strip()
 
-# LLM 응답 파싱
+# 구 텍스트 형식 LLM 응답 파싱 (REGION:/ACTION:/HREF:/ROOM_INDEX: 줄)
 def extract_selector_and_region(response):
     selector_match = re.search(r'click\("(.+?)"\)', response)
     region_match = re.search(r'REGION:\s*(\S+)', response)
@@ -92,6 +135,75 @@ def extract_selector_and_region(response):
     index = int(index_match.group(1)) if index_match else None
     return selector, region, href, index
 
+# LLM 응답(JSON) → LocalIntent, JSON이 아니면 구 텍스트 형식으로 파싱
+@tracing.traced("parse.llm")
+def parse_intent_response(response, region_value_map):
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError:
+        selector, region, href, index = extract_selector_and_region(response)
+        href = normalize_href(href) or (selector_to_href(selector) if selector else None)
+        data = {"region": region, "page": href.lstrip("/") if href else None, "room_index": index,
+                "action": "enter_room" if index is not None else "navigate" if region or href else None}
+    return LocalIntent.from_llm(data, region_value_map)
+
+# LLM 결과 캐시 (지시문/스키마/모델/지역 목록이 바뀌면 다른 키가 됨)
+# 지역 후보는 명령어와 region_value_map으로 정해지므로 지역 목록 내용까지 넣으면 사용자 메시지 전체가 키에 반영됨
+# → region_value_map.json을 고치면 없어지거나 이름이 바뀐 지역을 가리키는 예전 결과를 쓰지 않음
+def prompt_fingerprint(region_value_map):
+    return fingerprint(SYSTEM_PROMPT, INTENT_SCHEMA, LLM_MODEL, region_value_map)
+
+_llm_cache = None
+
+def get_llm_cache():
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+# 스트리밍 LLM 호출: 필드가 확정될 때마다 on_field(필드, 값) 호출
+async def query_llm_streaming(messages, api_key, on_field=None, user_input=None):
+    parser = StreamingFieldParser()
+    chunks = []
+    usage = {}
+    started = time.perf_counter()
+    first_token_at = None
+    with tracing.span("llm", model=LLM_MODEL, streaming=True):
+        async for delta in stream_completion(get_client(api_key), LLM_MODEL, messages, usage,
+                                             response_format=RESPONSE_FORMAT):
+            first_token_at = first_token_at or time.perf_counter()
+            chunks.append(delta)
+            for field, value in parser.feed(delta):
+                if on_field:
+                    on_field(field, value)
+        for field, value in parser.close():
+            if on_field:
+                on_field(field, value)
+        report_llm_usage(usage.get("usage"), started, first_token_at)
+    record_stream(user_input, chunks)
+    return "".join(chunks).strip()
+
+# 캐시 조회 → 없으면 LLM 호출 후 해석 결과(LocalIntent) 저장
+async def resolve_with_llm(user_input, api_key, region_value_map, on_field=None):
+    cache = get_llm_cache()
+    prompt_key = prompt_fingerprint(region_value_map)
+    cached = await asyncio.to_thread(cache.get, user_input, prompt_key)  # sqlite 조회가 이벤트 루프를 막지 않도록
+    tracing.annotate(llm_cache_hit=isinstance(cached, dict))
+    if isinstance(cached, dict):
+        print(f"💾 LLM 캐시 적중 → 호출 생략 ({cache.stats()})")
+        return LocalIntent(**cached)
+
+    messages = build_messages(user_input, region_value_map)
+    if LLM_STREAMING:
+        response = await query_llm_streaming(messages, api_key, on_field, user_input)
+    else:
+        response = await query_llm(messages, api_key)
+    print(response)
+    intent = parse_intent_response(response, region_value_map)
+    if intent.action is not None:
+        await asyncio.to_thread(cache.put, user_input, prompt_key, intent.to_dict())
+    return intent
+
 # href 찾기
 def selector_to_href(selector):
     normalized = selector.strip().replace('"', "'")
@@ -100,198 +212,252 @@ def selector_to_href(selector):
             return el["href"]
     return None
 
+# 로그인 상태(쿠키/localStorage) 저장 위치 - 재시작 시 재로그인 생략
+AUTH_STATE_PATH = os.path.join(".nelow_cache", "auth_state.json")
+
+# 로그인 폼 입력 (저장된 로그인 상태가 없거나 만료된 경우에만)
+async def login(page):
+    await page.fill('input[type="text"]', LOGIN_ID)
+    await page.fill('input[type="password"]', LOGIN_PW)
+    await page.press('input[type="password"]', 'Enter')
+    await page.wait_for_selector("#sidebar", timeout=10000)
+
+# 로그인 상태를 디스크에 저장
+async def save_auth_state(context, path=AUTH_STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    await context.storage_state(path=path)
+
+# 여러 컨텍스트가 공유할 로그인 상태 파일 준비 (일괄 내보내기/서버 모드)
+# 저장된 상태로 열어 #sidebar가 뜨면 그대로 사용, 파일이 없거나 로그인 폼이 보이면(만료) 다시 로그인해서 저장
+async def ensure_auth_state(browser, base_url, auth_state_path):
+    storage_state = auth_state_path if os.path.exists(auth_state_path) else None
+    context = await browser.new_context(storage_state=storage_state)
+    try:
+        page = await context.new_page()
+        await page.goto(base_url)
+        await page.wait_for_selector('#sidebar, input[type="password"]', timeout=10000)
+        if await page.query_selector("#sidebar"):
+            print("✅ 저장된 로그인 상태 확인")
+            return auth_state_path
+        await login(page)
+        await save_auth_state(context, auth_state_path)
+        print("✅ 로그인 상태 저장" if storage_state is None else "✅ 로그인 만료 → 재로그인 후 상태 저장")
+        return auth_state_path
+    finally:
+        await context.close()
+
 # 로그인 및 세션 유지
-def create_logged_in_session(base_url):
-    playwright = sync_playwright().start()
-    browser = playwright.chromium.launch(headless=False, args=["--start-maximized"])
-    context = browser.new_context(no_viewport=True)
-    page = context.new_page()
-    page.goto(base_url)
-    page.fill('input[type="text"]', LOGIN_ID)
-    page.fill('input[type="password"]', LOGIN_PW)
-    page.press('input[type="password"]', 'Enter')
-    page.wait_for_selector("#sidebar", timeout=10000)
-    print("✅ 로그인 성공")
+async def create_logged_in_session(base_url, headless=False, auth_state_path=AUTH_STATE_PATH):
+    started = time.perf_counter()
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=headless, args=["--start-maximized"])
+    storage_state = auth_state_path if os.path.exists(auth_state_path) else None
+    context = await browser.new_context(no_viewport=True, storage_state=storage_state)
+    page = await context.new_page()
+    navigation_state(page)
+    api_capture(page)  # 첫 화면의 작업방 목록 응답부터 받기 위해 goto 전에 연결
+    await page.goto(base_url)
+
+    # 저장된 상태로 바로 #sidebar가 뜨면 로그인 생략, 로그인 폼이 보이면 만료된 것으로 보고 재로그인
+    await page.wait_for_selector('#sidebar, input[type="password"]', timeout=10000)
+    if await page.query_selector("#sidebar"):
+        print("✅ 저장된 로그인 상태로 접속")
+    else:
+        await login(page)
+        await save_auth_state(context, auth_state_path)
+        print("✅ 로그인 성공")
+    await track_navigation(page)
+    print(f"⏱️ 세션 준비 완료 {(time.perf_counter() - started) * 1000:.0f}ms")
     return playwright, browser, context, page
 
 # 지역 선택 함수
-def ensure_region_selected(page, base_url, region_value):
+@tracing.traced("pw.select_region")
+async def ensure_region_selected(page, base_url, region_value):
+    # 선택 직후 도착하는 새 지역의 목록 응답이 이전 지역으로 보관되지 않도록 상태를 먼저 바꿈 (실패하면 되돌림)
+    nav = navigation_state(page)
+    previous_region = nav.region
     try:
-        select_element = page.query_selector("select.item-select")
-        if select_element and select_element.is_enabled():
-            page.select_option("select.item-select", value=region_value)
+        select_element = await page.query_selector("select.item-select")
+        if select_element and await select_element.is_enabled():
+            nav.set_region(region_value)
+            await page.select_option("select.item-select", value=region_value)
+            room_directory_for(page.context).set_region(region_value)
             print("✅ 지역 선택 완료")
             return True
 
         print("⚠️ 지역 선택 요소 비활성화됨 → 초기화 시도")
-        page.goto(base_url)
-        page.wait_for_selector("select.item-select", timeout=5000)
-        select_element = page.query_selector("select.item-select")
-        if select_element and select_element.is_enabled():
-            page.select_option("select.item-select", value=region_value)
+        await page.goto(base_url)
+        await page.wait_for_selector("select.item-select", timeout=5000)
+        select_element = await page.query_selector("select.item-select")
+        if select_element and await select_element.is_enabled():
+            nav.set_region(region_value)
+            await page.select_option("select.item-select", value=region_value)
+            room_directory_for(page.context).set_region(region_value)
             print("✅ 초기화 후 지역 재선택 완료")
             return True
         else:
             print("❌ 초기화 후에도 지역 선택 실패")
             return False
     except Exception as e:
+        nav.set_region(previous_region)
         print(f"❌ 지역 선택 중 예외 발생: {e}")
         return False
 
-# 누수음 듣기/로거 작업방 진입 함수
-def enter_leak_room(page, room_keyword=None, room_index=None):
-    # li_elements = page.query_selector_all("li")
-    li_elements = page.query_selector_all("ul.ns-list > li")
-    print(li_elements)
-    if room_index is not None:
-        try:
-            li = li_elements[room_index]
-            # print(f"il : {li}")
-            name_el = li.query_selector("p")
-            # print(f"name_el : {name_el}")
-            number_el = li.query_selector(".num")
-            # print(f"number_el : {number_el}")
-            room_name = name_el.inner_text().strip() if name_el else "Unknown"
-            print(f"room_name : {room_name}")
-            chevron_button = li.query_selector('img[src*="chevron"]')
-            if chevron_button:
-                chevron_button.click()
-                page.wait_for_timeout(1000)
-                print(f"✅ 인덱스로 작업방 진입: '{room_name}'")
-                return
-        except Exception as e:
-            print(f"❌ 인덱스로 작업방 진입 실패: {e}")
-            return
-
-    for li in li_elements:
-        try:
-            name_el = li.query_selector("p")
-            number_el = li.query_selector(".num")
-            if not name_el or not number_el:
-                continue
-
-            room_name = name_el.inner_text().strip()
-            room_number = number_el.inner_text().strip()
-
-            if room_keyword in room_name or room_keyword == room_number:
-                chevron_button = li.query_selector('img[src*="chevron"]')
-                if chevron_button:
-                    chevron_button.click()
-                    page.wait_for_timeout(1000)
-                    print(f"✅ 작업방 진입: '{room_name}' ({room_number})")
-                    return
-                else:
-                    print(f"⚠️ 버튼을 찾지 못했습니다: '{room_name}' ({room_number})")
-        except Exception:
-            continue
-
-    print("❌ 해당 키워드와 일치하는 작업방을 찾을 수 없습니다.")
-
-# 누수음 모니터링 작업방 진입 함수
-def enter_monitoring_room(page, room_keyword=None, room_index=None):
+# 작업방 목록 selector (목록 항목, 이름 요소)
+LEAK_ROOM_ITEMS = "ul.ns-list > li"
+MONITORING_ROOM_ITEMS = "ul.monitoring-list > li.col"
+CHEVRON_SELECTOR = 'img[src*="chevron"]'
+
+# 작업방 목록 전체를 page.evaluate 한 번으로 가져오는 스크립트
+SNAPSHOT_ROOMS_JS = """
+([itemSelector, nameSelector, chevronSelector]) =>
+    Array.from(document.querySelectorAll(itemSelector)).map((li, index) => {
+        const nameEl = li.querySelector(nameSelector);
+        const numEl = li.querySelector(".num");
+        return {
+            index,
+            name: nameEl ? nameEl.innerText.trim() : null,
+            number: numEl ? numEl.innerText.trim() : null,
+            clickable: !!li.querySelector(chevronSelector),
+        };
+    })
+"""
+
+# 작업방 목록 스냅샷 (index, name, number, clickable) - 작업방 수와 관계없이 IPC 1회
+@tracing.traced("pw.room_snapshot")
+async def snapshot_rooms(page, item_selector, name_selector):
+    started = time.perf_counter()
+    rooms = await page.evaluate(SNAPSHOT_ROOMS_JS, [item_selector, name_selector, CHEVRON_SELECTOR])
+    print(f"📸 작업방 목록 스냅샷: {len(rooms)}개 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return rooms
+
+# 스냅샷의 index로 해당 작업방의 chevron 버튼 클릭
+async def click_room(page, item_selector, room):
+    await page.locator(item_selector).nth(room["index"]).locator(CHEVRON_SELECTOR).first.click()
+
+# 요소별 조회 방식(기존)과 스냅샷 방식의 작업방 목록 조회 시간 비교
+async def compare_room_scan_timing(page, item_selector=LEAK_ROOM_ITEMS, name_selector="p"):
+    started = time.perf_counter()
+    for li in await page.query_selector_all(item_selector):
+        name_el = await li.query_selector(name_selector)
+        number_el = await li.query_selector(".num")
+        if name_el:
+            await name_el.inner_text()
+        if number_el:
+            await number_el.inner_text()
+        await li.query_selector(CHEVRON_SELECTOR)
+    per_element_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    rooms = await page.evaluate(SNAPSHOT_ROOMS_JS, [item_selector, name_selector, CHEVRON_SELECTOR])
+    snapshot_ms = (time.perf_counter() - started) * 1000
+    print(f"⏱️ 작업방 {len(rooms)}개: 요소별 조회 {per_element_ms:.0f}ms → 스냅샷 {snapshot_ms:.0f}ms")
+    return per_element_ms, snapshot_ms
+
+# 작업방 목록 캐시 → 가로챈 API 응답 → 없으면 스냅샷을 떠서 채움 (refresh=True면 바로 스냅샷)
+async def get_room_index(page, item_selector, name_selector, refresh=False):
+    page_type = page_type_from_url(page.url)
+    room_directory = room_directory_for(page.context)
+    index = None if refresh else room_directory.get(page_type)
+    if index is None and not refresh:
+        capture = api_capture(page)
+        rooms = await capture.get_rooms(page_type)
+        if rooms is not None and await page.locator(item_selector).count() != len(rooms):
+            rooms = None  # 응답과 화면 목록이 다르면(필터/권한 등) 스크랩으로 대체
+        capture.record(rooms is not None)
+        if rooms is not None:
+            print(f"📡 작업방 목록: API 응답 사용 {len(rooms)}개 ({capture.stats()})")
+            index = room_directory.put(page_type, rooms)
+    if index is None:
+        index = room_directory.put(page_type, await snapshot_rooms(page, item_selector, name_selector))
+    return index
+
+# 작업방 진입 공통 처리 (position: 0부터 시작하는 목록 내 위치)
+@tracing.traced("pw.enter_room")
+async def _enter_room(page, item_selector, name_selector, label, room_keyword=None, position=None):
+    index = await get_room_index(page, item_selector, name_selector)
+    if position is not None and not 0 <= position < len(index.rooms):
+        # 캐시가 오래됐을 수 있으므로 한 번 새로 스냅샷
+        index = await get_room_index(page, item_selector, name_selector, refresh=True)
+
+    if position is not None:
+        if not 0 <= position < len(index.rooms):
+            print(f"❌ 인덱스로 작업방 진입 실패: {position} (총 {len(index.rooms)}개)")
+            return False
+        room = index.rooms[position]
+    else:
+        match = index.best(room_keyword)
+        if match is None:
+            index = await get_room_index(page, item_selector, name_selector, refresh=True)
+            match = index.best(room_keyword)
+        if match is None:
+            candidates = ", ".join(f"{r['name']}({score:.2f})" for score, r in index.search(room_keyword, limit=3))
+            print(f"❌ '{room_keyword}'와 일치하는 {label}을 찾을 수 없습니다. 후보: {candidates or '없음'}")
+            return False
+        score, room = match
+        if score < 1.0:
+            print(f"🔤 유사 이름 매칭: '{room_keyword}' → '{room['name']}' (점수 {score:.2f})")
+
+    room_name = room["name"] or "Unknown"
+    nav = navigation_state(page)
+    room_key = (item_selector, room["index"], room["name"])
+    if nav.room == room_key:
+        print(f"✅ 이미 진입한 {label}입니다: '{room_name}'")
+        return True
+    if not room["clickable"]:
+        print(f"⚠️ 버튼을 찾지 못했습니다: '{room_name}'")
+        return False
     try:
-        page.wait_for_selector("ul.monitoring-list > li.col", timeout=5000)
-    except:
-        print("❌ 작업방 목록이 로딩되지 않았습니다.")
-        return
+        signature = await get_view_signature(page, item_selector)
+        api_capture(page).invalidate_leaks()  # 진입 후 도착하는 누수음 표 응답만 사용
+        await click_room(page, item_selector, room)
+    except Exception as e:
+        print(f"❌ {label} 진입 실패: {e}")
+        return False
+    await wait_for_room_view(page, item_selector, signature)
+    nav.enter_room(room_key)
+    suffix = f" ({room['number']})" if room.get("number") else ""
+    print(f"✅ {label} 진입: '{room_name}'{suffix}")
+    return True
 
-    li_elements = page.query_selector_all("ul.monitoring-list > li.col")
-    print(f"🔍 총 작업방 수: {len(li_elements)}")
-    if room_index is not None:
-        try:
-            li = li_elements[int(room_index)-1] # 모니터링은 index-1을 해줘야 알맞음 (NELOW UI상)
-            name_el = li.query_selector("h3")
-            room_name = name_el.inner_text().strip() if name_el else "Unknown"
-            chevron_button = li.query_selector('img[src*="chevron"]')
-            if chevron_button:
-                chevron_button.click()
-                page.wait_for_timeout(1000)
-                print(f"✅ 인덱스로 모니터링 작업방 진입: '{room_name}'")
-                return
-        except Exception as e:
-            print(f"❌ 인덱스로 작업방 진입 실패: {e}")
-            return
+# 누수음 듣기/로거 작업방 진입 함수
+async def enter_leak_room(page, room_keyword=None, room_index=None):
+    return await _enter_room(page, LEAK_ROOM_ITEMS, "p", "작업방", room_keyword, room_index)
 
-    for li in li_elements:
+# 누수음 모니터링 작업방 진입 함수
+async def enter_monitoring_room(page, room_keyword=None, room_index=None):
+    if room_directory_for(page.context).get("leak-monitoring") is None:
         try:
-            name_el = li.query_selector("h3")
-            if not name_el:
-                continue
-            room_name = name_el.inner_text().strip()
-            if room_keyword in room_name:
-                chevron_button = li.query_selector('img[src*="chevron"]')
-                if chevron_button:
-                    chevron_button.click()
-                    page.wait_for_timeout(1000)
-                    print(f"✅ 모니터링 작업방 진입: '{room_name}'")
-                    return
-        except Exception:
-            continue
-    print("❌ 일치하는 모니터링 작업방을 찾을 수 없습니다.")
-
-#-----------------------------------------------------------------------------------------------------------
-# 강도값 정렬 상태 확인
-def get_strength_sort_state(page):
-    th = page.query_selector("th:has(span:text('Strength'))")
-    if not th:
-        return "unknown"
-
-    aria_sort = th.get_attribute("aria-sort") or "none"
-    class_attr = th.get_attribute("class") or ""
-
-    # 명확한 상태 구분
-    if "sorting-asc" in class_attr:
-        return "asc"
-    elif "sorting-desc" in class_attr:
-        return "desc"
-    elif aria_sort == "descending" and "sorting" not in class_attr:
-        return "none"  # 기본 상태
-    else:
-        return "unknown"
-
-# 강도값으로 정렬하기
-def sort_strength_to_target_order(page, target="asc"):
-    state = get_strength_sort_state(page)
-    print(f"📊 현재 정렬 상태: {state}")
-
-    click_count = 0
-    if target == "asc":
-        if state == "none":
-            click_count = 1
-        elif state == "desc":
-            click_count = 2
-        elif state == "asc":
-            print("✅ 이미 오름차순입니다.")
-            return
-    elif target == "desc":
-        if state == "none":
-            click_count = 2
-        elif state == "asc":
-            click_count = 1
-        elif state == "desc":
-            print("✅ 이미 내림차순입니다.")
-            return
-
-    button = page.query_selector("th:has(span:text('Strength')) button")
-    if not button:
-        print("❌ 정렬 버튼을 찾을 수 없습니다.")
-        return
+            await page.wait_for_selector(MONITORING_ROOM_ITEMS, timeout=5000)
+        except:
+            print("❌ 작업방 목록이 로딩되지 않았습니다.")
+            return False
 
-    for _ in range(click_count):
-        button.click()
-        page.wait_for_timeout(500)
+    # 모니터링은 index-1을 해줘야 알맞음 (NELOW UI상)
+    position = int(room_index) - 1 if room_index is not None else None
+    return await _enter_room(page, MONITORING_ROOM_ITEMS, "h3", "모니터링 작업방", room_keyword, position)
 
-    print(f"✅ '{target}' 정렬 상태로 변경 완료 (클릭 {click_count}회)")
 #-----------------------------------------------------------------------------------------------------------
-# 주파수값 정렬 상태 확인
-def get_frequency_sort_state(page):
-    th = page.query_selector("th:has(span:text('Max Frequency'))") or \
-         page.query_selector("th:has(span:text('Max(Hz)'))")
-    if not th:
+# 열별 정렬 헤더 텍스트 (leak_table.COLUMN_LABELS: strength/frequency)
+# 현재 정렬 상태 → 목표 상태까지 필요한 헤더 클릭 수 (none → asc → desc 순환이 아닌 NELOW UI 동작 기준)
+SORT_CLICKS = {("none", "asc"): 1, ("desc", "asc"): 2, ("none", "desc"): 2, ("asc", "desc"): 1}
+SORT_ORDER_NAMES = {"asc": "오름차순", "desc": "내림차순"}
+
+# 헤더 th의 class와 aria-sort를 한 번에 조회
+SORT_STATE_JS = """
+(labels) => {
+    const th = Array.from(document.querySelectorAll("th"))
+        .find(th => labels.some(label => th.innerText.includes(label)));
+    return th ? [th.className, th.getAttribute("aria-sort") || "none"] : null;
+}
+"""
+
+# 열 정렬 상태 확인 ("asc" | "desc" | "none" | "unknown")
+async def get_sort_state(page, column):
+    header = await page.evaluate(SORT_STATE_JS, COLUMN_LABELS[column])
+    if not header:
         return "unknown"
-
-    aria_sort = th.get_attribute("aria-sort") or "none"
-    class_attr = th.get_attribute("class") or ""
+    class_attr, aria_sort = header
 
     # 명확한 상태 구분
     if "sorting-asc" in class_attr:
@@ -303,182 +469,411 @@ def get_frequency_sort_state(page):
     else:
         return "unknown"
 
-# 주파수값으로 정렬하기
-def sort_frequency_to_target_order(page, target="asc"):
-    state = get_frequency_sort_state(page)
+# 열을 목표 정렬 상태로 (화면 순서가 필요한 경우에만 사용 - 값 질의는 leak_table로 로컬 처리)
+@tracing.traced("pw.sort")
+async def sort_column_to_target_order(page, column, target="asc"):
+    labels = COLUMN_LABELS[column]
+    nav = navigation_state(page)
+    state = nav.sorts.get(column) or await get_sort_state(page, column)
     print(f"📊 현재 정렬 상태: {state}")
 
-    click_count = 0
-    if target == "asc":
-        if state == "none":
-            click_count = 1
-        elif state == "desc":
-            click_count = 2
-        elif state == "asc":
-            print("✅ 이미 오름차순입니다.")
-            return
-    elif target == "desc":
-        if state == "none":
-            click_count = 2
-        elif state == "asc":
-            click_count = 1
-        elif state == "desc":
-            print("✅ 이미 내림차순입니다.")
-            return
-
-    button = page.query_selector("th:has(span:text('Max Frequency')) button") or \
-             page.query_selector("th:has(span:text('Max(Hz)')) button")
+    if state == target:
+        print(f"✅ 이미 {SORT_ORDER_NAMES[target]}입니다.")
+        nav.set_sort(column, state)
+        return True
+    click_count = SORT_CLICKS.get((state, target), 0)
+
+    button = None
+    for label in labels:
+        button = await page.query_selector(f"th:has(span:text('{label}')) button")
+        if button:
+            break
     if not button:
         print("❌ 정렬 버튼을 찾을 수 없습니다.")
-        return
+        return False
 
+    nav.expect_header_clicks(click_count)
     for _ in range(click_count):
-        button.click()
-        page.wait_for_timeout(500)
+        previous_class = await get_header_class(page, labels)
+        await button.click()
+        await wait_for_sort_change(page, labels, previous_class)
 
+    if click_count:
+        nav.set_sort(column, target)
     print(f"✅ '{target}' 정렬 상태로 변경 완료 (클릭 {click_count}회)")
+    return True
 #-----------------------------------------------------------------------------------------------------------
 # 누수음 실행하기
-def play_leak_sound_by_index(page, sound_index: int):
+LEAK_ROW_SELECTOR = "#vgt-table > tbody > tr"
+AUDIO_SELECTOR = "#waveform > audio"
+
+# 오디오 요소 조회와 재생을 evaluate 한 번으로 처리
+PLAY_AUDIO_JS = """
+(selector) => {
+    const audio = document.querySelector(selector);
+    if (!audio) return false;
+    audio.play();
+    return true;
+}
+"""
+
+@tracing.traced("pw.play")
+async def play_leak_sound_by_index(page, sound_index: int):
     try:
         # 누수음 목록 공통 selector
-        selector = "#vgt-table > tbody > tr"
-        rows = page.query_selector_all(selector)
+        rows = page.locator(LEAK_ROW_SELECTOR)
+        row_count = await rows.count()
 
-        if not rows:
+        if not row_count:
             print("❌ 누수음 목록을 찾을 수 없습니다.")
-            return
+            return False
 
-        if sound_index < 1 or sound_index > len(rows):
-            print(f"❌ 유효하지 않은 인덱스입니다: {sound_index} (총 {len(rows)}개)")
-            return
+        if sound_index is None or sound_index < 1 or sound_index > row_count:
+            print(f"❌ 유효하지 않은 인덱스입니다: {sound_index} (총 {row_count}개)")
+            return False
 
         # 대상 누수음 항목 클릭
-        target_row = rows[sound_index - 1]
-        target_row.click()
+        previous_src = await get_audio_src(page, AUDIO_SELECTOR)
+        await rows.nth(sound_index - 1).click()
         print(f"🔊 {sound_index}번째 누수음 항목 클릭 완료")
 
-        # 페이지 전환 또는 오디오 요소 로딩 대기
-        page.wait_for_timeout(1000)  # 필요시 조정
+        # 오디오 src 변경 + 데이터 로딩 완료 대기
+        await wait_for_audio(page, AUDIO_SELECTOR, previous_src)
 
         # 오디오 플레이어 재생
-        audio_selector = "#waveform > audio"
-        audio = page.query_selector(audio_selector)
-        if audio:
-            page.evaluate("audio => audio.play()", audio)
+        if await page.evaluate(PLAY_AUDIO_JS, AUDIO_SELECTOR):
             print("▶️ 재생 시작 완료")
-        else:
-            print("❌ 재생 오디오 요소를 찾을 수 없습니다.")
+            return True
+        print("❌ 재생 오디오 요소를 찾을 수 없습니다.")
+        return False
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
+        return False
 #-----------------------------------------------------------------------------------------------------------
-# 명령 실행
-def process_command(page, base_url, user_input, api_key, region_value_map):
-    prompt = build_prompt(user_input, dom_elements)
-    response = query_llm(prompt, api_key)
-    print(response)
-
-    selector, region, href, index = extract_selector_and_region(response)
-    print(f"🧾 분석 결과 → selector: {selector}, region: {region}, href: {href}, index: {index}")
-
-    # ✅ fallback: 작업방 이름으로 수동 진입 시도
-    if "작업방" in user_input:
-        keyword = (
-            user_input.replace("작업방", "")
-            .replace("들어가줘", "")
-            .replace("진입", "")
-            .strip()
-        )
-        if "/leak-monitoring" in page.url:
-            enter_monitoring_room(page, room_keyword=keyword)
-        else:
-            enter_leak_room(page, room_keyword=keyword)
-        return
-
-    # ✅ 누수음 재생 시도
-    if "재생" in user_input or "들려줘" in user_input:
-        play_leak_sound_by_index(page, sound_index=index)
-        return
-
-    # ✅ 작업방 인덱스로 진입 시도
-    if index is not None:
-        if "/leak-monitoring" in page.url:
-            enter_monitoring_room(page, room_index=index)
-        else:
-            enter_leak_room(page, room_index=index)
-        return
-
-    # 강도값 정렬하기
-    if "강도값" in user_input and "정렬" in user_input:
-        if "오름차순" in user_input:
-            sort_strength_to_target_order(page, target="asc")
-            return
-        else:
-            sort_strength_to_target_order(page, target="desc")
+# LLM이 준 href 정리 ('/"leak-master"' 같은 형태 보정), 알려진 페이지가 아니면 None
+def normalize_href(href):
+    if not href:
+        return None
+    href = "/" + href.replace('"', "").replace("'", "").strip().lstrip("/")
+    return href if any(el["href"] == href for el in dom_elements) else None
+
+# 현재 선택된 지역 값 (추측 실행 되돌리기용)
+async def get_selected_region(page):
+    return await page.evaluate("() => document.querySelector('select.item-select')?.value ?? null")
+
+# 스트리밍 중 확정된 필드로 안전한 단계(지역 선택, 페이지 이동)를 먼저 실행하고
+# 최종 결과와 다르면 원래 상태로 되돌림
+class NavigationSpeculator:
+    def __init__(self, page, base_url, region_value_map, region_pool=None):
+        self.page = page
+        self.base_url = base_url
+        self.region_value_map = region_value_map
+        self.region_pool = region_pool
+        self.previous_url = page.url
+        self.previous_region = None
+        self.region_value = None
+        self.href = None
+        self.enabled = True
+        self.failed = False
+        self._chain = None
+
+    # 단계는 순서대로 실행 (지역 선택이 끝난 뒤 페이지 이동)
+    def _schedule(self, step):
+        previous = self._chain
+
+        async def run():
+            if previous:
+                await previous
+            if self.enabled and not self.failed:
+                await step()
+
+        self._chain = asyncio.create_task(run())
+
+    def on_field(self, field, value):
+        if not self.enabled:
             return
-
-    # 주파수값 정렬하기
-    if "주파수값" in user_input and "정렬" in user_input:
-        if "오름차순" in user_input:
-            sort_frequency_to_target_order(page, target="asc")
-            return
-        else:
-            sort_frequency_to_target_order(page, target="desc")
-            return
-
-    # ✅ 페이지 탐색
-    if not selector and not region and not href:
-        for el in dom_elements:
-            if el["name"].replace(" ", "") in user_input.replace(" ", ""):
-                href = el["href"]
-                page.goto(base_url.rstrip("/") + href)
-                print(f"↩️ '{el['name']}' 페이지로 이동합니다.")
+        if field == "action" and value == "none":
+            self.enabled = False  # 실행할 동작이 없는 명령
+        elif field == "region" and self.region_value is None:
+            region_value = self.region_value_map.get(value)
+            if not region_value or (self.region_pool and self.region_pool.has(region_value)):
+                self.enabled = False  # 알 수 없는 지역이거나 탭 전환으로 처리할 지역
                 return
-        print("❌ selector 또는 지역명을 추출할 수 없습니다.")
-        return
+            self.region_value = region_value
+            self._schedule(self._select_region)
+        elif field in ("selector", "href") and self.href is None:
+            href = normalize_href(value) if field == "href" else selector_to_href(value)
+            if href:
+                self.href = href
+                self._schedule(self._goto)
+
+    async def _select_region(self):
+        self.previous_region = await get_selected_region(self.page)
+        if self.previous_region == self.region_value:
+            return  # 이미 선택된 지역
+        print(f"🏃 추측 실행: 지역 선택 ({self.region_value})")
+        if not await ensure_region_selected(self.page, self.base_url, self.region_value):
+            self.failed = True
+
+    async def _goto(self):
+        if navigation_state(self.page).at(self.href) and self.previous_region == self.region_value:
+            return  # 이미 같은 지역의 같은 화면
+        print(f"🏃 추측 실행: 페이지 이동 ({self.href})")
+        try:
+            with tracing.span("pw.goto", href=self.href, speculative=True):
+                await self.page.goto(self.base_url.rstrip("/") + self.href)
+        except Exception as e:
+            print(f"⚠️ 추측 페이지 이동 실패: {e}")
+            self.failed = True
+
+    async def settle(self):
+        if self._chain:
+            await asyncio.gather(self._chain, return_exceptions=True)
+
+    @property
+    def acted(self):
+        return self._chain is not None
+
+    # 최종 결과(지역 값, href)가 추측과 같으면 True → 호출한 쪽에서 지역 선택/페이지 이동 단계를 뺌
+    # 다르면 되돌리지 않고 False → execute_plan이 navigation_state(추측 후 상태)를 보고 맞는 지역 선택/goto만 바로 실행
+    # 최종 결과에 지역/화면이 없는데 추측으로 바꿔 놓은 경우에만 원래 지역/화면으로 이동 (가야 할 곳이 원래 상태)
+    async def reconcile(self, region_value, href):
+        await self.settle()
+        if not self.acted:
+            return False
+        if self.enabled and not self.failed and region_value == self.region_value and href == self.href:
+            print("🎯 추측 실행 결과 일치 → 남은 이동 생략")
+            return True
 
-    if not href and selector:
-        href = selector_to_href(selector)
-        print(f"🔗 selector_to_href 변환 결과: {href}")
-        if not href:
-            print("❌ href 경로를 찾을 수 없습니다.")
-            return
+        print("↪️ 추측 실행 결과 불일치 → 추측한 상태에서 최종 계획으로 바로 이동")
+        if region_value is None and self.region_value and self.previous_region not in (None, self.region_value):
+            await ensure_region_selected(self.page, self.base_url, self.previous_region)
+        if href is None and self.href and self.page.url != self.previous_url:
+            with tracing.span("pw.goto", href=self.previous_url, speculative=True):
+                await self.page.goto(self.previous_url)
+        return False
 
-    region_value = None
-    if region:
-        region_value = region_value_map.get(region)
-        print(f"🗺️ region_value = {region_value}")
-        if not region_value:
-            print(f"❌ 알 수 없는 지역명: {region} (region_value_map에 없음)")
-            return
+#-----------------------------------------------------------------------------------------------------------
+# 명령 실행
+# 가로챈 API 응답으로 누수음 표 구성 (화면 행 순서를 알 수 있고, 행 수와 첫/마지막 행 값이 화면과 같을 때만)
+async def leak_table_from_api(page):
+    capture = api_capture(page)
+    records = await capture.get_leaks()
+    order = navigation_state(page).table_order()
+    if not records or order == "unknown":
+        return None
+    table = LeakTable.from_records(records)
+    if order:
+        table = table.sorted_by(*order)
+    if not await rows_match_screen(page, table):
+        print("⚠️ API 응답 행 순서/개수가 화면 표와 달라 스냅샷 사용")
+        return None  # 페이지 나눔/필터/다른 기본 정렬 등으로 화면 행과 다름
+    print(f"📡 누수음 표: API 응답 사용 {len(table)}행")
+    return table
+
+# 누수음 표를 한 번에 읽어 값 순위/조건으로 행을 고름 (정렬 클릭 없음), 재생이면 해당 행 클릭
+async def run_table_query(page, step):
+    capture = api_capture(page)
+    table = await leak_table_from_api(page)
+    capture.record(table is not None)
+    if table is None:
+        table = await extract_leak_table(page)
+    if table is not None and step.column == "leak_score":
+        # 표에 없는 값 → 녹음을 내려받아 분석한 누수음 유사도 열 추가
+        table = await add_leak_scores(page, table, LEAK_ROW_SELECTOR, AUDIO_SELECTOR)
+    if table is None:
+        return False
+    if table.resolve(step.column) is None:
+        print(f"❌ 표에서 {COLUMN_NAMES[step.column]} 열을 찾을 수 없습니다: {table.headers}")
+        return False
 
-    if region_value and not ensure_region_selected(page, base_url, region_value):
-        return
+    if isinstance(step, PlayRanked):
+        rows = table.rank(step.column, step.order, k=1)
+        if not len(rows):
+            print(f"❌ {COLUMN_NAMES[step.column]} 값이 있는 누수음이 없습니다.")
+            return False
+        row = int(rows[0])
+        print(f"🎯 {row + 1}번째 행 선택 → {table.row_summary(row)}")
+        await play_leak_sound_by_index(page, sound_index=row + 1)
+        return True
 
-    try:
-        full_url = base_url.rstrip("/") + href
-        page.goto(full_url)
-        page.evaluate("window.moveTo(0, 0); window.resizeTo(screen.availWidth, screen.availHeight)")
-        print(f"➡️ 페이지 이동 완료: {full_url}")
-    except Exception as e:
-        print(f"⚠️ 페이지 이동 실패: {e}")
+    if step.op:
+        rows = table.where(step.column, step.op, step.threshold, step.order)
+    else:
+        rows = table.rank(step.column, step.order, k=step.k or 1)
+    print(f"📋 {step.describe()}: {len(rows)}건 (전체 {len(table)}행)")
+    for row in rows:
+        print(f"  {row + 1:>4}. {table.row_summary(row)}")
+    return True
+
+# 로컬/LLM 해석에 실패했을 때 기존 키워드 규칙으로 단계 구성
+def keyword_fallback_steps(user_input):
+    if "작업방" in user_input:
+        keyword = user_input.replace("작업방", "").replace("들어가줘", "").replace("진입", "").strip()
+        return [EnterRoom(name=keyword)] if keyword else []
+    order = "asc" if "오름차순" in user_input else "desc"
+    if "강도값" in user_input and "정렬" in user_input:
+        return [SortColumn("strength", order)]
+    if "주파수값" in user_input and "정렬" in user_input:
+        return [SortColumn("frequency", order)]
+    for el in dom_elements:
+        if el["name"].replace(" ", "") in user_input.replace(" ", ""):
+            return [OpenPage(el["href"])]
+    return []
+
+# 계획의 단계를 순서대로 실행 (이미 만족된 단계는 생략, 실패하면 중단)
+# (현재 활성 page, 모든 단계 성공 여부)를 반환 (region_pool 사용 시 page가 다른 탭으로 바뀔 수 있음)
+async def execute_plan(page, base_url, steps, region_value_map, region_pool=None):
+    plan_started = time.perf_counter()
+    region_changed = False
+    ok = bool(steps)
+    for number, step in enumerate(steps, 1):
+        started = time.perf_counter()
+        with tracing.span(f"step.{type(step).__name__}", step=step.describe()) as step_span:
+            nav = navigation_state(page)
+            status = "완료"
+            ok = True
+
+            if isinstance(step, SelectRegion):
+                region_value = region_value_map.get(step.region)
+                print(f"🗺️ region_value = {region_value}")
+                if not region_value:
+                    print(f"❌ 알 수 없는 지역명: {step.region} (region_value_map에 없음)")
+                    ok = False
+                elif nav.region == region_value:
+                    status = "생략 (이미 선택됨)"
+                elif region_pool is not None and region_pool.has(region_value):
+                    # 미리 열어둔 지역 탭으로 전환 (새로고침/재선택 없음)
+                    page = await region_pool.switch(region_value)
+                else:
+                    ok = region_changed = await ensure_region_selected(page, base_url, region_value)
 
+            elif isinstance(step, OpenPage):
+                # 지역을 새로 고른 경우에는 목록을 새로 받도록 기존처럼 다시 로딩
+                href = step.href or nav.path
+                if not href or (not region_changed and nav.at(href)):
+                    status = "생략 (이미 해당 화면)"
+                else:
+                    try:
+                        full_url = base_url.rstrip("/") + href
+                        api_capture(page).invalidate_leaks()
+                        with tracing.span("pw.goto", href=href):
+                            await page.goto(full_url)
+                        await page.evaluate("window.moveTo(0, 0); window.resizeTo(screen.availWidth, screen.availHeight)")
+                        print(f"➡️ 페이지 이동 완료: {full_url}")
+                    except Exception as e:
+                        print(f"⚠️ 페이지 이동 실패: {e}")
+                        ok = False
+
+            elif isinstance(step, EnterRoom):
+                if "/leak-monitoring" in page.url:
+                    ok = await enter_monitoring_room(page, room_keyword=step.name, room_index=step.index)
+                else:
+                    ok = await enter_leak_room(page, room_keyword=step.name, room_index=step.index)
+
+            elif isinstance(step, SortColumn):
+                ok = await sort_column_to_target_order(page, step.column, target=step.order)
+
+            elif isinstance(step, PlayRow):
+                ok = await play_leak_sound_by_index(page, sound_index=step.row)
+
+            elif isinstance(step, (PlayRanked, QueryRows)):
+                ok = await run_table_query(page, step)
+
+            step_span.set(ok=ok, status=status)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"⏱️ [{number}/{len(steps)}] {step.describe()}: {status if ok else '실패'} {elapsed:.0f}ms")
+        if not ok:
+            print("⛔ 이전 단계 실패로 남은 단계를 중단합니다.")
+            break
+
+    if len(steps) > 1:
+        print(f"⏱️ 계획 {len(steps)}단계 전체 {(time.perf_counter() - plan_started) * 1000:.0f}ms")
+    return page, ok
+
+# 명령 처리 후 (현재 활성 page, 성공 여부)를 반환 (region_pool 사용 시 page가 다른 탭으로 바뀔 수 있음)
+# 실행할 동작을 찾지 못했거나 한 단계라도 실패하면 성공 여부는 False
+# on_plan: 실행 직전 최종 단계 목록을 받는 콜백 (서버 응답/벤치마크 검증용)
+# prefetcher: prefetch.RoomPrefetcher (명령 사이 유휴 시간에 작업방 목록 미리 불러오기)
+async def process_command(page, base_url, user_input, api_key, region_value_map, region_pool=None, on_plan=None,
+                          prefetcher=None):
+    if prefetcher:
+        await prefetcher.cancel()  # 새 명령이 오면 미리 불러오기 즉시 중단
+    with tracing.trace("command", text=user_input) as command_span:
+        # ⚡ 정형 명령은 절 단위 로컬 규칙으로 먼저 해석하고, 확신하지 못할 때만 LLM 한 번 호출
+        with tracing.span("parse.local") as parse_span:
+            steps, confident = parse_local_plan(user_input, region_value_map) if LOCAL_INTENT else ([], False)
+            parse_span.set(steps=len(steps), confident=confident)
+        speculator = None
+        if confident:
+            print(f"⚡ 로컬 해석 ({len(steps)}단계) → LLM 호출 생략")
+        else:
+            # 지역 선택/페이지 이동은 항상 계획의 앞 단계이므로 스트리밍 중에 먼저 시작
+            if LLM_STREAMING:
+                speculator = NavigationSpeculator(page, base_url, region_value_map, region_pool)
+            on_field = speculator.on_field if speculator else None
+            with tracing.span("llm.resolve"):
+                intent = await resolve_with_llm(user_input, api_key, region_value_map, on_field)
+            steps = steps_from_intent(intent)
+
+        steps = optimize_plan(steps or keyword_fallback_steps(user_input))
+
+        done = 0  # 추측 실행으로 이미 끝난 앞쪽 단계 수
+        if speculator:
+            region = next((step.region for step in steps if isinstance(step, SelectRegion)), None)
+            href = next((step.href for step in steps if isinstance(step, OpenPage)), None)
+            if await speculator.reconcile(region_value_map.get(region) if region else None, href):
+                # optimize_plan 후 지역 선택/페이지 이동은 각각 최대 하나이고 항상 맨 앞
+                done = sum(isinstance(step, (SelectRegion, OpenPage)) for step in steps)
+
+        ok = False
+        if not steps:
+            print("❌ 명령에서 실행할 동작을 찾을 수 없습니다.")
+        else:
+            print("📋 실행 계획: " + " → ".join(step.describe() for step in steps))
+            if on_plan:
+                on_plan(steps)
+            if done == len(steps):
+                ok = True
+            else:
+                page, ok = await execute_plan(page, base_url, steps[done:], region_value_map, region_pool)
+        command_span.set(ok=ok)
+    # 다음 명령을 기다리는 동안 같은 지역의 다른 화면 작업방 목록을 미리 불러옴 (명령 추적 밖에서 실행)
+    if prefetcher:
+        prefetcher.schedule(page)
+    return page, ok
+
+
+# 메인 실행 (터미널 입력으로 명령 테스트)
+async def main():
+    from region_pool import RegionPagePool
+    from prefetch import RoomPrefetcher
 
-# 메인 실행
-if __name__ == "__main__":
     api_key = os.getenv('OPENAI_API_KEY')
     base_url = "https://kr.neverlosewater.com/"
     region_value_map = load_region_value_map()
 
-    playwright, browser, context, page = create_logged_in_session(base_url)
+    playwright, browser, context, page = await create_logged_in_session(base_url)
+    region_pool = await RegionPagePool.from_env(context, base_url, region_value_map)
+    prefetcher = RoomPrefetcher.from_env(context, base_url)
+    loop = asyncio.get_running_loop()
 
     try:
         while True:
-            user_input = input("📥 명령어 입력 (exit 입력 시 종료): ")
+            user_input = await loop.run_in_executor(None, input, "📥 명령어 입력 (exit 입력 시 종료): ")
             if user_input.lower() in ["exit", "quit"]:
                 break
-            process_command(page, base_url, user_input, api_key, region_value_map)
+            page, _ = await process_command(page, base_url, user_input, api_key, region_value_map, region_pool,
+                                            prefetcher=prefetcher)
     finally:
-        browser.close()
-        playwright.stop()
+        if prefetcher:
+            await prefetcher.close()
+            print(f"🔮 {prefetcher.report()}")
+        await browser.close()
+        await playwright.stop()
         print("🧹 세션 종료")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
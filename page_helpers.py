@@ -0,0 +1,54 @@
+from nelow import LEAK_ROOM_ITEMS, MONITORING_ROOM_ITEMS, snapshot_rooms
+from api_capture import api_capture
+from nav_state import navigation_state, track_navigation
+
+# 운영자 탭 밖에서 쓰는 페이지 도우미 (일괄 내보내기 워커, 작업방 목록 미리 불러오기, 녹음 주소 수집용 보조 탭)
+
+# 페이지 종류별 작업방 목록 selector (목록 항목, 이름 요소)
+ROOM_SELECTORS = {
+    "leak-master": (LEAK_ROOM_ITEMS, "p"),
+    "water-leak-logger": (LEAK_ROOM_ITEMS, "p"),
+    "leak-monitoring": (MONITORING_ROOM_ITEMS, "h3"),
+}
+
+
+# API 응답 가로채기/이동 상태 추적을 붙인 새 탭
+async def new_tracked_page(context):
+    page = await context.new_page()
+    api_capture(page)
+    await track_navigation(page)
+    return page
+
+# 지역 선택: 응답이 새 지역으로 분류되도록 상태를 먼저 바꾸고 선택 (ensure_region_selected는 전역 캐시를 건드리므로 사용 안 함)
+async def select_region(page, region_value):
+    await page.wait_for_selector("select.item-select", timeout=10000)
+    current = await page.eval_on_selector("select.item-select", "el => el.value")
+    nav = navigation_state(page)
+    if current == region_value:
+        nav.set_region(region_value)
+        return
+    try:
+        await page.wait_for_selector(f"{LEAK_ROOM_ITEMS}, {MONITORING_ROOM_ITEMS}", timeout=3000)
+    except Exception:
+        pass  # 이전 지역 목록 응답을 먼저 받아 두려는 것, 없어도 진행
+    nav.set_region(region_value)
+    await page.select_option("select.item-select", value=region_value)
+
+# 작업방 목록: 가로챈 API 응답 우선 (화면 목록과 개수/첫 이름이 같을 때만), 아니면 DOM 스냅샷
+async def collect_rooms(page, page_type):
+    item_selector, name_selector = ROOM_SELECTORS[page_type]
+    try:
+        await page.wait_for_selector(item_selector, timeout=10000)
+    except Exception:
+        return []  # 작업방 없음
+    capture = api_capture(page)
+    rooms = await capture.get_rooms(page_type, timeout=2)
+    if rooms is not None:
+        items = page.locator(item_selector)
+        if await items.count() != len(rooms) or (
+                rooms and (await items.first.locator(name_selector).inner_text()).strip() != rooms[0]["name"]):
+            rooms = None  # 이전 지역 응답이거나 화면과 다른 목록
+    capture.record(rooms is not None)
+    if rooms is None:
+        rooms = await snapshot_rooms(page, item_selector, name_selector)
+    return rooms
@@ -0,0 +1,141 @@
+import re
+from dataclasses import dataclass
+from intent import parse_local_intent
+
+# 한 발화 안의 명령 구분 ("서산 로거 세번째 작업방 들어가서 강도 높은순 정렬하고 첫번째 재생")
+CLAUSE_SPLIT_RE = re.compile(r"들어가서|진입해서|이동해서|열어서|가서|하고|하구|그리고|그다음에|그다음|다음에|한\s*뒤에?|한\s*후에?|,")
+
+
+# 실행 단계 (rank: 재배치 순서 - 화면 이동 단계가 먼저, 표 조작 단계는 말한 순서 유지)
+@dataclass
+class SelectRegion:
+    region: str
+    rank = 0
+
+    def describe(self):
+        return f"지역 선택 {self.region}"
+
+
+@dataclass
+class OpenPage:
+    href: str = None  # None이면 현재 페이지 다시 열기 (지역만 바꾼 경우)
+    rank = 1
+
+    def describe(self):
+        return f"페이지 열기 {self.href or '(현재 페이지)'}"
+
+
+@dataclass
+class EnterRoom:
+    index: int = None
+    name: str = None
+    rank = 2
+
+    def describe(self):
+        return f"작업방 진입 {self.index if self.index is not None else repr(self.name)}"
+
+
+@dataclass
+class SortColumn:
+    column: str  # "strength" | "frequency"
+    order: str = "desc"
+    rank = 3
+
+    def describe(self):
+        return f"정렬 {self.column} {self.order}"
+
+
+@dataclass
+class PlayRow:
+    row: int
+    rank = 3
+
+    def describe(self):
+        return f"{self.row}번째 누수음 재생"
+
+
+# 표 정렬 없이 값 순위로 고른 행 재생 ("가장 강한 누수음 재생")
+@dataclass
+class PlayRanked:
+    column: str
+    order: str = "desc"
+    rank = 3
+
+    def describe(self):
+        return f"{self.column} {'최댓값' if self.order == 'desc' else '최솟값'} 누수음 재생"
+
+
+# 표 데이터 질의: 상위/하위 k개 또는 기준값 조건 ("주파수 상위 5개", "강도 0.5 이상")
+@dataclass
+class QueryRows:
+    column: str
+    order: str = "desc"
+    k: int = None
+    op: str = None
+    threshold: float = None
+    rank = 3
+
+    def describe(self):
+        condition = f"{self.op} {self.threshold:g}" if self.op else f"{'상위' if self.order == 'desc' else '하위'} {self.k}개"
+        return f"{self.column} {condition} 조회"
+
+
+# 해석 결과(LocalIntent) 하나 → 단계 목록
+def steps_from_intent(intent):
+    steps = []
+    if intent.region:
+        steps.append(SelectRegion(intent.region))
+    if intent.href:
+        steps.append(OpenPage(intent.href))
+    room_index, row = intent.room_index, intent.play_row
+    if intent.action == "play" and row is None and not intent.sort_column:
+        room_index, row = None, room_index  # "세번째 재생"의 순번은 누수음 행
+    if room_index is not None or intent.room_keyword:
+        steps.append(EnterRoom(room_index, intent.room_keyword))
+    order = intent.sort_order or "desc"
+    if intent.action == "query" and intent.sort_column:
+        steps.append(QueryRows(intent.sort_column, order, intent.top_k, intent.threshold_op, intent.threshold))
+        return steps
+    if intent.action == "play" and row is None and intent.sort_column:
+        # 화면 정렬 순서가 필요 없는 재생 → 표 정렬 클릭 없이 값으로 행 선택
+        steps.append(PlayRanked(intent.sort_column, order))
+        return steps
+    if intent.sort_column:
+        steps.append(SortColumn(intent.sort_column, order))
+    if row is not None:
+        steps.append(PlayRow(row))
+    return steps
+
+# 발화를 절 단위로 나눠 규칙 기반으로 해석 → (단계 목록, 모든 절을 확신하는지)
+def parse_local_plan(user_input, region_value_map):
+    clauses = [c.strip() for c in CLAUSE_SPLIT_RE.split(user_input or "") if c.strip()]
+    steps = []
+    confident = bool(clauses)
+    for clause in clauses:
+        intent = parse_local_intent(clause, region_value_map)
+        confident = confident and intent.confident
+        steps.extend(steps_from_intent(intent))
+    return steps, confident and bool(steps)
+
+# 단계 정리
+# - 화면 이동 단계(지역 → 페이지 → 작업방)를 앞으로 재배치 (표 조작 단계끼리는 말한 순서 유지)
+# - 같은 종류의 화면 이동 단계는 마지막 것만 유지, 지역만 바꾸면 현재 페이지 다시 열기 추가
+# - 정렬 직후 다시 정렬하면 마지막 정렬만 유지
+def optimize_plan(steps):
+    last = {}
+    for i, step in enumerate(steps):
+        if step.rank < 3:
+            last[type(step)] = i
+    steps = [step for i, step in enumerate(steps) if step.rank == 3 or last[type(step)] == i]
+    steps.sort(key=lambda step: step.rank)
+
+    if any(isinstance(step, SelectRegion) for step in steps) and not any(isinstance(step, OpenPage) for step in steps):
+        steps.insert(1, OpenPage())
+
+    optimized = []
+    for step in steps:
+        if optimized and isinstance(step, SortColumn) and isinstance(optimized[-1], SortColumn):
+            optimized[-1] = step
+        else:
+            optimized.append(step)
+    return optimized
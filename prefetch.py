@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import os
+import time
+from page_helpers import collect_rooms, new_tracked_page, select_region
+from room_directory import PAGE_TYPES, room_directory_for, page_type_from_url
+import tracing
+
+# 명령이 끝난 뒤 쉬는 동안, 같은 로그인 컨텍스트의 보조 탭에서 현재 지역의 다른 화면 작업방 목록을 미리 받아
+# 작업방 목록 캐시(room_directory)에 넣어 둠 → 다음 "○○ 작업방 들어가줘"에서 목록 대기 생략
+# 새 명령이 오면 즉시 취소 (운영자 탭/브라우저를 두고 경쟁하지 않음)
+PREFETCH_ENABLED = os.getenv("NELOW_PREFETCH", "1") == "1"
+PREFETCH_DELAY_MS = int(os.getenv("NELOW_PREFETCH_DELAY_MS", "500"))  # 명령 종료 후 화면 로딩이 끝나길 기다리는 시간
+
+
+class RoomPrefetcher:
+    def __init__(self, context, base_url, delay_ms=PREFETCH_DELAY_MS):
+        self.context = context
+        self.base_url = base_url
+        self.delay = delay_ms / 1000
+        self.page = None
+        self.runs = 0
+        self.cancelled = 0
+        self.seconds = 0.0
+        self.cancelled_seconds = 0.0  # 취소로 버려진 작업 시간
+        self._task = None
+        self._working = False
+
+    @classmethod
+    def from_env(cls, context, base_url):
+        return cls(context, base_url) if PREFETCH_ENABLED else None
+
+    # 보조 탭은 처음 한 번만 열고 운영자 탭을 다시 앞으로 가져옴
+    async def _secondary_page(self, front_page):
+        if self.page is None or self.page.is_closed():
+            self.page = await new_tracked_page(self.context)
+            await front_page.bring_to_front()
+        return self.page
+
+    # 명령 처리 후 호출: 운영자 화면에 보이는 종류를 뺀 나머지 화면 중 캐시에 없는 것만 불러옴
+    def schedule(self, page):
+        directory = room_directory_for(self.context)
+        region_value = directory.region
+        if not region_value or page.is_closed():
+            return
+        current = page_type_from_url(page.url)
+        page_types = [t for t in PAGE_TYPES if t != current and not directory.has(t)]
+        if page_types:
+            # 빈 컨텍스트에서 실행 → 미리 불러오기 구간이 방금 끝난 명령의 추적에 섞이지 않음
+            self._task = asyncio.create_task(self._run(page, region_value, page_types), context=contextvars.Context())
+
+    async def _run(self, front_page, region_value, page_types):
+        await asyncio.sleep(self.delay)
+        directory = room_directory_for(self.context)
+        self.runs += 1
+        self._working = True
+        try:
+            await self._load(front_page, directory, region_value, page_types)
+        finally:
+            self._working = False
+
+    async def _load(self, front_page, directory, region_value, page_types):
+        for page_type in page_types:
+            if directory.region != region_value:
+                return  # 그 사이 다른 탭에서 지역이 바뀜
+            started = time.perf_counter()
+            try:
+                with tracing.span("prefetch.rooms", page=page_type):
+                    page = await self._secondary_page(front_page)
+                    await page.goto(self.base_url.rstrip("/") + "/" + page_type)
+                    await select_region(page, region_value)
+                    rooms = await collect_rooms(page, page_type)
+            except asyncio.CancelledError:
+                self.seconds += time.perf_counter() - started
+                self.cancelled_seconds += time.perf_counter() - started
+                raise
+            except Exception as e:
+                print(f"⚠️ 작업방 목록 미리 불러오기 실패 ({page_type}): {e}")
+                return
+            elapsed = time.perf_counter() - started
+            self.seconds += elapsed
+            if rooms and directory.region == region_value:
+                directory.put(page_type, rooms, region_value, prefetched=True)
+                print(f"🔮 미리 불러옴: {page_type} 작업방 {len(rooms)}개 ({elapsed * 1000:.0f}ms)")
+
+    # 새 명령 시작 시 호출: 진행 중인 미리 불러오기를 멈추고 끝날 때까지 기다림 (캐시 동시 수정 방지)
+    async def cancel(self):
+        task, self._task = self._task, None
+        if task and not task.done():
+            if self._working:
+                self.cancelled += 1  # 대기(delay) 중 취소는 한 일이 없으므로 세지 않음
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def close(self):
+        await self.cancel()
+        if self.page and not self.page.is_closed():
+            await self.page.close()
+
+    def report(self):
+        return (f"미리 불러오기 {self.runs}회 (보조 탭 사용 {self.seconds:.1f}초, "
+                f"취소 {self.cancelled}회로 버린 시간 {self.cancelled_seconds:.1f}초), "
+                f"{room_directory_for(self.context).prefetch_stats()}")
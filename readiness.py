@@ -0,0 +1,91 @@
+import os
+import time
+
+# 동작별 최대 대기 시간 (ms) - 느린 현장 회선은 환경변수로 늘림
+READY_TIMEOUTS = {
+    "sort": int(os.getenv("NELOW_SORT_TIMEOUT_MS", "3000")),
+    "room": int(os.getenv("NELOW_ROOM_TIMEOUT_MS", "8000")),
+    "audio": int(os.getenv("NELOW_AUDIO_TIMEOUT_MS", "10000")),
+}
+
+# 헤더 텍스트로 th를 찾아 class 반환 (Playwright 전용 :has/:text selector 대신 DOM에서 직접 검색)
+HEADER_CLASS_JS = """
+(labels) => {
+    const th = Array.from(document.querySelectorAll("th"))
+        .find(th => labels.some(label => th.innerText.includes(label)));
+    return th ? th.className : null;
+}
+"""
+
+SORT_CHANGED_JS = """
+([labels, previous]) => {
+    const th = Array.from(document.querySelectorAll("th"))
+        .find(th => labels.some(label => th.innerText.includes(label)));
+    return !!th && th.className !== previous;
+}
+"""
+
+# 현재 화면 상태 서명: URL, 목록 존재 여부, 누수음 표 첫 행 (작업방 진입 시 바뀜)
+VIEW_SIGNATURE_JS = """
+(listSelector) => {
+    const row = document.querySelector("#vgt-table > tbody > tr");
+    return [location.href, !!document.querySelector(listSelector), row ? row.innerText : ""].join("|");
+}
+"""
+
+VIEW_CHANGED_JS = """
+([listSelector, previous]) => {
+    const row = document.querySelector("#vgt-table > tbody > tr");
+    const signature = [location.href, !!document.querySelector(listSelector), row ? row.innerText : ""].join("|");
+    return signature !== previous;
+}
+"""
+
+AUDIO_SRC_JS = """
+(selector) => {
+    const audio = document.querySelector(selector);
+    return audio ? (audio.currentSrc || audio.src || "") : null;
+}
+"""
+
+# 오디오 src가 (이전과 다르게) 설정되고 재생 가능한 데이터가 로드됐는지
+AUDIO_READY_JS = """
+([selector, previous]) => {
+    const audio = document.querySelector(selector);
+    if (!audio) return false;
+    const src = audio.currentSrc || audio.src;
+    if (!src || (previous && src === previous)) return false;
+    return audio.readyState >= 2;
+}
+"""
+
+
+# 실제 준비 신호를 기다리고 걸린 시간을 로그로 남김 (시간 초과 시 False)
+async def wait_ready(page, action, predicate_js, arg=None, timeout=None):
+    timeout = READY_TIMEOUTS.get(action, 5000) if timeout is None else timeout
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(predicate_js, arg=arg, timeout=timeout)
+        print(f"⏱️ [{action}] 준비 완료 {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+    except Exception:
+        print(f"⚠️ [{action}] {timeout}ms 안에 준비 신호가 없어 계속 진행합니다.")
+        return False
+
+async def get_header_class(page, labels):
+    return await page.evaluate(HEADER_CLASS_JS, list(labels))
+
+async def wait_for_sort_change(page, labels, previous_class):
+    return await wait_ready(page, "sort", SORT_CHANGED_JS, [list(labels), previous_class])
+
+async def get_view_signature(page, list_selector):
+    return await page.evaluate(VIEW_SIGNATURE_JS, list_selector)
+
+async def wait_for_room_view(page, list_selector, previous_signature):
+    return await wait_ready(page, "room", VIEW_CHANGED_JS, [list_selector, previous_signature])
+
+async def get_audio_src(page, selector):
+    return await page.evaluate(AUDIO_SRC_JS, selector)
+
+async def wait_for_audio(page, selector, previous_src=None):
+    return await wait_ready(page, "audio", AUDIO_READY_JS, [selector, previous_src])
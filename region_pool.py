@@ -0,0 +1,74 @@
+import os
+import time
+from nelow import ensure_region_selected
+from nav_state import track_navigation
+from api_capture import api_capture
+from room_directory import room_directory_for
+
+# 미리 열어둘 지역 이름 (쉼표 구분, 예: "서산,당진,대전") - 비어 있으면 풀을 쓰지 않음
+PREWARM_REGIONS = [r.strip() for r in os.getenv("NELOW_PREWARM_REGIONS", "").split(",") if r.strip()]
+MAX_POOL_PAGES = int(os.getenv("NELOW_MAX_POOL_PAGES", "5"))
+
+
+# 자주 쓰는 지역을 같은 로그인 컨텍스트의 탭으로 미리 열어두고, 지역 전환을 탭 전환으로 처리
+class RegionPagePool:
+    def __init__(self, context, base_url, region_values):
+        self.context = context
+        self.base_url = base_url
+        self.region_values = list(region_values)[:MAX_POOL_PAGES]
+        self.pages = {}
+
+    @classmethod
+    async def from_env(cls, context, base_url, region_value_map, region_names=None):
+        names = PREWARM_REGIONS if region_names is None else region_names
+        values = []
+        for name in names:
+            value = region_value_map.get(name)
+            if value:
+                values.append(value)
+            else:
+                print(f"⚠️ 사전 준비 지역명을 찾을 수 없습니다: {name}")
+        if not values:
+            return None
+        pool = cls(context, base_url, values)
+        await pool.warm()
+        return pool
+
+    # 지역별 탭을 열고 지역까지 선택해 둠
+    async def warm(self):
+        room_directory = room_directory_for(self.context)
+        current_region = room_directory.region
+        for region_value in self.region_values:
+            started = time.perf_counter()
+            page = await self.context.new_page()
+            try:
+                api_capture(page)
+                await track_navigation(page)
+                await page.goto(self.base_url)
+                await page.wait_for_selector("select.item-select", timeout=10000)
+                if await ensure_region_selected(page, self.base_url, region_value):
+                    self.pages[region_value] = page
+                    print(f"🔥 지역 {region_value} 탭 준비 {(time.perf_counter() - started) * 1000:.0f}ms")
+                    continue
+            except Exception as e:
+                print(f"⚠️ 지역 {region_value} 탭 준비 실패: {e}")
+            await page.close()
+        room_directory.set_region(current_region, clear=False)  # 화면에 보이는 탭은 그대로
+
+    def has(self, region_value):
+        page = self.pages.get(region_value)
+        return page is not None and not page.is_closed()
+
+    async def switch(self, region_value):
+        started = time.perf_counter()
+        page = self.pages[region_value]
+        await page.bring_to_front()
+        room_directory_for(self.context).set_region(region_value, clear=False)
+        print(f"⏱️ 지역 전환 (탭) {(time.perf_counter() - started) * 1000:.0f}ms")
+        return page
+
+    async def close(self):
+        for page in self.pages.values():
+            if not page.is_closed():
+                await page.close()
+        self.pages.clear()
@@ -0,0 +1,169 @@
+import os
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+ROOM_CACHE_TTL = int(os.getenv("NELOW_ROOM_CACHE_TTL", "600"))  # 작업방 목록 캐시 유지 시간 (초)
+FUZZY_MIN_SCORE = float(os.getenv("NELOW_FUZZY_MIN_SCORE", "0.6"))  # 이 점수 미만이면 일치로 보지 않음
+FUZZY_MIN_MARGIN = 0.1  # 1, 2순위 점수 차가 이보다 작으면 모호한 것으로 보고 거부
+NGRAM = 2
+
+PAGE_TYPES = ("leak-master", "water-leak-logger", "leak-monitoring")
+
+#-----------------------------------------------------------------------------------------------------------
+# 한글 음절 → 자모 분해 (초성/중성/종성), 한글이 아니면 소문자 그대로
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+
+def decompose_jamo(text):
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHOSEONG[code // 588])
+            out.append(_JUNGSEONG[(code % 588) // 28])
+            if code % 28:
+                out.append(_JONGSEONG[code % 28])
+        elif not ch.isspace():
+            out.append(ch.lower())
+    return "".join(out)
+
+# 자모 n-gram (짧은 문자열은 양끝 패딩으로 보완)
+def jamo_ngrams(text, n=NGRAM):
+    jamo = f"^{decompose_jamo(text)}$"
+    if len(jamo) < n:
+        return Counter([jamo])
+    return Counter(jamo[i:i + n] for i in range(len(jamo) - n + 1))
+
+# 현재 URL → 페이지 종류 ("leak-master" 등), 해당 없으면 None
+def page_type_from_url(url):
+    path = urlparse(url).path.strip("/").split("/")[0]
+    return path if path in PAGE_TYPES else None
+
+#-----------------------------------------------------------------------------------------------------------
+# 작업방 이름 자모 n-gram 역색인 (받아쓰기 오타에도 순위 검색 가능)
+class RoomIndex:
+    def __init__(self, rooms, n=NGRAM):
+        self.rooms = rooms
+        self.n = n
+        self.grams = []
+        self.postings = defaultdict(list)
+        for i, room in enumerate(rooms):
+            grams = jamo_ngrams(room.get("name") or "", self.n)
+            self.grams.append(grams)
+            for gram in grams:
+                self.postings[gram].append(i)
+
+    # (점수, room) 목록을 점수 높은 순으로 반환
+    # 점수: 발화 n-gram 중 작업방 이름에 있는 비율 (동점이면 Dice 계수로), 부분 문자열/번호 일치는 1.0
+    def search(self, keyword, limit=5):
+        keyword = (keyword or "").strip()
+        if not keyword:
+            return []
+        exact = [
+            (1.0, room) for room in self.rooms
+            if (room.get("name") and keyword in room["name"]) or keyword == room.get("number")
+        ]
+        if exact:
+            return exact[:limit]
+
+        query = jamo_ngrams(keyword, self.n)
+        query_total = sum(query.values())
+        overlap = defaultdict(int)
+        for gram, count in query.items():
+            for i in self.postings.get(gram, ()):
+                overlap[i] += min(count, self.grams[i][gram])
+
+        scored = []
+        for i, common in overlap.items():
+            dice = 2.0 * common / (query_total + sum(self.grams[i].values()))
+            scored.append((common / query_total, dice, self.rooms[i]))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [(score, room) for score, _, room in scored[:limit]]
+
+    def best(self, keyword, min_score=FUZZY_MIN_SCORE):
+        results = self.search(keyword, limit=2)
+        if not results or results[0][0] < min_score:
+            return None
+        if results[0][0] < 1.0 and len(results) > 1 and results[0][0] - results[1][0] < FUZZY_MIN_MARGIN:
+            return None
+        return results[0]
+
+
+# (지역, 페이지 종류)별 작업방 목록 캐시 (지역 변경 또는 TTL 만료 시 무효화)
+# 미리 불러온(prefetch) 목록은 조회에 쓰이면 적중, 쓰이기 전에 버려지면 낭비로 집계
+class RoomDirectory:
+    def __init__(self, ttl=ROOM_CACHE_TTL):
+        self.ttl = ttl
+        self.region = None
+        self.entries = {}
+        self.prefetched = 0
+        self.prefetch_hits = 0
+        self.prefetch_wasted = 0
+
+    # 지역이 바뀌면 이전 지역 목록은 화면과 맞지 않으므로 모두 버림
+    # (지역별 탭을 따로 유지하는 경우 clear=False로 현재 지역만 바꿈)
+    def set_region(self, region_value, clear=True):
+        if region_value != self.region:
+            if clear:
+                for key in list(self.entries):
+                    self._discard(key)
+            self.region = region_value
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry and entry["prefetched"] and not entry["used"]:
+            self.prefetch_wasted += 1
+
+    def _entry(self, page_type, region_value=None):
+        key = (region_value or self.region, page_type)
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["created"] > self.ttl:
+            self._discard(key)
+            return None
+        return entry
+
+    # 조회 없이 목록이 있는지만 확인 (적중으로 세지 않음)
+    def has(self, page_type, region_value=None):
+        return self._entry(page_type, region_value) is not None
+
+    def get(self, page_type, region_value=None):
+        entry = self._entry(page_type, region_value)
+        if entry is None:
+            return None
+        if entry["prefetched"] and not entry["used"]:
+            self.prefetch_hits += 1
+        entry["used"] = True
+        return entry["index"]
+
+    def put(self, page_type, rooms, region_value=None, prefetched=False):
+        key = (region_value or self.region, page_type)
+        self._discard(key)
+        index = RoomIndex(rooms)
+        self.entries[key] = {"index": index, "created": time.time(), "prefetched": prefetched, "used": False}
+        if prefetched:
+            self.prefetched += 1
+        return index
+
+    def invalidate(self, page_type=None):
+        for key in [k for k in self.entries if page_type is None or k[1] == page_type]:
+            self._discard(key)
+
+    def prefetch_stats(self):
+        settled = self.prefetch_hits + self.prefetch_wasted
+        rate = f"{self.prefetch_hits / settled * 100:.0f}%" if settled else "-"
+        return (f"미리 불러온 목록 {self.prefetched}개: 적중 {self.prefetch_hits} / 낭비 {self.prefetch_wasted} "
+                f"(적중률 {rate}, 대기 {self.prefetched - settled})")
+
+
+# 브라우저 컨텍스트(로그인 세션)별 목록 캐시 - 지역 탭 풀의 탭들은 같은 캐시를 공유하고,
+# 서버 모드에서 운영자별 컨텍스트끼리는 섞이지 않음
+_directories = {}
+
+def room_directory_for(context):
+    directory = _directories.get(context)
+    if directory is None:
+        directory = _directories[context] = RoomDirectory()
+        context.on("close", lambda _: _directories.pop(context, None))
+    return directory
@@ -0,0 +1,426 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from playwright.async_api import async_playwright
+from nelow import AUTH_STATE_PATH, ensure_auth_state, load_region_value_map, login, process_command, save_auth_state
+from api_capture import api_capture
+from nav_state import navigation_state, track_navigation
+from prefetch import RoomPrefetcher
+from room_directory import room_directory_for
+import stt
+import tracing
+
+# 여러 작업자 PC가 같이 쓰는 로컬 명령 서버
+# 브라우저 1개(로그인 1회) + Whisper 모델 1개를 호스트에서 공유하고, 작업자 PC는 녹음/전송만 담당
+#   POST   /sessions                    → {"session": id}  (로그인된 브라우저 컨텍스트 하나 배정)
+#   POST   /sessions/<id>/command       {"text": "..."} → 명령 실행
+#   POST   /sessions/<id>/audio         WAV 본문 → 인식 후 실행 (?execute=0 이면 인식 결과만)
+#   DELETE /sessions/<id>
+#   GET    /stats
+# 사용: python server.py --port 8770
+
+DEFAULT_BASE_URL = "https://kr.neverlosewater.com/"
+SERVER_PORT = int(os.getenv("NELOW_SERVER_PORT", "8770"))
+MAX_SESSIONS = int(os.getenv("NELOW_MAX_SESSIONS", "10"))  # 동시에 배정할 수 있는 컨텍스트(작업자) 수
+WARM_CONTEXTS = int(os.getenv("NELOW_WARM_CONTEXTS", "2"))  # 미리 로그인/접속해 둘 예비 컨텍스트 수
+MAX_CONCURRENT_COMMANDS = int(os.getenv("NELOW_MAX_COMMANDS", "4"))  # 브라우저 전체에서 동시에 실행할 명령 수
+SESSION_QUEUE_LIMIT = 2  # 세션당 실행 중 + 대기 명령 수 (넘으면 429)
+SESSION_IDLE_SECONDS = int(os.getenv("NELOW_SESSION_IDLE", "1800"))  # 이 시간 동안 요청이 없으면 세션 회수
+STT_BATCH_SIZE = int(os.getenv("NELOW_STT_BATCH", "8"))
+STT_BATCH_WINDOW_MS = int(os.getenv("NELOW_STT_BATCH_WINDOW_MS", "50"))  # 첫 요청 후 묶음을 모으는 시간
+STT_QUEUE_LIMIT = 32  # 인식 대기 발화 수 (넘으면 503)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+RETRY_AFTER_SECONDS = 2
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+# 요청을 거절할 때 상태 코드와 함께 던짐 (429/503에는 Retry-After)
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def to_whisper_audio(samples, rate):
+    if rate == stt.SAMPLE_RATE:
+        return samples.astype(np.float32)
+    n = int(round(len(samples) * stt.SAMPLE_RATE / rate))
+    return np.interp(np.linspace(0, len(samples) - 1, n), np.arange(len(samples)), samples).astype(np.float32)
+
+#-----------------------------------------------------------------------------------------------------------
+# 공유 Whisper 모델 하나로 여러 세션의 발화를 짧은 시간 모아 한 번에 디코딩
+class TranscriptionBatcher:
+    def __init__(self, tier, batch_size=STT_BATCH_SIZE, window_ms=STT_BATCH_WINDOW_MS, queue_limit=STT_QUEUE_LIMIT):
+        self.tier = tier
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self.queue = asyncio.Queue(maxsize=queue_limit)
+        self.batches = 0
+        self.utterances = 0
+        self.largest_batch = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def transcribe(self, audio):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((audio, future))
+        except asyncio.QueueFull:
+            raise HttpError(503, "음성 인식 대기열이 가득 찼습니다")
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                texts = await asyncio.to_thread(self.tier.transcribe_batch, [audio for audio, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.utterances += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+
+    def stats(self):
+        return {"batches": self.batches, "utterances": self.utterances, "largest_batch": self.largest_batch,
+                "queued": self.queue.qsize(), "model": stt.report()}
+
+#-----------------------------------------------------------------------------------------------------------
+# 로그인 상태를 공유하는 브라우저 컨텍스트 풀 (예비 컨텍스트는 미리 첫 화면까지 열어 둠)
+class ContextPool:
+    def __init__(self, browser, base_url, auth_state, max_sessions=MAX_SESSIONS, warm=WARM_CONTEXTS):
+        self.browser = browser
+        self.base_url = base_url
+        self.auth_state = auth_state
+        self.max_sessions = max_sessions
+        self.warm = warm
+        self.ready = []
+        self.in_use = 0
+        self._refilling = None
+
+    async def _open(self):
+        started = time.perf_counter()
+        context = await self.browser.new_context(no_viewport=True, storage_state=self.auth_state)
+        page = await context.new_page()
+        navigation_state(page)
+        api_capture(page)
+        await page.goto(self.base_url)
+        await page.wait_for_selector('#sidebar, input[type="password"]', timeout=10000)
+        if not await page.query_selector("#sidebar"):
+            # 서버 실행 중 로그인 만료 → 이 컨텍스트에서 다시 로그인하고, 이후 컨텍스트용 상태 파일도 갱신
+            await login(page)
+            await save_auth_state(context, self.auth_state)
+            print("✅ 로그인 만료 → 재로그인 후 상태 저장")
+        await track_navigation(page)
+        print(f"⏱️ 컨텍스트 준비 {(time.perf_counter() - started) * 1000:.0f}ms")
+        return context, page
+
+    def refill(self):
+        if self._refilling is None or self._refilling.done():
+            self._refilling = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while len(self.ready) < min(self.warm, self.max_sessions - self.in_use):
+            try:
+                self.ready.append(await self._open())
+            except Exception as e:
+                print(f"⚠️ 예비 컨텍스트 준비 실패: {e}")
+                return
+
+    async def acquire(self):
+        if self.in_use >= self.max_sessions:
+            raise HttpError(503, f"세션이 가득 찼습니다 ({self.max_sessions}개)")
+        self.in_use += 1
+        try:
+            entry = self.ready.pop() if self.ready else await self._open()
+        except Exception:
+            self.in_use -= 1
+            raise
+        self.refill()
+        return entry
+
+    async def release(self, context):
+        self.in_use -= 1
+        try:
+            await context.close()
+        finally:
+            self.refill()
+
+    async def close(self):
+        if self._refilling:
+            self._refilling.cancel()
+        for context, _ in self.ready:
+            await context.close()
+        self.ready.clear()
+
+
+# 작업자 한 명의 상태: 자기 컨텍스트/현재 page (지역 선택, 작업방 목록 캐시는 컨텍스트별로 분리됨)
+class Session:
+    def __init__(self, context, page, base_url):
+        self.id = uuid.uuid4().hex[:12]
+        self.context = context
+        self.page = page
+        self.prefetcher = RoomPrefetcher.from_env(context, base_url)
+        self.lock = asyncio.Lock()  # 세션 안에서는 명령을 순서대로 실행
+        self.pending = 0
+        self.commands = 0
+        self.last_used = time.monotonic()
+
+#-----------------------------------------------------------------------------------------------------------
+class CommandServer:
+    def __init__(self, pool, batcher, base_url, api_key, region_value_map,
+                 max_commands=MAX_CONCURRENT_COMMANDS, queue_limit=SESSION_QUEUE_LIMIT, idle_seconds=SESSION_IDLE_SECONDS):
+        self.pool = pool
+        self.batcher = batcher
+        self.base_url = base_url
+        self.api_key = api_key
+        self.region_value_map = region_value_map
+        self.sessions = {}
+        self.command_slots = asyncio.Semaphore(max_commands)
+        self.queue_limit = queue_limit
+        self.idle_seconds = idle_seconds
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, f"세션 없음: {session_id}")
+        session.last_used = time.monotonic()
+        return session
+
+    async def open_session(self):
+        context, page = await self.pool.acquire()
+        session = Session(context, page, self.base_url)
+        self.sessions[session.id] = session
+        print(f"🔗 세션 {session.id} 시작 (사용 중 {len(self.sessions)}/{self.pool.max_sessions})")
+        return session
+
+    async def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise HttpError(404, f"세션 없음: {session_id}")
+        async with session.lock:  # 실행 중인 명령이 끝난 뒤 닫음
+            if session.prefetcher:
+                await session.prefetcher.cancel()
+            await self.pool.release(session.context)
+        print(f"👋 세션 {session_id} 종료 (명령 {session.commands}개)")
+
+    async def run_command(self, session, text):
+        if session.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HttpError(429, "이전 명령이 아직 실행 중입니다")
+        session.pending += 1
+        plan = []
+        try:
+            async with session.lock, self.command_slots:
+                self.running += 1
+                started = time.perf_counter()
+                try:
+                    with tracing.trace("server.command", session=session.id, text=text):
+                        session.page, ok = await process_command(
+                            session.page, self.base_url, text, self.api_key, self.region_value_map,
+                            on_plan=plan.extend, prefetcher=session.prefetcher,
+                        )
+                finally:
+                    self.running -= 1
+                elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            session.pending -= 1
+        session.commands += 1
+        self.completed += 1
+        return {"text": text, "ok": ok, "ms": round(elapsed_ms, 1),
+                "plan": [step.describe() for step in plan]}
+
+    async def transcribe(self, body):
+        from leak_audio import decode_audio
+        try:
+            samples, rate = decode_audio(body)
+        except Exception as e:
+            raise HttpError(400, f"오디오를 읽을 수 없습니다: {e}")
+        return await self.batcher.transcribe(to_whisper_audio(samples, rate))
+
+    async def reap_idle_sessions(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle_seconds))
+            cutoff = time.monotonic() - self.idle_seconds
+            for session_id in [s.id for s in self.sessions.values() if s.last_used < cutoff and not s.pending]:
+                print(f"💤 세션 {session_id} 유휴 {self.idle_seconds}초 → 회수")
+                try:
+                    await self.close_session(session_id)
+                except HttpError:
+                    pass
+
+    def prefetch_stats(self):
+        directories = [room_directory_for(s.context) for s in self.sessions.values()]
+        return {"prefetched": sum(d.prefetched for d in directories), "hits": sum(d.prefetch_hits for d in directories),
+                "wasted": sum(d.prefetch_wasted for d in directories),
+                "cancelled": sum(s.prefetcher.cancelled for s in self.sessions.values() if s.prefetcher)}
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions), "max_sessions": self.pool.max_sessions, "warm_contexts": len(self.pool.ready),
+            "running": self.running, "completed": self.completed, "rejected": self.rejected,
+            "stt": self.batcher.stats(), "prefetch": self.prefetch_stats(),
+        }
+
+    # (method, 경로 조각, 쿼리, 본문) → (상태 코드, 응답 JSON)
+    async def dispatch(self, method, parts, query, body):
+        if parts == ["stats"] and method == "GET":
+            return 200, self.stats()
+        if parts == ["sessions"] and method == "POST":
+            session = await self.open_session()
+            return 201, {"session": session.id}
+        if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            await self.close_session(parts[1])
+            return 200, {"session": parts[1], "closed": True}
+        if len(parts) == 3 and parts[0] == "sessions" and method == "POST":
+            session = self.get_session(parts[1])
+            if parts[2] == "command":
+                try:
+                    text = json.loads(body or b"{}").get("text", "").strip()
+                except (json.JSONDecodeError, AttributeError):
+                    raise HttpError(400, "본문은 {\"text\": ...} 형식의 JSON이어야 합니다")
+                if not text:
+                    raise HttpError(400, "명령어(text)가 비어 있습니다")
+                return 200, await self.run_command(session, text)
+            if parts[2] == "audio":
+                text = await self.transcribe(body)
+                if query.get("execute", ["1"])[0] == "0" or not text:
+                    return 200, {"text": text}
+                return 200, await self.run_command(session, text)
+        if parts and parts[0] in ("stats", "sessions"):
+            raise HttpError(405, f"지원하지 않는 요청: {method} /{'/'.join(parts)}")
+        raise HttpError(404, f"없는 경로: /{'/'.join(parts)}")
+
+    # 최소 HTTP/1.1 처리 (요청 하나 처리 후 연결 종료)
+    async def handle_connection(self, reader, writer):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            writer.close()
+            return
+        status, payload, retry = 500, {"error": "internal error"}, False
+        try:
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", "0") or 0)
+            if length > MAX_BODY_BYTES:
+                raise HttpError(413, f"본문이 너무 큽니다 (최대 {MAX_BODY_BYTES // 1024 // 1024}MB)")
+            body = await reader.readexactly(length) if length else b""
+            url = urlsplit(target)
+            parts = [part for part in url.path.split("/") if part]
+            status, payload = await self.dispatch(method.upper(), parts, parse_qs(url.query), body)
+        except HttpError as e:
+            status, payload, retry = e.status, {"error": e.message}, e.status in (429, 503)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": f"잘못된 요청: {e}"}
+        except Exception as e:
+            print(f"❌ 요청 처리 실패: {e}")
+            payload = {"error": str(e)}
+        finally:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(data)}\r\n"
+                    + (f"Retry-After: {RETRY_AFTER_SECONDS}\r\n" if retry else "")
+                    + "Connection: close\r\n\r\n")
+            try:
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+#-----------------------------------------------------------------------------------------------------------
+async def run_server(args):
+    region_value_map = load_region_value_map()
+    stt.set_region_names(list(region_value_map))
+    stt.warm_up_in_background(("command",))  # 트리거 확인은 작업자 PC에서 하므로 명령어 모델만
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=not args.headed)
+    pool = batcher = None
+    try:
+        auth_state = await ensure_auth_state(browser, args.base_url, args.auth_state)
+        pool = ContextPool(browser, args.base_url, auth_state, args.max_sessions, args.warm)
+        pool.refill()
+        batcher = TranscriptionBatcher(stt.get_tier("command"), args.stt_batch).start()
+        server = CommandServer(pool, batcher, args.base_url, os.getenv("OPENAI_API_KEY"), region_value_map,
+                               args.max_commands)
+        reaper = asyncio.create_task(server.reap_idle_sessions())
+        http = await asyncio.start_server(server.handle_connection, args.host, args.port)
+        print(f"🛰️ 명령 서버 http://{args.host}:{args.port}/ (세션 최대 {args.max_sessions}개, "
+              f"동시 명령 {args.max_commands}개, 예비 컨텍스트 {args.warm}개)")
+        try:
+            async with http:
+                await http.serve_forever()
+        finally:
+            reaper.cancel()
+            for session_id in list(server.sessions):
+                await server.close_session(session_id)
+    finally:
+        if batcher:
+            await batcher.stop()
+        if pool:
+            await pool.close()
+        await browser.close()
+        await playwright.stop()
+        print(f"🧠 {stt.report()}")
+        print("🧹 서버 종료")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NELOW 로컬 명령 서버 (여러 작업자 공유)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--auth-state", default=AUTH_STATE_PATH)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--max-commands", type=int, default=MAX_CONCURRENT_COMMANDS)
+    parser.add_argument("--warm", type=int, default=WARM_CONTEXTS, help="예비 컨텍스트 수")
+    parser.add_argument("--stt-batch", type=int, default=STT_BATCH_SIZE, help="한 번에 디코딩할 최대 발화 수")
+    parser.add_argument("--headed", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_server(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,418 @@
+import argparse
+import ctypes
+import gc
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import warnings
+import numpy as np
+import tracing
+
+# Whisper 음성 인식 (용도별 모델 단계)
+# - trigger: 2초짜리 "하이" 확인용 작은 모델
+# - command: 명령어 전체 인식용 모델
+# 모델은 처음 필요할 때 로드하고, 시작 시 백그라운드에서 미리 로드 + 한 번 추론해 둠(warm-up)
+# CPU 전용 PC: NELOW_WHISPER_MODE=int8 → Linear 가중치 int8 동적 양자화 + 스레드 제한/고정 + 발화 길이로 디코딩 길이 제한
+# 정확도/속도 비교: python stt.py eval --modes default int8  (bench_corpus 항목 중 wav가 있는 것을 기준 문장으로 사용)
+#   WER/CER은 실제 모델 가중치로 측정해야 의미가 있음 (관제 PC에서 --out으로 결과를 남겨 비교)
+
+SAMPLE_RATE = 16000  # Whisper 입력 샘플레이트 (audio_capture.RATE와 동일)
+WHISPER_MODES = ("default", "int8")
+WHISPER_MODE = os.getenv("NELOW_WHISPER_MODE", "default")
+if WHISPER_MODE not in WHISPER_MODES:
+    # 환경 변수 하나 때문에 trigger/server/bench가 import 단계에서 죽지 않도록 기본 모드로 실행
+    print(f"⚠️ 알 수 없는 NELOW_WHISPER_MODE '{WHISPER_MODE}' → default 모드 사용 (가능한 값: {', '.join(WHISPER_MODES)})")
+    WHISPER_MODE = "default"
+QUANTIZED = WHISPER_MODE == "int8"
+# CPU 추론 스레드 수 (0이면 default 모드는 torch 기본값, int8 모드는 물리 코어 추정치, 최대 4개)
+WHISPER_THREADS = int(os.getenv("NELOW_WHISPER_THREADS", "0")) or (
+    max(1, min(4, (os.cpu_count() or 2) // 2)) if QUANTIZED else 0)
+WHISPER_PIN_THREADS = os.getenv("NELOW_WHISPER_PIN", "1" if QUANTIZED else "0") == "1"  # OpenMP 스레드를 코어에 고정
+# 디코딩 토큰 수 상한 = 발화 길이(초) × 이 값 + 여유분 (짧은 명령에서 반복 환각이 224토큰까지 이어지는 것 방지)
+SAMPLE_LEN_TOKENS_PER_SECOND = float(os.getenv("NELOW_WHISPER_TOKENS_PER_SEC", "20"))
+SAMPLE_LEN_MARGIN = 10
+SAMPLE_LEN_MIN = 32
+WHISPER_BEAM_SIZE = int(os.getenv("NELOW_WHISPER_BEAM", "0"))  # 0이면 greedy, 2 이상이면 beam search
+WHISPER_TEMPERATURE_FALLBACK = os.getenv("NELOW_WHISPER_FALLBACK", "0") == "1"  # 실패 시 온도 올려 재시도 (느림)
+INITIAL_PROMPT_MAX_CHARS = 200  # Whisper 프롬프트는 뒤쪽 224토큰만 쓰므로 길이 제한 (중요한 단어를 뒤에)
+
+TIERS = {
+    "trigger": os.getenv("NELOW_WHISPER_TRIGGER_MODEL", "tiny"),
+    "command": os.getenv("NELOW_WHISPER_MODEL", "small"),
+}
+
+# 명령어에 자주 나오는 단어 (페이지 이름은 nelow.dom_elements와 동일)
+COMMAND_VOCABULARY = ["누수음 듣기", "누수음 로거", "누수음 모니터링", "작업방", "강도", "주파수", "정렬", "재생", "틀어줘"]
+
+#-----------------------------------------------------------------------------------------------------------
+# 현재 프로세스 메모리 사용량 (MB) - psutil이 있으면 사용, 없으면 /proc (리눅스), 둘 다 없으면 None
+def current_rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    return None
+
+def _format_mb(value):
+    return f"{value:.0f}MB" if value is not None else "?"
+
+# 지역/페이지 이름으로 만든 initial_prompt (표기 통일 + 오인식 감소)
+def build_initial_prompt(region_names=(), vocabulary=COMMAND_VOCABULARY, max_chars=INITIAL_PROMPT_MAX_CHARS):
+    tail = ", ".join(vocabulary) + "."
+    regions = []
+    budget = max_chars - len(tail)
+    for name in region_names:
+        if len(name) + 2 > budget:
+            break
+        regions.append(name)
+        budget -= len(name) + 2
+    return (", ".join(regions) + ", " if regions else "") + tail
+
+_threads_configured = False
+_models = {}
+_models_lock = threading.Lock()
+
+# 스레드 수/고정은 OpenMP 스레드 풀이 만들어지기 전(torch import 전)에 환경변수로 정해야 함
+def _configure_threads():
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+    if WHISPER_THREADS <= 0:
+        return
+    torch_loaded = "torch" in sys.modules
+    os.environ.setdefault("OMP_NUM_THREADS", str(WHISPER_THREADS))
+    os.environ.setdefault("MKL_NUM_THREADS", str(WHISPER_THREADS))
+    if WHISPER_PIN_THREADS:
+        os.environ.setdefault("OMP_PROC_BIND", "close")
+        os.environ.setdefault("OMP_PLACES", "cores")
+    import torch
+    torch.set_num_threads(WHISPER_THREADS)
+    try:
+        torch.set_num_interop_threads(1)  # 발화 하나를 순서대로 디코딩하므로 연산 간 병렬은 쓰지 않음
+    except RuntimeError:
+        pass  # 이미 병렬 연산이 실행된 뒤에는 바꿀 수 없음
+    pinned = "고정" if WHISPER_PIN_THREADS and not torch_loaded else "고정 안 함"
+    if WHISPER_PIN_THREADS and torch_loaded:
+        print("⚠️ torch가 먼저 로드되어 Whisper 스레드 고정은 적용되지 않습니다")
+    print(f"🧵 Whisper 추론 스레드 {WHISPER_THREADS}개 ({pinned})")
+
+# 버려진 float 가중치를 운영체제에 돌려줌
+# 리눅스(glibc)는 해제된 메모리를 프로세스에 남겨 두므로, 그냥 두면 int8 모드가 float보다 메모리를 더 씀
+def _release_freed_memory():
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass  # malloc_trim이 없는 libc (musl 등)
+
+# whisper의 Linear(가중치를 입력 dtype으로 바꾸는 것만 더한 하위 클래스)는 quantize_dynamic이 바꾸지 못하므로
+# 같은 가중치를 쓰는 nn.Linear를 만들어 부모 모듈에 다시 넣음 (float 모델 결과는 그대로)
+def _as_torch_linears(model):
+    import torch
+    import whisper.model
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, whisper.model.Linear):
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None,
+                                         device="meta")  # 가중치는 아래에서 원래 것을 그대로 연결 (새로 할당하지 않음)
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(parent, name, linear)
+    return model
+
+# Linear 층 가중치를 int8로 동적 양자화 (활성값은 추론 시 양자화, CPU 전용)
+def _quantize_int8(model):
+    import torch
+    model = _as_torch_linears(model)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*quantize_per_tensor.*", category=UserWarning)  # torch 내부 사용 경고
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    _release_freed_memory()
+    return model
+
+# 발화 길이(초) → 디코딩 토큰 수 상한 (모델 문맥 길이의 절반을 넘지 않음)
+def sample_len_for(duration, model):
+    limit = model.dims.n_text_ctx // 2
+    return int(min(limit, max(SAMPLE_LEN_MIN, duration * SAMPLE_LEN_TOKENS_PER_SECOND + SAMPLE_LEN_MARGIN)))
+
+# 모델 이름별로 한 번만 로드 (두 단계가 같은 모델이면 공유) → (모델, 로드 시간, 메모리 증가량)
+def _load_model(model_name, tier_name):
+    with _models_lock:
+        if model_name in _models:
+            print(f"🧠 Whisper [{tier_name}] '{model_name}' 모델 공유 (이미 로드됨)")
+            return _models[model_name][0], 0.0, 0.0
+        _configure_threads()
+        import whisper
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        if QUANTIZED:
+            model = _quantize_int8(whisper.load_model(model_name, device="cpu"))
+        else:
+            model = whisper.load_model(model_name)
+        seconds = time.perf_counter() - started
+        rss_after = current_rss_mb()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        _models[model_name] = (model, seconds, rss_delta)
+        print(f"🧠 Whisper [{tier_name}] '{model_name}' 모델 로드 {seconds:.1f}초, 모드 {WHISPER_MODE} "
+              f"(메모리 +{_format_mb(rss_delta)}, 전체 {_format_mb(rss_after)})")
+        return model, seconds, rss_delta
+
+
+# 모델 단계 하나: 지연 로드, 디코딩 설정, 로드 시간/메모리/발화별 지연 기록
+class WhisperTier:
+    def __init__(self, name, model_name, initial_prompt=None):
+        self.name = name
+        self.model_name = model_name
+        self.initial_prompt = initial_prompt
+        self.model = None
+        self.load_seconds = None
+        self.rss_delta_mb = None
+        self.latencies = []
+        self.audio_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                self.model, self.load_seconds, self.rss_delta_mb = _load_model(self.model_name, self.name)
+        return self.model
+
+    # CPU에서는 fp16 시도(경고 후 fp32로 되돌림)를 하지 않음, 기본은 greedy + 온도 재시도 없음
+    # int8 모드에서는 (무음을 잘라낸) 발화 길이로 디코딩 토큰 수를 제한
+    def decode_options(self, duration=None):
+        options = {
+            "language": "ko",
+            "fp16": self.model.device.type == "cuda",
+            "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0) if WHISPER_TEMPERATURE_FALLBACK else 0.0,
+            "condition_on_previous_text": False,  # 짧은 발화 하나만 인식
+        }
+        if WHISPER_BEAM_SIZE > 1:
+            options["beam_size"] = WHISPER_BEAM_SIZE
+        if self.initial_prompt:
+            options["initial_prompt"] = self.initial_prompt
+        if QUANTIZED and duration is not None:
+            options["sample_len"] = sample_len_for(duration, self.model)
+        return options
+
+    # float32 샘플(16kHz) 또는 파일 경로 → 텍스트
+    def transcribe(self, audio):
+        model = self.load()
+        duration = None if isinstance(audio, str) else len(audio) / SAMPLE_RATE
+        with tracing.span(f"stt.{self.name}", model=self.model_name, mode=WHISPER_MODE) as stt_span:
+            if duration is not None:
+                stt_span.set(audio_seconds=round(duration, 2))  # 구간이 기록되기 전(with 안)에 붙여야 함
+            started = time.perf_counter()
+            result = model.transcribe(audio, **self.decode_options(duration))
+            elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        if duration is not None:
+            self.audio_seconds += duration
+            print(f"⏱️ STT [{self.name}] {elapsed * 1000:.0f}ms (오디오 {duration:.1f}초, RTF {elapsed / max(duration, 1e-6):.2f})")
+        return result["text"].strip()
+
+    # 30초 이하 발화 여러 개를 mel 묶음 하나로 한 번에 디코딩 (서버 모드의 동시 요청용)
+    def transcribe_batch(self, audios):
+        model = self.load()
+        import torch
+        import whisper
+        longest = max(len(audio) for audio in audios) / SAMPLE_RATE
+        duration = sum(len(audio) for audio in audios) / SAMPLE_RATE
+        with tracing.span(f"stt.{self.name}.batch", model=self.model_name, mode=WHISPER_MODE, batch=len(audios),
+                          audio_seconds=round(duration, 2)):
+            started = time.perf_counter()
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels) for audio in audios
+            ]).to(model.device)
+            options = whisper.DecodingOptions(
+                language="ko", fp16=model.device.type == "cuda", temperature=0.0, without_timestamps=True,
+                prompt=self.initial_prompt, beam_size=WHISPER_BEAM_SIZE if WHISPER_BEAM_SIZE > 1 else None,
+                sample_len=sample_len_for(longest, model) if QUANTIZED else None,
+            )
+            results = whisper.decode(model, mels, options)
+            elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        self.audio_seconds += duration
+        print(f"⏱️ STT [{self.name}] 묶음 {len(audios)}개 {elapsed * 1000:.0f}ms "
+              f"(오디오 {duration:.1f}초, RTF {elapsed / max(duration, 1e-6):.2f})")
+        return [result.text.strip() for result in results]
+
+    # 1초 무음으로 한 번 추론 (첫 발화에서 생기는 초기화 지연을 미리 소모)
+    def warm_up(self):
+        self.load()
+        started = time.perf_counter()
+        self.model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), **self.decode_options(1.0))
+        print(f"🔥 Whisper [{self.name}] 예열 {(time.perf_counter() - started) * 1000:.0f}ms")
+        return self
+
+    def report(self):
+        if self.model is None:
+            return f"[{self.name}] '{self.model_name}' 미사용"
+        text = (f"[{self.name}] '{self.model_name}' ({WHISPER_MODE}) 로드 {self.load_seconds:.1f}초, "
+                f"메모리 +{_format_mb(self.rss_delta_mb)}")
+        if self.latencies:
+            latencies = np.array(self.latencies) * 1000
+            text += (f", {len(latencies)}회 중앙값 {np.median(latencies):.0f}ms / 최대 {latencies.max():.0f}ms"
+                     f", RTF {latencies.sum() / 1000 / max(self.audio_seconds, 1e-6):.2f}")
+        return text
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+# 단계 이름 → WhisperTier (지연 시간은 단계별로 따로 기록)
+def get_tier(name):
+    with _tiers_lock:
+        tier = _tiers.get(name)
+        if tier is None:
+            # 트리거 확인에는 프롬프트를 주지 않음 (키워드를 넣으면 잡음도 "하이"로 인식하는 오탐이 늘어남)
+            prompt = None if name == "trigger" else build_initial_prompt()
+            tier = _tiers[name] = WhisperTier(name, TIERS[name], prompt)
+        return tier
+
+# 지역 이름이 정해지면 명령어 단계의 initial_prompt 갱신
+def set_region_names(region_names):
+    get_tier("command").initial_prompt = build_initial_prompt(region_names)
+
+# 백그라운드 스레드에서 여러 단계를 차례로 로드 + 예열 (작은 모델부터)
+def warm_up_in_background(names=("trigger", "command")):
+    def run():
+        for name in names:
+            try:
+                get_tier(name).warm_up()
+            except Exception as e:
+                print(f"⚠️ Whisper [{name}] 예열 실패: {e}")
+    thread = threading.Thread(target=run, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def report():
+    return " / ".join(tier.report() for tier in _tiers.values()) or "Whisper 미사용"
+
+#-----------------------------------------------------------------------------------------------------------
+# 모드별 정확도(WER/CER)와 속도(RTF)/메모리 비교
+# 기준 문장 목록: bench 코퍼스 형식 JSONL 중 "wav"가 있는 항목 ("transcript"가 없으면 "text"를 기준 문장으로 사용)
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+def normalize_transcript(text):
+    return _PUNCTUATION_RE.sub(" ", text).lower().split()
+
+def edit_distance(reference, hypothesis):
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp)))
+        previous = current
+    return previous[-1]
+
+# (기준, 인식) 쌍 목록 → (WER, CER) - 한국어는 띄어쓰기 차이가 많아 CER(공백 제외 글자 단위)을 함께 봄
+def error_rates(pairs):
+    word_errors = word_total = char_errors = char_total = 0
+    for reference, hypothesis in pairs:
+        ref_words, hyp_words = normalize_transcript(reference), normalize_transcript(hypothesis)
+        word_errors += edit_distance(ref_words, hyp_words)
+        word_total += len(ref_words)
+        char_errors += edit_distance("".join(ref_words), "".join(hyp_words))
+        char_total += len("".join(ref_words))
+    return word_errors / max(word_total, 1), char_errors / max(char_total, 1)
+
+# 현재 프로세스의 모드(NELOW_WHISPER_MODE)로 기준 녹음을 모두 인식
+def evaluate_mode(entries, tier_name="command"):
+    from kws import load_wav
+    tier = get_tier(tier_name)
+    tier.warm_up()  # 로드 + 첫 추론 초기화 비용은 지연 시간에서 제외
+    pairs = []
+    for entry in entries:
+        reference = entry.get("transcript") or entry["text"]
+        hypothesis = tier.transcribe(load_wav(entry["wav"]).astype(np.float32) / 32768.0)
+        if normalize_transcript(hypothesis) != normalize_transcript(reference):
+            print(f"  ✏️ '{reference}' → '{hypothesis}'")
+        pairs.append((reference, hypothesis))
+    wer, cer = error_rates(pairs)
+    rss_after = current_rss_mb()
+    latencies = np.array(tier.latencies) * 1000
+    return {
+        "mode": WHISPER_MODE, "model": tier.model_name, "threads": WHISPER_THREADS, "pinned": WHISPER_PIN_THREADS,
+        "utterances": len(pairs), "wer": wer, "cer": cer,
+        "load_seconds": tier.load_seconds,
+        "rss_model_mb": tier.rss_delta_mb,  # 모델 로드(+양자화)로 늘어난 메모리 (torch import 제외)
+        "rss_after_mb": rss_after,
+        "median_ms": float(np.median(latencies)), "rtf": float(latencies.sum() / 1000 / max(tier.audio_seconds, 1e-6)),
+    }
+
+# 모드마다 새 프로세스에서 실행 (같은 프로세스에서 모델을 바꾸면 메모리 측정이 섞임)
+def evaluate_in_subprocess(mode, args):
+    command = [sys.executable, os.path.abspath(__file__), "eval", "--modes", mode, "--json",
+               "--manifest", args.manifest, "--regions", args.regions, "--tier", args.tier]
+    completed = subprocess.run(command, env={**os.environ, "NELOW_WHISPER_MODE": mode},
+                               capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"{mode} 모드 평가 실패:\n{completed.stderr[-2000:]}")
+    print("\n".join(lines[:-1]))  # 로드/오인식 로그
+    return json.loads(lines[-1])
+
+def print_mode_comparison(results):
+    print(f"\n{'모드':<10}{'스레드':>6}{'모델 메모리':>12}{'전체 메모리':>12}{'중앙값':>10}{'RTF':>7}{'WER':>9}{'CER':>9}")
+    for r in results:
+        # 삽입 오류가 많으면 WER/CER이 100%를 넘으므로 칸 사이를 항상 띄움
+        print(f"{r['mode']:<10}{r['threads'] or '기본':>6}{_format_mb(r['rss_model_mb']):>12}"
+              f"{_format_mb(r['rss_after_mb']):>12}{r['median_ms']:>8.0f}ms{r['rtf']:>7.2f}"
+              f" {r['wer'] * 100:>7.1f}% {r['cer'] * 100:>7.1f}%")
+    base = results[0]
+    for r in results[1:]:
+        memory = (f"메모리 {_format_mb(base['rss_model_mb'])} → {_format_mb(r['rss_model_mb'])}"
+                  if base["rss_model_mb"] is not None and r["rss_model_mb"] is not None else "메모리 ?")
+        print(f"🆚 {base['mode']} → {r['mode']}: {memory}, RTF {base['rtf']:.2f} → {r['rtf']:.2f} "
+              f"({base['rtf'] / max(r['rtf'], 1e-6):.1f}배), WER {(r['wer'] - base['wer']) * 100:+.1f}%p, "
+              f"CER {(r['cer'] - base['cer']) * 100:+.1f}%p")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whisper 추론 모드 비교 (정확도/속도/메모리)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_eval = sub.add_parser("eval", help="기준 문장 녹음으로 모드별 WER/CER, RTF, 메모리 비교")
+    p_eval.add_argument("--manifest", default=os.path.join("bench_corpus", "manifest.jsonl"))
+    p_eval.add_argument("--regions", default="region_value_map.json", help="initial_prompt에 넣을 지역 이름")
+    p_eval.add_argument("--tier", default="command", choices=sorted(TIERS))
+    p_eval.add_argument("--modes", nargs="+", default=list(WHISPER_MODES), choices=WHISPER_MODES)
+    p_eval.add_argument("--json", action="store_true", help="결과를 마지막 줄에 JSON으로 출력 (모드 하나일 때)")
+    p_eval.add_argument("--out", help="모드별 결과 JSON (실제 모델 가중치로 측정한 값을 기록해 둘 때)")
+    args = parser.parse_args()
+
+    if args.cmd == "eval":
+        from bench import load_manifest
+        entries = [entry for entry in load_manifest(args.manifest) if entry.get("wav")]
+        if not entries:
+            raise SystemExit(f"❌ 녹음(wav)이 있는 기준 문장이 없습니다: {args.manifest}")
+        if os.path.exists(args.regions):
+            with open(args.regions, "r", encoding="utf-8") as f:
+                set_region_names(json.load(f))
+        if args.modes == [WHISPER_MODE]:
+            results = [evaluate_mode(entries, args.tier)]
+            if args.json:
+                print(json.dumps(results[0], ensure_ascii=False))
+            else:
+                print_mode_comparison(results)
+        else:
+            print(f"📏 기준 문장 {len(entries)}개, 모드 {args.modes} 비교")
+            results = [evaluate_in_subprocess(mode, args) for mode in args.modes]
+            print_mode_comparison(results)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump({"manifest": args.manifest, "results": results}, f, ensure_ascii=False, indent=2)
+            print(f"💾 결과 저장: {args.out}")
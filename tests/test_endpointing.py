@@ -0,0 +1,87 @@
+import numpy as np
+from endpointing import FRAME, RATE, Endpointer, estimate_noise_floor, frame_dbfs, trim_silence
+
+CHUNK = 1024  # audio_capture.CHUNK (프레임 320의 배수가 아님)
+
+
+def tone(seconds, amplitude=8000, freq=440):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+def noise(seconds, amplitude=30, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * RATE)) * amplitude).astype(np.int16)
+
+def chunks(samples, size=CHUNK):
+    return [samples[i:i + size] for i in range(0, len(samples), size)]
+
+# 청크를 넣다가 끝점이 나온 시점(초), 끝까지 안 나오면 None
+def feed_until_end(endpointer, samples):
+    fed = 0
+    for chunk in chunks(samples):
+        fed += len(chunk)
+        if endpointer.feed(chunk):
+            return fed / RATE
+    return None
+
+#-----------------------------------------------------------------------------------------------------------
+def test_frame_dbfs_accepts_bytes_and_drops_partial_frame():
+    samples = tone(0.1)
+    levels = frame_dbfs(samples.tobytes())
+    assert len(levels) == len(samples) // FRAME
+    np.testing.assert_allclose(levels, frame_dbfs(samples))
+
+def test_frame_dbfs_levels():
+    assert frame_dbfs(np.zeros(FRAME - 1, dtype=np.int16)).size == 0
+    full_scale = np.full(FRAME, 32767, dtype=np.int16)
+    assert abs(frame_dbfs(full_scale)[0]) < 0.01
+    assert frame_dbfs(np.zeros(FRAME, dtype=np.int16))[0] < -100
+
+def test_noise_floor_ignores_speech_in_ambient():
+    ambient = np.concatenate([noise(1.6), tone(0.4)])
+    floor = estimate_noise_floor(ambient)
+    assert floor < frame_dbfs(noise(1.0)).max() + 1
+    assert estimate_noise_floor(np.zeros(0, dtype=np.int16), default=-55.0) == -55.0
+
+def test_every_sample_is_analysed_across_chunks():
+    endpointer = Endpointer(no_speech_timeout=100)
+    samples = noise(3.2)
+    for chunk in chunks(samples):
+        endpointer.feed(chunk)
+    assert len(samples) - FRAME < round(endpointer.elapsed * RATE) <= len(samples)
+
+def test_speech_in_chunk_tail_is_detected():
+    # 청크 끝 64샘플(1024 % 320)에만 있는 소리도 다음 청크와 합쳐 판단해야 함
+    tail = CHUNK % FRAME
+    samples = noise(1.0)
+    samples[CHUNK * 3 - tail:CHUNK * 3] = tone(tail / RATE)
+    endpointer = Endpointer(noise_floor_db=estimate_noise_floor(noise(1.0, seed=1)), hangover=0.5)
+    for chunk in chunks(samples[:CHUNK * 4]):
+        endpointer.feed(chunk)
+    assert endpointer.speech_started
+
+def test_ends_after_hangover_following_speech():
+    endpointer = Endpointer(noise_floor_db=estimate_noise_floor(noise(1.0, seed=1)), hangover=1.0)
+    samples = np.concatenate([noise(0.5), tone(1.0), noise(3.0)])
+    ended = feed_until_end(endpointer, samples)
+    assert ended is not None and 2.4 <= ended <= 2.7
+
+def test_ends_on_no_speech_timeout():
+    endpointer = Endpointer(noise_floor_db=estimate_noise_floor(noise(1.0, seed=1)), no_speech_timeout=2.0)
+    ended = feed_until_end(endpointer, noise(4.0))
+    assert not endpointer.speech_started
+    assert ended is not None and 2.0 <= ended <= 2.1
+
+def test_noise_floor_adapts_to_louder_room():
+    endpointer = Endpointer(noise_floor_db=-80.0, no_speech_timeout=100)
+    for chunk in chunks(noise(3.0, amplitude=60)):
+        endpointer.feed(chunk)
+    assert endpointer.noise_floor > -70.0
+
+def test_threshold_never_below_minimum():
+    assert Endpointer(noise_floor_db=-120.0).threshold == -50.0
+
+def test_trim_silence_keeps_speech_with_padding():
+    samples = np.concatenate([noise(1.0), tone(0.5), noise(1.0)])
+    trimmed = trim_silence(samples, threshold_db=-40.0, pad=0.2)
+    assert 0.85 <= len(trimmed) / RATE <= 0.95
+    assert trim_silence(noise(1.0), threshold_db=-40.0).size == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from kws import RATE, KeywordSpotter, TriggerDetector
+
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def loud(seconds=1.5):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(RATE * seconds)) * 8000).astype(np.int16)
+
+def silent(seconds=1.5):
+    return np.zeros(int(RATE * seconds), dtype=np.int16)
+
+@pytest.fixture
+def detector(tmp_path):
+    # 템플릿이 없는 폴더 → KWS 단계 비활성
+    calls = []
+    clock = Clock()
+    detector = TriggerDetector(lambda window: calls.append(window) or False,
+                               spotter=KeywordSpotter(template_dir=str(tmp_path)), clock=clock)
+    return detector, calls, clock
+
+#-----------------------------------------------------------------------------------------------------------
+def test_silence_never_reaches_confirm(detector):
+    detector, calls, _ = detector
+    assert not detector.process(silent())
+    assert calls == []
+    assert (detector.stats.windows, detector.stats.gate_passed) == (1, 0)
+
+def test_confirm_throttled_to_once_per_window_without_templates(detector):
+    detector, calls, clock = detector
+    window = loud(1.5)
+    for _ in range(5):
+        detector.process(window)
+        clock.now += 0.25  # 윈도우 1.5초를 0.25초 간격으로 밀며 검사
+    # 윈도우 길이(1.5초)가 지나기 전의 호출은 건너뜀
+    assert len(calls) == 1
+    clock.now = 101.5
+    detector.process(window)
+    assert len(calls) == 2
+    assert detector.stats.throttled == 4
+    assert detector.stats.kws_candidates == 2
+    assert detector.stats.rejected == 2
+
+def test_confirmed_trigger(tmp_path):
+    clock = Clock()
+    detector = TriggerDetector(lambda window: True, spotter=KeywordSpotter(template_dir=str(tmp_path)), clock=clock)
+    assert detector.process(loud())
+    assert detector.stats.confirmed == 1
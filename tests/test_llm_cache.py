@@ -0,0 +1,87 @@
+import pytest
+import llm_cache
+from llm_cache import LLMCache, fingerprint
+
+FIELDS = {"action": "navigate", "region": "서산", "href": "/water-leak-logger"}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return LLMCache(path=str(tmp_path / "llm_cache.sqlite"), max_entries=3, ttl=60)
+
+#-----------------------------------------------------------------------------------------------------------
+def test_round_trip_and_stats(cache):
+    assert cache.get("서산 누수음 로거", "p1") is None
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    assert cache.get("서산 누수음 로거", "p1") == FIELDS
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.size() == 1
+
+def test_key_ignores_spacing_and_punctuation(cache):
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    assert cache.get("서산누수음로거!", "p1") == FIELDS
+    assert cache.get(" 서산, 누수음 로거 ", "p1") == FIELDS
+
+def test_prompt_fingerprint_separates_entries(cache):
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    assert cache.get("서산 누수음 로거", "p2") is None
+
+def test_fingerprint_changes_with_any_part():
+    base = fingerprint("prompt", {"type": "object"}, "gpt-4o", {"서산": "39"})
+    assert base == fingerprint("prompt", {"type": "object"}, "gpt-4o", {"서산": "39"})
+    assert base != fingerprint("prompt", {"type": "object"}, "gpt-4o", {"서산": "40"})
+    assert base != fingerprint("prompt", {"type": "object"}, "gpt-4o-mini", {"서산": "39"})
+
+def test_expired_entry_is_dropped(cache, clock):
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    clock.now += 59
+    assert cache.get("서산 누수음 로거", "p1") == FIELDS
+    clock.now += 2  # 생성 후 61초: 최근 사용과 관계없이 만료
+    assert cache.get("서산 누수음 로거", "p1") is None
+    assert cache.size() == 0
+
+def test_put_removes_expired_entries(cache, clock):
+    cache.put("당진 누수음 듣기", "p1", FIELDS)
+    clock.now += 61
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    assert cache.size() == 1
+
+def test_evicts_least_recently_used(cache, clock):
+    for text in ("명령 1", "명령 2", "명령 3"):
+        cache.put(text, "p1", FIELDS)
+        clock.now += 1
+    assert cache.get("명령 1", "p1") == FIELDS  # 가장 오래된 항목을 다시 사용
+    clock.now += 1
+    cache.put("명령 4", "p1", FIELDS)
+    assert cache.size() == 3
+    assert cache.get("명령 2", "p1") is None
+    assert all(cache.get(text, "p1") == FIELDS for text in ("명령 1", "명령 3", "명령 4"))
+
+def test_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / "llm_cache.sqlite")
+    LLMCache(path=path).put("서산 누수음 로거", "p1", FIELDS)
+    assert LLMCache(path=path).get("서산 누수음 로거", "p1") == FIELDS
+
+def test_negative_ttl_never_hits(tmp_path, clock):
+    cache = LLMCache(path=str(tmp_path / "llm_cache.sqlite"), ttl=-1)  # bench.py가 쓰는 "캐시 끔" 설정
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    assert cache.get("서산 누수음 로거", "p1") is None
+
+def test_clear(cache):
+    cache.put("서산 누수음 로거", "p1", FIELDS)
+    cache.clear()
+    assert cache.size() == 0
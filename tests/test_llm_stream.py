@@ -0,0 +1,82 @@
+import json
+import pytest
+from llm_stream import StreamingFieldParser, record_stream
+
+RESPONSE = '{"action": "enter_room", "region": "서산", "page": "leak-monitoring", "room_index": 3, "sort": null}'
+
+
+def feed_all(parser, text, size):
+    found = []
+    for i in range(0, len(text), size):
+        found.extend(parser.feed(text[i:i + size]))
+    found.extend(parser.close())
+    return found
+
+#-----------------------------------------------------------------------------------------------------------
+def test_json_fields_emitted_once_complete():
+    parser = StreamingFieldParser()
+    assert parser.feed('{"region": "서') == []  # 닫는 따옴표 전에는 미확정
+    assert parser.feed('산", ') == [("region", "서산")]
+    assert parser.feed('"page": "leak-monitoring"') == [("href", "/leak-monitoring")]
+    assert parser.feed(', "room_index": 1') == []  # 숫자는 뒤에 , 또는 } 가 와야 확정 (12일 수도 있음)
+    assert parser.feed('2}') == [("index", 12)]
+    assert parser.close() == []
+
+@pytest.mark.parametrize("size", [1, 3, 8, len(RESPONSE)])
+def test_json_fields_split_across_chunks(size):
+    parser = StreamingFieldParser()
+    found = feed_all(parser, RESPONSE, size)
+    assert found == [("action", "enter_room"), ("region", "서산"), ("href", "/leak-monitoring"), ("index", 3)]
+    assert parser.result() == (None, "서산", "/leak-monitoring", 3)
+
+def test_json_null_and_unknown_fields_not_emitted():
+    parser = StreamingFieldParser()
+    found = feed_all(parser, '{"action": "sort", "region": null, "page": null, "sort": "desc"}', 5)
+    assert found == [("action", "sort")]
+    # null도 확정된 값으로 기록 (다시 파싱해도 중복 보고 없음)
+    assert parser.fields == {"action": "sort", "region": None, "href": None}
+    assert parser.result() == (None, None, None, None)
+
+def test_json_first_value_wins():
+    parser = StreamingFieldParser()
+    found = feed_all(parser, '{"region": "서산", "region": "대전"}', 4)
+    assert found == [("region", "서산")]
+
+def test_json_escaped_quote_in_value():
+    parser = StreamingFieldParser()
+    assert parser.feed('{"region": "a\\"') == []
+    assert parser.feed('b"}') == [("region", 'a"b')]
+
+def test_json_with_leading_whitespace():
+    parser = StreamingFieldParser()
+    found = feed_all(parser, '\n  {"page": "leak-master"}', 2)
+    assert found == [("href", "/leak-master")]
+
+#-----------------------------------------------------------------------------------------------------------
+def test_line_format_fields_confirmed_at_line_end():
+    parser = StreamingFieldParser()
+    assert parser.feed("REGION: 서") == []
+    assert parser.feed("산\nHREF: /water-") == [("region", "서산")]
+    assert parser.feed("leak-logger\n") == [("href", "/water-leak-logger")]
+    assert parser.feed('ROOM_INDEX: 2') == []
+    assert parser.close() == [("index", 2)]
+    assert parser.result() == (None, "서산", "/water-leak-logger", 2)
+
+def test_line_format_click_selector():
+    parser = StreamingFieldParser()
+    found = feed_all(parser, 'ACTION: click\nclick("text=누수음 로거")\nclick("text=기타")', 4)
+    assert found == [("selector", "text=누수음 로거")]
+    assert parser.result() == ("text=누수음 로거", None, None, None)
+
+def test_line_format_without_fields():
+    parser = StreamingFieldParser()
+    assert feed_all(parser, "알 수 없는 명령입니다.", 3) == []
+    assert parser.result() == (None, None, None, None)
+
+#-----------------------------------------------------------------------------------------------------------
+def test_record_stream(tmp_path):
+    path = tmp_path / "record.jsonl"
+    record_stream("서산 로거", ['{"region"', ': "서산"}'], path=str(path))
+    record_stream("무시", ["x"], path=None)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"match": "서산 로거", "chunks": ['{"region"', ': "서산"}']}]
@@ -0,0 +1,90 @@
+import pytest
+from intent import LocalIntent
+from plan import (
+    EnterRoom, OpenPage, PlayRanked, PlayRow, QueryRows, SelectRegion, SortColumn,
+    optimize_plan, parse_local_plan, steps_from_intent,
+)
+
+REGIONS = {"서산": "39", "대전": "30", "당진": "44"}
+
+#-----------------------------------------------------------------------------------------------------------
+def test_multi_clause_command():
+    steps, confident = parse_local_plan("서산 로거 세번째 작업방 들어가서 강도 높은순 정렬하고 첫번째 재생", REGIONS)
+    assert confident
+    assert steps == [
+        SelectRegion("서산"), OpenPage("/water-leak-logger"), EnterRoom(3),
+        SortColumn("strength", "desc"), PlayRow(1),
+    ]
+
+@pytest.mark.parametrize("command, expected", [
+    ("서산 누수음 로거", [SelectRegion("서산"), OpenPage("/water-leak-logger")]),
+    ("주파수 상위 5개", [QueryRows("frequency", "desc", k=5)]),
+    ("가장 강한 누수음 재생", [PlayRanked("strength", "desc")]),
+    ("세번째 재생", [PlayRow(3)]),  # 정렬 없는 "세번째 재생"의 순번은 누수음 행
+])
+def test_confident_single_clause(command, expected):
+    assert parse_local_plan(command, REGIONS) == (expected, True)
+
+@pytest.mark.parametrize("command", [
+    "안녕하세요",
+    "",
+    "대전으로 바꿔",  # 지역만 있고 동작이 없음
+    "당진 누수음 화면으로 가 줘",  # 페이지 이름이 불분명 → LLM으로
+])
+def test_not_confident(command):
+    _, confident = parse_local_plan(command, REGIONS)
+    assert not confident
+
+def test_one_unsure_clause_makes_plan_unsure():
+    steps, confident = parse_local_plan("서산 누수음 로거 가서 안녕하세요", REGIONS)
+    assert steps == [SelectRegion("서산"), OpenPage("/water-leak-logger")]
+    assert not confident
+
+#-----------------------------------------------------------------------------------------------------------
+def test_steps_from_intent_play_ranked_without_sort_click():
+    intent = LocalIntent(action="play", sort_column="frequency", sort_order="asc")
+    assert steps_from_intent(intent) == [PlayRanked("frequency", "asc")]
+
+def test_steps_from_intent_room_then_sorted_play():
+    # 정렬이 있으면 순번은 작업방, 재생 행은 play_row
+    intent = LocalIntent(action="play", room_index=2, sort_column="strength", play_row=4)
+    assert steps_from_intent(intent) == [EnterRoom(2), SortColumn("strength", "desc"), PlayRow(4)]
+
+def test_steps_from_intent_room_keyword():
+    intent = LocalIntent(action="enter_room", region="대전", href="/leak-monitoring", room_keyword="3구역")
+    assert steps_from_intent(intent) == [SelectRegion("대전"), OpenPage("/leak-monitoring"), EnterRoom(None, "3구역")]
+
+def test_steps_from_intent_query_threshold():
+    intent = LocalIntent(action="query", sort_column="strength", threshold_op="ge", threshold=0.5)
+    assert steps_from_intent(intent) == [QueryRows("strength", "desc", None, "ge", 0.5)]
+
+#-----------------------------------------------------------------------------------------------------------
+def test_optimize_moves_navigation_first():
+    steps = [SortColumn("strength"), EnterRoom(2), PlayRow(1), SelectRegion("서산"), OpenPage("/leak-monitoring")]
+    assert optimize_plan(steps) == [
+        SelectRegion("서산"), OpenPage("/leak-monitoring"), EnterRoom(2), SortColumn("strength"), PlayRow(1),
+    ]
+
+def test_optimize_keeps_last_navigation_step_of_each_kind():
+    steps = [SelectRegion("서산"), OpenPage("/water-leak-logger"), SelectRegion("대전"), OpenPage("/leak-monitoring"), EnterRoom(1), EnterRoom(2)]
+    assert optimize_plan(steps) == [SelectRegion("대전"), OpenPage("/leak-monitoring"), EnterRoom(2)]
+
+def test_optimize_reopens_current_page_after_region_only():
+    assert optimize_plan([SelectRegion("대전")]) == [SelectRegion("대전"), OpenPage()]
+    assert optimize_plan([PlayRow(1), SelectRegion("대전")]) == [SelectRegion("대전"), OpenPage(), PlayRow(1)]
+
+def test_optimize_collapses_consecutive_sorts_only():
+    steps = [SortColumn("strength", "desc"), SortColumn("frequency", "asc"), PlayRow(1), SortColumn("strength", "asc")]
+    assert optimize_plan(steps) == [SortColumn("frequency", "asc"), PlayRow(1), SortColumn("strength", "asc")]
+
+def test_optimize_keeps_table_steps_in_spoken_order():
+    steps = [PlayRow(2), QueryRows("frequency", k=5), PlayRanked("strength")]
+    assert optimize_plan(steps) == steps
+
+def test_optimize_empty():
+    assert optimize_plan([]) == []
+
+def test_parsed_plan_optimized_to_last_navigation():
+    steps, confident = parse_local_plan("서산 누수음 로거 가서 대전 누수 모니터링 들어가서 두번째 작업방 들어가서 세번째 재생", REGIONS)
+    assert confident
+    assert optimize_plan(steps) == [SelectRegion("대전"), OpenPage("/leak-monitoring"), EnterRoom(2), PlayRow(3)]
@@ -0,0 +1,172 @@
+import pytest
+import room_directory
+from room_directory import RoomDirectory, RoomIndex, decompose_jamo, jamo_ngrams, page_type_from_url
+
+ROOMS = [
+    {"name": "서산 정수장 1구역", "number": "39-001"},
+    {"name": "서산 배수지 2구역", "number": "39-002"},
+    {"name": "대산 공단 관로", "number": "39-003"},
+    {"name": "음암면 상수관", "number": "39-004"},
+]
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(room_directory.time, "time", clock)
+    return clock
+
+def names(results):
+    return [room["name"] for _, room in results]
+
+#-----------------------------------------------------------------------------------------------------------
+def test_decompose_jamo():
+    # 한글 음절은 초/중/종성으로 풀고, 공백은 버리고 영문은 소문자로
+    assert decompose_jamo("서산 A1") == "ㅅㅓㅅㅏㄴa1"
+    assert decompose_jamo("가") == "ㄱㅏ"
+
+def test_jamo_ngrams_have_boundaries():
+    assert jamo_ngrams("가") == {"^ㄱ": 1, "ㄱㅏ": 1, "ㅏ$": 1}
+
+def test_page_type_from_url():
+    assert page_type_from_url("https://nelow.example/leak-monitoring/3?tab=1") == "leak-monitoring"
+    assert page_type_from_url("https://nelow.example/water-leak-logger") == "water-leak-logger"
+    assert page_type_from_url("https://nelow.example/home") is None
+
+#-----------------------------------------------------------------------------------------------------------
+def test_substring_and_number_match_score_full():
+    index = RoomIndex(ROOMS)
+    assert index.search("정수장") == [(1.0, ROOMS[0])]
+    assert index.search("39-002") == [(1.0, ROOMS[1])]
+
+def test_empty_or_unknown_keyword():
+    index = RoomIndex(ROOMS)
+    assert index.search("") == []
+    assert index.search("   ") == []
+    assert index.search("xyz") == []
+    assert index.best("xyz") is None
+
+def test_typo_ranks_intended_room_first():
+    # 받아쓰기 오타 (음암면 → 음앙면, 공단 → 공당)
+    index = RoomIndex(ROOMS)
+    assert names(index.search("음앙면"))[0] == "음암면 상수관"
+    assert index.best("음앙면")[1] is ROOMS[3]
+    assert index.best("대산 공당")[1] is ROOMS[2]
+
+def test_search_limit():
+    index = RoomIndex(ROOMS)
+    assert len(index.search("서산 구역", limit=1)) == 1
+
+def test_best_rejects_low_score():
+    index = RoomIndex(ROOMS)
+    score, _ = index.search("정수쟝")[0]
+    assert score < room_directory.FUZZY_MIN_SCORE
+    assert index.best("정수쟝") is None
+    assert index.best("정수쟝", min_score=0.5)[1] is ROOMS[0]
+
+def test_best_rejects_ambiguous_fuzzy_match():
+    # 1, 2순위 점수가 같으면 어느 방인지 정할 수 없음
+    index = RoomIndex([{"name": "정수장 1구역", "number": "1"}, {"name": "정수장 2구역", "number": "2"}])
+    results = index.search("정수장 구역")
+    assert results[0][0] >= room_directory.FUZZY_MIN_SCORE
+    assert results[0][0] - results[1][0] < room_directory.FUZZY_MIN_MARGIN
+    assert index.best("정수장 구역") is None
+
+def test_best_keeps_first_exact_match():
+    # 부분 문자열 일치(1.0)는 여러 개여도 모호성 검사 없이 첫 번째
+    index = RoomIndex(ROOMS)
+    assert index.best("구역")[1] is ROOMS[0]
+
+#-----------------------------------------------------------------------------------------------------------
+def test_directory_put_get_has(clock):
+    directory = RoomDirectory(ttl=60)
+    directory.set_region("서산")
+    assert not directory.has("leak-monitoring")
+    assert directory.get("leak-monitoring") is None
+
+    index = directory.put("leak-monitoring", ROOMS)
+    assert directory.has("leak-monitoring")
+    assert directory.get("leak-monitoring") is index
+    assert directory.get("leak-monitoring", region_value="서산") is index
+    assert directory.get("leak-monitoring", region_value="대전") is None
+
+def test_directory_ttl(clock):
+    directory = RoomDirectory(ttl=60)
+    directory.put("leak-monitoring", ROOMS, region_value="서산")
+    clock.now += 60
+    assert directory.has("leak-monitoring", "서산")
+    clock.now += 1
+    assert not directory.has("leak-monitoring", "서산")
+    assert directory.get("leak-monitoring", "서산") is None
+
+def test_region_change_clears_entries(clock):
+    directory = RoomDirectory()
+    directory.set_region("서산")
+    directory.put("leak-monitoring", ROOMS)
+    directory.set_region("서산")  # 같은 지역이면 유지
+    assert directory.has("leak-monitoring")
+    directory.set_region("대전")
+    assert not directory.has("leak-monitoring", "서산")
+
+def test_region_change_without_clear_keeps_entries(clock):
+    directory = RoomDirectory()
+    directory.set_region("서산")
+    directory.put("leak-monitoring", ROOMS)
+    directory.set_region("대전", clear=False)
+    assert directory.region == "대전"
+    assert directory.has("leak-monitoring", "서산")
+    assert not directory.has("leak-monitoring")
+
+def test_invalidate_by_page_type(clock):
+    directory = RoomDirectory()
+    directory.put("leak-monitoring", ROOMS, region_value="서산")
+    directory.put("water-leak-logger", ROOMS, region_value="서산")
+    directory.invalidate("leak-monitoring")
+    assert not directory.has("leak-monitoring", "서산")
+    assert directory.has("water-leak-logger", "서산")
+    directory.invalidate()
+    assert not directory.entries
+
+#-----------------------------------------------------------------------------------------------------------
+def test_prefetch_hit_counted_once(clock):
+    directory = RoomDirectory()
+    directory.put("leak-monitoring", ROOMS, region_value="서산", prefetched=True)
+    assert directory.has("leak-monitoring", "서산")  # has는 적중으로 세지 않음
+    assert directory.prefetch_hits == 0
+    directory.get("leak-monitoring", "서산")
+    directory.get("leak-monitoring", "서산")
+    assert (directory.prefetched, directory.prefetch_hits, directory.prefetch_wasted) == (1, 1, 0)
+
+def test_prefetch_wasted_on_region_change_ttl_and_replace(clock):
+    directory = RoomDirectory(ttl=60)
+    directory.set_region("서산")
+    directory.put("leak-monitoring", ROOMS, prefetched=True)
+    directory.set_region("대전")  # 쓰이기 전에 버려짐
+
+    directory.put("leak-monitoring", ROOMS, prefetched=True)
+    clock.now += 61
+    assert directory.get("leak-monitoring") is None  # 만료로 버려짐
+
+    directory.put("leak-master", ROOMS, prefetched=True)
+    directory.put("leak-master", ROOMS)  # 덮어써서 버려짐
+    assert (directory.prefetched, directory.prefetch_hits, directory.prefetch_wasted) == (3, 0, 3)
+
+def test_used_prefetch_not_wasted_on_discard(clock):
+    directory = RoomDirectory()
+    directory.put("leak-monitoring", ROOMS, region_value="서산", prefetched=True)
+    directory.get("leak-monitoring", "서산")
+    directory.invalidate()
+    assert (directory.prefetch_hits, directory.prefetch_wasted) == (1, 0)
+    assert "적중 1 / 낭비 0" in directory.prefetch_stats()
+    assert "적중률 100%" in directory.prefetch_stats()
+
+def test_prefetch_stats_without_settled():
+    assert "적중률 -" in RoomDirectory().prefetch_stats()
@@ -0,0 +1,241 @@
+import argparse
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import numpy as np
+from dotenv import load_dotenv
+
+# 명령별 구간 지연 추적 (녹음 → STT → LLM → 해석 → 브라우저 조작)
+# NELOW_TRACE=traces.jsonl 이면 구간(span)마다 한 줄씩 기록, 설정하지 않으면 아무것도 하지 않음
+#   with tracing.span("llm", model="gpt-4o"): ...      /  @tracing.traced("pw.sort")
+# 요약: python tracing.py summary traces.jsonl --since 24h
+
+load_dotenv()
+TRACE_PATH = os.getenv("NELOW_TRACE", "")
+ENABLED = bool(TRACE_PATH)
+PERCENTILES = (50, 95, 99)
+
+_trace_id = contextvars.ContextVar("nelow_trace_id", default=None)
+_current_span = contextvars.ContextVar("nelow_span", default=None)
+
+
+# JSONL 기록 (STT 스레드와 이벤트 루프에서 동시에 쓰므로 잠금)
+class TraceWriter:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+_writer = None
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        _writer = TraceWriter(TRACE_PATH)
+    return _writer
+
+
+# 구간 하나: 시작/끝 시각, 부모 구간, 속성(토큰 수 등), 예외 발생 여부
+class Span:
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "_started", "_token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:12]
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = _trace_id.get()
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        _current_span.reset(self._token)
+        record = {"trace": self.trace_id, "span": self.span_id, "parent": self.parent_id, "name": self.name,
+                  "start": round(self.start, 6), "ms": round(elapsed_ms, 3)}
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _get_writer().write(record)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# 추적 꺼짐: 모든 호출이 이 객체 하나를 돌려줌 (기록/시간 측정 없음)
+class _NoopSpan:
+    trace_id = None
+
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+
+# 명령 단위 추적: 추적 ID를 정하고 최상위 구간 시작 (이미 추적 중이면 그 안의 구간)
+class _Trace(Span):
+    __slots__ = ("_trace_token",)
+
+    def __init__(self, name, trace_id, attrs):
+        super().__init__(name, attrs)
+        self.trace_id = trace_id
+
+    def __enter__(self):
+        trace_id = self.trace_id or _trace_id.get() or uuid.uuid4().hex[:16]
+        self._trace_token = _trace_id.set(trace_id)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        result = super().__exit__(exc_type, exc, tb)
+        _trace_id.reset(self._trace_token)
+        return result
+
+
+def span(name, **attrs):
+    return Span(name, attrs) if ENABLED else NOOP_SPAN
+
+def trace(name, trace_id=None, **attrs):
+    return _Trace(name, trace_id, attrs) if ENABLED else NOOP_SPAN
+
+# 현재 구간에 속성 추가 (예: LLM 응답 후 토큰 수)
+def annotate(**attrs):
+    if ENABLED:
+        current = _current_span.get()
+        if current is not None:
+            current.set(**attrs)
+
+def current_trace_id():
+    return _trace_id.get()
+
+# 함수 전체를 구간으로 기록하는 데코레이터 (추적이 꺼져 있으면 원래 함수를 그대로 돌려줌)
+def traced(name):
+    def decorate(func):
+        if not ENABLED:
+            return func
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Span(name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+#-----------------------------------------------------------------------------------------------------------
+# 요약
+_WINDOW_RE = re.compile(r"(\d+(?:\.\d+)?)([smhd])")
+_WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_window(text):
+    match = _WINDOW_RE.fullmatch(text or "")
+    if not match:
+        raise argparse.ArgumentTypeError(f"기간 형식: 30m, 24h, 7d (입력: {text})")
+    return float(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+
+def load_spans(path, since=None):
+    cutoff = time.time() - since if since else None
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 기록 도중 종료된 마지막 줄
+            if cutoff is None or record.get("start", 0) >= cutoff:
+                spans.append(record)
+    return spans
+
+# 구간 이름별 지연 분포 {이름: {"count", "errors", "p50", "p95", "p99", "max"}}
+def stage_stats(spans):
+    by_name = {}
+    for record in spans:
+        by_name.setdefault(record["name"], []).append(record)
+    stats = {}
+    for name, records in by_name.items():
+        ms = np.array([r["ms"] for r in records])
+        entry = {"count": len(ms), "errors": sum(1 for r in records if "error" in r), "max": float(ms.max())}
+        for p, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+            entry[f"p{p}"] = float(value)
+        stats[name] = entry
+    return stats
+
+def print_summary(spans, slowest=5):
+    if not spans:
+        print("기록된 구간이 없습니다.")
+        return
+    stats = stage_stats(spans)
+    traces = {r["trace"] for r in spans if r.get("trace")}
+    print(f"📊 구간 {len(spans)}개, 명령 {len(traces)}개")
+    print(f"{'구간':<28}{'횟수':>7}{'오류':>6}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'최대':>10}")
+    for name in sorted(stats, key=lambda n: -stats[n]["p50"]):
+        s = stats[name]
+        print(f"{name:<28}{s['count']:>7}{s['errors']:>6}"
+              + "".join(f"{s['p' + str(p)]:>10.1f}" for p in PERCENTILES) + f"{s['max']:>10.1f}")
+
+    # 가장 느린 명령과 그 안에서 오래 걸린 구간
+    roots = sorted((r for r in spans if r.get("trace") and r.get("parent") is None),
+                   key=lambda r: -r["ms"])[:slowest]
+    for root in roots:
+        children = sorted((r for r in spans if r.get("trace") == root["trace"] and r is not root),
+                          key=lambda r: -r["ms"])[:3]
+        detail = ", ".join(f"{c['name']} {c['ms']:.0f}ms" for c in children)
+        attrs = root.get("attrs", {})
+        label = attrs.get("text") or attrs.get("user_input") or ""
+        print(f"🐢 {root['trace']} {root['name']} {root['ms']:.0f}ms {label!r} → {detail}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NELOW 구간 지연 기록 요약")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_summary = sub.add_parser("summary", help="구간별 p50/p95/p99")
+    p_summary.add_argument("path", nargs="?", default=TRACE_PATH or "traces.jsonl")
+    p_summary.add_argument("--since", type=parse_window, help="최근 기간만 (예: 30m, 24h, 7d)")
+    p_summary.add_argument("--slowest", type=int, default=5, help="가장 느린 명령 몇 개를 보여줄지")
+    args = parser.parse_args()
+
+    if args.cmd == "summary":
+        print_summary(load_spans(args.path, args.since), args.slowest)
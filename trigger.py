@@ -1,148 +1,220 @@
-import whisper
-import pyaudio
 import wave
 import time
 import os
+import asyncio
+import contextvars
+import threading
 import keyboard
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 # from pynput import keyboard as kb
-from nelow import process_command, create_logged_in_session, load_region_value_map 
+from nelow import process_command, create_logged_in_session, load_region_value_map
+from region_pool import RegionPagePool
+from prefetch import RoomPrefetcher
+from audio_capture import AudioCapture, sliding_windows, RATE, CHUNK
+from kws import TriggerDetector
+from endpointing import Endpointer, estimate_noise_floor, trim_silence, HANGOVER_SECONDS
+import stt
+import tracing
 from dotenv import load_dotenv
-    
+
 load_dotenv()
 
 
 TRIGGER_KEYWORD = "하이"
 AUDIO_FILE = "temp.wav"
-RECORD_SECONDS = 3  # 감지 주기
-RATE = 16000
-CHUNK = 1024
+DEBUG_SAVE_WAV = os.getenv("NELOW_DEBUG_WAV") == "1"  # 디버그용: 녹음한 오디오를 temp.wav로 저장
+TRIGGER_WINDOW_SECONDS = 2  # 트리거 감지 윈도우 길이
+TRIGGER_HOP_SECONDS = 0.5  # 윈도우 이동 간격 (윈도우끼리 겹침)
+TRIGGER_STATS_INTERVAL = 60  # 트리거 단계별 통계 출력 주기 (초)
 
 #명령어 STT 설정
-SILENCE_THRESHOLD = 500  # 무음 감지 임계값 (0~32768)
-SILENCE_DURATION = 3  # 무음이 몇 초 이상 지속되면 녹음 종료
+SILENCE_DURATION = HANGOVER_SECONDS  # 무음이 몇 초 이상 지속되면 녹음 종료 (NELOW_HANGOVER_SECONDS)
 MAX_RECORD_SECONDS = 15  # 최대 녹음 시간
+AMBIENT_SECONDS = 1.0  # 녹음 직전 이만큼의 오디오로 잡음 바닥 추정
 
-# Whisper 모델 로드
-model = whisper.load_model("small")  # "tiny", "base", "small", "medium", "large"
-
-# 오디오 녹음 함수
-def record_audio(filename=AUDIO_FILE, record_seconds=RECORD_SECONDS):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16,
-                    channels=1,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
-
-    print("🎤 음성 감지 중...")
-
-    frames = []
-    for _ in range(0, int(RATE / CHUNK * record_seconds)):
-        data = stream.read(CHUNK)
-        frames.append(data)
+COMMAND_QUEUE_SIZE = 3  # 실행 대기 중인 명령 최대 개수 (넘치면 새 명령을 버림)
 
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+# Whisper 모델은 stt.py에서 단계별로 지연 로드 (트리거 확인: NELOW_WHISPER_TRIGGER_MODEL, 명령어: NELOW_WHISPER_MODEL)
 
+# WAV 저장
+def save_wav(samples, filename=AUDIO_FILE):
     wf = wave.open(filename, 'wb')
     wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
+    wf.setsampwidth(2)  # paInt16
     wf.setframerate(RATE)
-    wf.writeframes(b''.join(frames))
+    wf.writeframes(samples.astype(np.int16).tobytes())
     wf.close()
 
-# STT로 텍스트 추출
-def transcribe_audio(filename=AUDIO_FILE):
-    result = model.transcribe(filename, language="ko")
-    return result['text'].strip()
-
-# 트리거 감지 루프
-def listen_for_trigger():
+# int16 PCM → Whisper 입력용 float32 (-1.0 ~ 1.0)
+def pcm_to_float32(samples):
+    return samples.astype(np.float32) / 32768.0
+
+# 오디오 녹음 함수 (캡처 링버퍼에서 최근 record_seconds초를 int16 배열로 꺼냄)
+def record_audio(capture, record_seconds=TRIGGER_WINDOW_SECONDS):
+    samples = capture.latest(record_seconds)
+    if DEBUG_SAVE_WAV:
+        save_wav(samples)
+    return samples
+
+# Whisper로 트리거 후보 확인 (명령어용보다 작은 모델)
+def confirm_trigger(window):
+    text = stt.get_tier("trigger").transcribe(pcm_to_float32(window)) if len(window) else ""
+    print(f"🎧 인식 결과: '{text}'")
+    return TRIGGER_KEYWORD in text
+
+# 트리거 감지 루프 (겹치는 슬라이딩 윈도우로 경계에 걸친 발화도 놓치지 않음)
+# 에너지 게이트 → 경량 KWS → Whisper 확인 순서로, Whisper는 후보 윈도우에서만 실행
+def listen_for_trigger(capture, detector=None):
+    detector = detector or TriggerDetector(confirm=confirm_trigger)
     print("🟢 트리거 키워드 대기 중... (중단하려면 Ctrl+C)")
-    while True:
-        record_audio()
-        text = transcribe_audio()
-        print(f"🎧 인식 결과: '{text}'")
-
-        if TRIGGER_KEYWORD in text:
+    print("🎤 음성 감지 중...")
+    last_report = time.time()
+    for _, window in sliding_windows(capture, TRIGGER_WINDOW_SECONDS, TRIGGER_HOP_SECONDS):
+        if detector.process(window):
             print("🚨 트리거 키워드 감지됨!")
+            print(f"📈 {detector.stats.report()}")
             return
 
-def record_until_silence(filename=AUDIO_FILE):
-    print("🎙️ 명령어를 말해주세요. (묵음 3초 → 자동 종료)")
+        if time.time() - last_report >= TRIGGER_STATS_INTERVAL:
+            print(f"📈 {detector.stats.report()}")
+            last_report = time.time()
+
+# 같은 캡처 스트림에서 이어서 녹음하므로 트리거 직후 공백 없이 명령어를 받음
+def record_until_silence(capture, start=None):
+    print(f"🎙️ 명령어를 말해주세요. (묵음 {SILENCE_DURATION:g}초 → 자동 종료)")
 
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16,
-                    channels=1,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
+    start = capture.position if start is None else start
+    ambient = capture.ring.read(start - capture.seconds_to_samples(AMBIENT_SECONDS), start)
+    endpointer = Endpointer(noise_floor_db=estimate_noise_floor(ambient), hangover=SILENCE_DURATION)
 
     frames = []
-    silence_count = 0
     max_frames = int(RATE / CHUNK * MAX_RECORD_SECONDS)
 
-    for _ in range(max_frames):
-        data = stream.read(CHUNK)
+    for data in capture.iter_chunks(start):
         frames.append(data)
 
-        # 무음인지 체크
-        audio_data = wave.struct.unpack("%dh" % (len(data) // 2), data)
-        volume = max(audio_data)
-
-        if volume < SILENCE_THRESHOLD:
-            silence_count += 1
-        else:
-            silence_count = 0
-
-        if silence_count > int(SILENCE_DURATION * (RATE / CHUNK)):
+        if endpointer.feed(data):
             print("🔇 묵음 감지 → 녹음 종료")
             break
+        if len(frames) >= max_frames:
+            print("⏱️ 최대 녹음 시간 도달 → 녹음 종료")
+            break
 
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-    # WAV 저장
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(RATE)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-
-def transcribe_audio(filename=AUDIO_FILE):
-    result = model.transcribe(filename, language="ko")
-    text = result['text'].strip()
+    samples = np.concatenate(frames) if frames else np.zeros(0, dtype=np.int16)
+    trimmed = trim_silence(samples, endpointer.threshold)
+    print(f"✂️ 앞뒤 무음 제거: {len(samples) / RATE:.1f}초 → {len(trimmed) / RATE:.1f}초 "
+          f"(잡음 바닥 {endpointer.noise_floor:.1f}dBFS)")
+    if DEBUG_SAVE_WAV:
+        save_wav(trimmed)
+    return trimmed
+
+# STT로 텍스트 추출 (파일/ffmpeg 없이 메모리의 오디오를 바로 전달)
+def transcribe_audio(samples):
+    if not isinstance(samples, str) and len(samples) == 0:
+        return ""
+    tier = stt.get_tier("command")
+    text = tier.transcribe(samples if isinstance(samples, str) else pcm_to_float32(samples))  # 파일 경로도 그대로 지원
     print(f"📝 STT 인식: '{text}'")
     return text
 
-# 메인 실행
-if __name__ == "__main__":
-    load_dotenv()
+#-----------------------------------------------------------------------------------------------------------
+# 스페이스바 → 녹음 → STT 후 명령 큐에 넣음 (이전 명령이 실행 중이어도 다음 발화를 받음)
+async def capture_commands(capture, press_queue, command_queue, recording, stt_executor):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = await press_queue.get()
+        # 명령 하나 = 추적 하나 (녹음 → STT, 실행 쪽에서 같은 추적 ID로 이어감)
+        with tracing.trace("command.capture") as capture_span:
+            try:
+                with tracing.span("audio.record") as record_span:
+                    samples = await loop.run_in_executor(None, record_until_silence, capture, start)
+                    record_span.set(audio_seconds=round(len(samples) / RATE, 2))
+            finally:
+                recording.clear()  # 녹음이 끝나면 다음 스페이스바 입력 허용
+            # executor 스레드에도 추적 컨텍스트 전달 (STT 구간이 같은 추적에 기록되도록)
+            user_input = await loop.run_in_executor(
+                stt_executor, contextvars.copy_context().run, transcribe_audio, samples
+            )
+            capture_span.set(text=user_input)
+        if not user_input:
+            continue
+        try:
+            command_queue.put_nowait((user_input, capture_span.trace_id))
+        except asyncio.QueueFull:
+            print(f"⚠️ 대기 중인 명령이 {COMMAND_QUEUE_SIZE}개를 넘어 버립니다: '{user_input}'")
+
+# 명령 큐에서 하나씩 꺼내 브라우저에서 실행
+async def execute_commands(session, command_queue, base_url, api_key, region_value_map, region_pool, prefetcher):
+    while True:
+        user_input, trace_id = await command_queue.get()
+        try:
+            with tracing.trace("command.execute", trace_id, text=user_input):
+                session["page"], _ = await process_command(
+                    session["page"], base_url, user_input, api_key, region_value_map, region_pool, prefetcher=prefetcher
+                )
+        except Exception as e:
+            print(f"❌ 명령 실행 중 예외 발생: {e}")
+        print("⏳ 다시 대기 중... [스페이스바]를 눌러 명령 시작")
+
+async def main():
     api_key = os.getenv('OPENAI_API_KEY')
     base_url = "https://kr.neverlosewater.com/"
     region_value_map = load_region_value_map()
-
-    listen_for_trigger()  # 트리거 키워드 감지될 때까지 대기
-    playwright, browser, context, page = create_logged_in_session(base_url)
-
+    loop = asyncio.get_running_loop()
+    stt_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt")  # Whisper는 한 번에 하나씩
+
+    capture = AudioCapture().start()
+    # Whisper 모델 로드/예열(작은 트리거 모델 먼저)과 브라우저 로그인은 트리거 대기와 동시에 진행
+    stt.set_region_names(region_value_map)
+    stt.warm_up_in_background()
+    session_task = asyncio.create_task(create_logged_in_session(base_url))
+    await loop.run_in_executor(None, listen_for_trigger, capture)  # 트리거 키워드 감지될 때까지 대기
+    playwright, browser, context, page = await session_task
+    region_pool = await RegionPagePool.from_env(context, base_url, region_value_map)
+    prefetcher = RoomPrefetcher.from_env(context, base_url)
+    session = {"page": page}
+
+    # 키 입력은 keyboard 훅 스레드에서 이벤트로 받아 이벤트 루프로 전달 (폴링 없음)
+    stop = asyncio.Event()
+    press_queue = asyncio.Queue(maxsize=1)
+    command_queue = asyncio.Queue(maxsize=COMMAND_QUEUE_SIZE)
+    recording = threading.Event()
+
+    def on_space(_):
+        if recording.is_set():
+            return  # 녹음 중이거나 키를 누르고 있는 동안의 반복 입력 무시
+        recording.set()
+        loop.call_soon_threadsafe(press_queue.put_nowait, capture.position)
+
+    keyboard.on_press_key("space", on_space)
+    keyboard.on_press_key("esc", lambda _: loop.call_soon_threadsafe(stop.set))
+
+    workers = [
+        asyncio.create_task(capture_commands(capture, press_queue, command_queue, recording, stt_executor)),
+        asyncio.create_task(execute_commands(session, command_queue, base_url, api_key, region_value_map, region_pool,
+                                             prefetcher)),
+    ]
     try:
         print("🔵 [스페이스바]를 눌러 명령어를 말하세요. [ESC]를 누르면 종료됩니다.")
-        while True:
-            if keyboard.is_pressed("esc"):
-                print("🚪 ESC 키 감지 → 종료합니다.")
-                break
-            if keyboard.is_pressed("space"):
-                time.sleep(0.2)  # 너무 빠른 중복 입력 방지
-                record_until_silence()
-                user_input = transcribe_audio()
-                if user_input:
-                    process_command(page, base_url, user_input, api_key, region_value_map)
-                print("⏳ 다시 대기 중... [스페이스바]를 눌러 명령 시작")
-            time.sleep(0.1)
+        await stop.wait()
+        print("🚪 ESC 키 감지 → 종료합니다.")
     finally:
-        browser.close()
-        playwright.stop()
+        keyboard.unhook_all()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        capture.stop()
+        if prefetcher:
+            await prefetcher.close()
+            print(f"🔮 {prefetcher.report()}")
+        await browser.close()
+        await playwright.stop()
+        stt_executor.shutdown(wait=False)
+        print(f"📈 STT {stt.report()}")
         print("🧹 세션 종료")
+
+
+# 메인 실행
+if __name__ == "__main__":
+    asyncio.run(main())